@@ -1,31 +1,44 @@
 import streamlit as st
-from database import init_db, SessionLocal
-from models import User
-# from modules.masters import masters_page
-# from modules.calculator import calculator_page # To be implemented
-# from modules.reports import reports_page # To be implemented
 
 st.set_page_config(page_title="Honest Packaging Costing", layout="wide", page_icon="📦")
 
-from modules.auth import login_page, logout
-
+# Keep this import block light: it runs before the login page is served.
+# Pages pull in pandas / reportlab / passlib / smtplib on demand (see modules/warmup.py).
 import os
 import time
 import logging
+import uuid
 from database import init_db, SessionLocal
 from models import User
+from modules.auth import login_page, logout
 from modules.backup_utils import auto_backup_check
-
 from modules.utils import get_resource_path
+from modules.warmup import start_warmup
+from modules.perf import page_timer
+from modules import metrics
+from modules import changelog
+from modules.rate_history import seed_rate_history
+from modules.paper_usage import backfill_item_layers
+from modules import similar, price_model
 
 # 0. App Version & Logging
 VERSION = "1.2.0"
 logging.basicConfig(filename="error.log", level=logging.ERROR, 
                     format='%(asctime)s %(levelname)s:%(message)s')
 
-# Initialize Database
-init_db()
-auto_backup_check()
+# Initialize Database (once per server process, not on every rerun)
+@st.cache_resource
+def _init_app():
+    init_db()
+    seed_rate_history()
+    metrics.start_metrics_server() # Prometheus text on http://127.0.0.1:9108/metrics
+    return True
+
+_init_app()
+
+if "metrics_session" not in st.session_state:
+    st.session_state["metrics_session"] = uuid.uuid4().hex
+metrics.session_seen(st.session_state["metrics_session"])
 
 # Load Custom CSS
 def local_css(file_name):
@@ -39,11 +52,17 @@ local_css("style.css")
 # Check Login
 if "user_role" not in st.session_state or st.session_state["user_role"] is None:
     login_page()
+    # Login page is on screen; preload heavy modules, run the daily backup check
+    # migrate any items still missing normalized layer rows, build the similar-box
+    # index and refresh the rate model in the background
+    start_warmup(auto_backup_check, backfill_item_layers, similar.build, price_model.ensure_fresh)
     st.stop()
 
+start_warmup(auto_backup_check, backfill_item_layers, similar.build, price_model.ensure_fresh)
+changelog.set_current_user(st.session_state.get("username")) # Recorded with every change this rerun makes
+
 # Sidebar
 # Sidebar Header
-import os
 sidebar_logo = get_resource_path("sidebar_header.png")
 if os.path.exists(sidebar_logo):
     st.sidebar.image(sidebar_logo, use_container_width=True)
@@ -68,15 +87,18 @@ selected_menu = st.sidebar.radio("Go to", menus)
 
 if selected_menu == "1. New Quotation":
     from modules.calculator import calculator_page
-    calculator_page()
+    with page_timer("New Quotation", st.session_state.get("username")):
+        calculator_page()
 
 elif selected_menu == "2. Report":
     from modules.reports import reports_page
-    reports_page()
+    with page_timer("Report", st.session_state.get("username")):
+        reports_page()
 
 elif selected_menu == "3. Masters":
     from modules.masters import masters_page
-    masters_page()
+    with page_timer("Masters", st.session_state.get("username")):
+        masters_page()
 
 elif selected_menu == "4. User Details":
     # from modules.masters import party_master_page # Removed invalid import
@@ -267,3 +289,14 @@ elif selected_menu == "4. User Details":
 
     st.divider()
 
+    # --- PERFORMANCE SECTION ---
+    if st.session_state.get("user_role") == "Admin":
+        from modules.perf import performance_panel
+        from modules.profiling import profiling_panel
+        performance_panel()
+        st.divider()
+        profiling_panel()
+        st.divider()
+        price_model.price_model_panel()
+        st.divider()
+
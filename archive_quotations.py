@@ -0,0 +1,20 @@
+import argparse
+from database import init_db
+from modules.archive import archive_quotations, ARCHIVE_AFTER_DAYS, ARCHIVE_DIR
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old quotations out of the main database into yearly archive files.")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help=f"Archive quotations created more than this many days ago (default {ARCHIVE_AFTER_DAYS})")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the main database afterwards to give the space back")
+    args = parser.parse_args()
+
+    init_db()
+    moved = archive_quotations(args.older_than_days, vacuum=args.vacuum)
+    if not moved:
+        print("Nothing to archive.")
+    for year, n in moved.items():
+        print(f"{year}: {n} quotation(s) moved to {ARCHIVE_DIR}")
+
+if __name__ == "__main__":
+    main()
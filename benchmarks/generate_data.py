@@ -0,0 +1,141 @@
+"""
+Seeded synthetic data for benchmarks: fills a scratch SQLite DB with parties,
+paper/operation rates, reels and N quotations (with layer_details and layer rows).
+
+    python benchmarks/generate_data.py --db benchmarks/bench.db --quotations 100000
+"""
+import os
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CHUNK = 5000 # Rows per INSERT batch
+
+PAPERS = [ # name, rate per kg, bf
+    ("Golden", 48.0, 22.0), ("Natural", 38.0, 18.0), ("Duplex", 55.0, 16.0), ("Kraft", 44.0, 24.0),
+    ("Semi Kraft", 36.0, 16.0), ("Virgin", 58.0, 28.0), ("Imported", 62.0, 30.0), ("Recycled", 30.0, 14.0),
+]
+OPERATIONS = [ # name, rate, unit
+    ("Corrugation", 4.0, "per_kg"), ("Pasting", 2.0, "per_kg"), ("Printing", 1.5, "per_box"),
+    ("Stitching", 0.5, "per_box"), ("Die Setup", 1500.0, "fixed"), ("Transport", 1.0, "per_kg"),
+]
+REEL_WIDTHS = [float(w) for w in range(20, 82, 2)]
+GSMS = [100, 120, 140, 150, 180, 200, 230]
+PLIES = [3, 5, 7, 9]
+PLY_WEIGHTS = [50, 35, 12, 3]
+STATUSES = ["Draft", "Sent", "Approved", "Finalised", "Dispatched"]
+STATUS_WEIGHTS = [40, 25, 10, 15, 10]
+PARTY_WORDS = ["Jyoti", "Shree", "Ganesh", "Electrical", "Industries", "Foods", "Pharma", "Traders",
+               "Plastics", "Auto", "Components", "Agro", "Exports", "Textiles", "Enterprises", "Steel"]
+
+def _party_names(rng, count):
+    names = set()
+    while len(names) < count:
+        words = rng.sample(PARTY_WORDS, rng.randint(2, 3))
+        names.add(f"{' '.join(words)} {len(names) + 1}")
+    return sorted(names)
+
+def _insert(conn, table, rows):
+    for i in range(0, len(rows), CHUNK):
+        conn.execute(table.insert(), rows[i:i + CHUNK])
+
+def generate(quotations=10_000, seed=42, years=3):
+    """Fills the (empty) database configured via BOX_COSTING_DB. Returns row counts."""
+    from database import engine, init_db
+    from models import Party, PaperRate, OperationRate, ReelSize, Terms, Quotation, QuotationItem, QuotationItemLayer
+    from modules.rate_history import seed_rate_history
+    from modules.quotations import party_initials
+    from logic import get_layer_names, cost_box
+    from sqlalchemy import func, select
+
+    init_db()
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(Quotation.__table__)).scalar():
+            raise SystemExit("Database already has quotations; use a new --db file.")
+
+        party_names = _party_names(rng, max(50, quotations // 200))
+        _insert(conn, Party.__table__, [{
+            "id": i, "name": name, "address": f"Plot {i}, GIDC Estate", "mobile_number": f"98{rng.randint(10**7, 10**8 - 1)}",
+            "email": f"party{i}@example.com", "default_margin": 10.0, "transport_rate_logic": "per_kg", "is_active": True
+        } for i, name in enumerate(party_names, 1)])
+        _insert(conn, PaperRate.__table__, [{"name": n, "rate": r, "bf": bf, "unit": "KG"} for n, r, bf in PAPERS])
+        _insert(conn, OperationRate.__table__, [{"operation_name": n, "rate": r, "unit": u, "is_active": True} for n, r, u in OPERATIONS])
+        _insert(conn, ReelSize.__table__, [{"width": w, "unit": "Inch", "is_active": True} for w in REEL_WIDTHS])
+        _insert(conn, Terms.__table__, [{"title": "General Terms", "content": "1. GST extra as applicable.\n2. Delivery ex-factory."}])
+
+        start = datetime.now() - timedelta(days=365 * years)
+        counters = {}
+        item_id = layer_id = 0
+        q_rows, item_rows, layer_rows = [], [], []
+
+        for q_id in range(1, quotations + 1):
+            party_id = rng.randint(1, len(party_names))
+            initials = party_initials(party_names[party_id - 1])
+            counters[initials] = counters.get(initials, 0) + 1
+            created = start + timedelta(seconds=rng.randint(0, 365 * years * 86400))
+
+            total = 0.0
+            for _ in range(2 if rng.random() < 0.1 else 1):
+                ply = rng.choices(PLIES, PLY_WEIGHTS)[0]
+                dims = [rng.choice(range(4, 25)) * 25.4 for _ in range(3)]
+                layers = [{"layer": name, "paper": p[0], "rate": p[1], "bf": p[2], "gsm": rng.choice(GSMS)}
+                          for name, p in ((n, rng.choice(PAPERS)) for n in get_layer_names(ply))]
+                qty = rng.choice([500, 1000, 2000, 3000, 5000, 10000])
+                res = cost_box(*dims, layers, OPERATIONS, quantity=qty, cutting_plus_mm=38.1, reel_widths=REEL_WIDTHS)
+
+                item_id += 1
+                item_rows.append({
+                    "id": item_id, "quotation_id": q_id, "box_name": f"Carton {ply} Ply", "box_type": "RSC",
+                    "length": dims[0], "width": dims[1], "height": dims[2], "unit": "Inch", "ply": ply, "quantity": qty,
+                    "layer_details": res["layer_details"], "sheet_length": res["sheet_length"], "sheet_width": res["sheet_width"],
+                    "reel_width": res["reel_width"], "sheet_weight": res["box_weight"], "box_weight": res["box_weight"],
+                    "material_cost": res["material_cost"], "conversion_cost": res["conversion_cost"],
+                    "cost_per_box": res["cost_per_box"], "margin_percent": res["margin_percent"], "selling_price": res["selling_price"],
+                })
+                total_eff = sum(l["gsm"] * l["flute_factor"] for l in res["layer_details"])
+                for pos, l in enumerate(res["layer_details"]):
+                    layer_id += 1
+                    layer_rows.append({
+                        "id": layer_id, "item_id": item_id, "position": pos, "layer": l["layer"], "paper": l["paper"],
+                        "gsm": float(l["gsm"]), "bf": l["bf"], "flute_factor": l["flute_factor"],
+                        "weight_kg": res["box_weight"] * l["gsm"] * l["flute_factor"] / total_eff,
+                    })
+                total += res["selling_price"] * qty
+
+            q_rows.append({
+                "id": q_id, "quotation_number": f"{initials}-{counters[initials]:04d}", "party_id": party_id,
+                "created_date": created, "status": rng.choices(STATUSES, STATUS_WEIGHTS)[0], "total_amount": total,
+            })
+
+            if len(q_rows) >= CHUNK:
+                _insert(conn, Quotation.__table__, q_rows)
+                _insert(conn, QuotationItem.__table__, item_rows)
+                _insert(conn, QuotationItemLayer.__table__, layer_rows)
+                q_rows, item_rows, layer_rows = [], [], []
+
+        _insert(conn, Quotation.__table__, q_rows)
+        _insert(conn, QuotationItem.__table__, item_rows)
+        _insert(conn, QuotationItemLayer.__table__, layer_rows)
+
+    seed_rate_history()
+    return {"parties": len(party_names), "quotations": quotations, "items": item_id, "layers": layer_id}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark database.")
+    parser.add_argument("--db", default=os.path.join(ROOT, "benchmarks", "bench.db"), help="Scratch database file (created)")
+    parser.add_argument("--quotations", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Must be set before database.py is imported
+    os.environ["BOX_COSTING_DB"] = os.path.abspath(args.db)
+    counts = generate(args.quotations, args.seed)
+    print(f"{args.db}: " + ", ".join(f"{v} {k}" for k, v in counts.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Load test for costing_api.py: N concurrent keep-alive clients POST random box specs
+for a fixed time and report throughput and latency percentiles.
+
+    python costing_api.py --port 8502 &
+    python benchmarks/load_test_api.py --url http://127.0.0.1:8502 --clients 16 --seconds 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+
+def _specs(masters, count, seed):
+    rng = random.Random(seed)
+    papers = [p["name"] for p in masters["papers"]]
+    specs = []
+    for _ in range(count):
+        ply = rng.choice([3, 5, 7])
+        specs.append({
+            "length": rng.randint(4, 24), "width": rng.randint(4, 20), "height": rng.randint(3, 16), "unit": "Inch",
+            "ply": ply, "quantity": rng.choice([500, 1000, 2000, 5000]),
+            "layers": [{"paper": rng.choice(papers), "gsm": rng.choice([120, 150, 180])} for _ in range(ply)],
+        })
+    return specs
+
+def _client(host, port, path, bodies, headers, deadline, out, lock):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    latencies, errors, i = [], 0, 0
+    while time.perf_counter() < deadline:
+        body = bodies[i % len(bodies)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request("POST", path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        out["latencies"] += latencies
+        out["errors"] += errors
+
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the costing API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8502")
+    parser.add_argument("--clients", type=int, default=16,
+                        help="Concurrent connections (match the API's --workers, default 16: more clients queue)")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--batch", type=int, default=0, help="Send /cost/batch with this many specs instead of /cost")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Write the summary as JSON here")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    headers = {"Content-Type": "application/json"}
+    if os.environ.get("BOX_COSTING_API_KEY"):
+        headers["X-API-Key"] = os.environ["BOX_COSTING_API_KEY"]
+
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    conn.request("GET", "/masters", headers=headers)
+    resp = conn.getresponse()
+    if resp.status != 200:
+        sys.exit(f"GET /masters failed: {resp.status} {resp.read()!r}")
+    masters = json.loads(resp.read())
+    conn.close()
+    if not masters["papers"]:
+        sys.exit("No paper rates in the database.")
+
+    specs = _specs(masters, 500, args.seed)
+    if args.batch:
+        path = "/cost/batch"
+        bodies = [json.dumps({"items": specs[i:i + args.batch]}).encode() for i in range(0, len(specs), args.batch)]
+    else:
+        path = "/cost"
+        bodies = [json.dumps(s).encode() for s in specs]
+
+    out = {"latencies": [], "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    started = time.perf_counter()
+    threads = [threading.Thread(target=_client, args=(url.hostname, url.port or 80, path, bodies, headers, deadline, out, lock))
+               for _ in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    lat = sorted(out["latencies"])
+    per_request = args.batch or 1
+    summary = {
+        "endpoint": path,
+        "clients": args.clients,
+        "seconds": round(elapsed, 2),
+        "requests": len(lat),
+        "errors": out["errors"],
+        "requests_per_sec": round(len(lat) / elapsed, 1),
+        "boxes_per_sec": round(len(lat) * per_request / elapsed, 1),
+        "p50_ms": round(_percentile(lat, 50) * 1000, 2),
+        "p95_ms": round(_percentile(lat, 95) * 1000, 2),
+        "p99_ms": round(_percentile(lat, 99) * 1000, 2),
+    }
+    for k, v in summary.items():
+        print(f"  {k:18} {v}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+End-to-end check of multi-site replication (modules/replication.py) with two local
+SQLite files and a temp folder as the shared directory: quotation insert, master
+edit, master delete and a last-writer-wins conflict. Exits 1 on the first mismatch.
+
+    python benchmarks/replication_check.py [--keep]
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+def _site(folder, code):
+    """A session on a fresh database file for site `code`."""
+    from database import Base, _add_missing_columns
+    from modules.quotations import SITE_CODE_KEY
+    from modules.replication import _set_setting
+    engine = create_engine(f"sqlite:///{os.path.join(folder, f'site_{code}.db')}")
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns(bind=engine)
+    db = sessionmaker(bind=engine)()
+    _set_setting(db, SITE_CODE_KEY, code)
+    db.commit()
+    return db
+
+def _check(label, ok):
+    print(f"{'ok  ' if ok else 'FAIL'} {label}")
+    if not ok:
+        sys.exit(1)
+
+def run(folder):
+    from models import Party, PaperRate, ReelSize, Quotation, QuotationItem
+    from modules.quotations import next_quotation_number
+    from modules.replication import replicate
+
+    shared = os.path.join(folder, "shared")
+    a, b = _site(folder, "A"), _site(folder, "B")
+    sync = lambda *dbs: [replicate(db, shared) for db in dbs]
+    rate = lambda db, name: db.query(PaperRate.rate).filter(PaperRate.name == name).scalar()
+
+    # Quotation insert (with its party and masters) at A shows up at B
+    party = Party(name="Acme Packaging", default_margin=12.0)
+    a.add_all([party, PaperRate(name="Golden", rate=40.0, bf=22.0), ReelSize(width=52.0)])
+    a.flush()
+    number = next_quotation_number(a, party.name)
+    q = Quotation(quotation_number=number, party_id=party.id, status="Draft", total_amount=1200.0)
+    a.add(q)
+    a.flush()
+    a.add(QuotationItem(quotation_id=q.id, box_name="RSC 12x8x6", length=12, width=8, height=6, ply=3,
+                        quantity=100, box_weight=0.2, selling_price=12.0,
+                        layer_details=[{"layer": "Top Liner", "paper": "Golden", "gsm": 150, "bf": 22.0}]))
+    a.commit()
+    sync(a, b)
+    copy = b.query(Quotation).filter(Quotation.quotation_number == number).first()
+    _check(f"quotation {number} replicated with its item and party",
+           copy is not None and len(copy.items) == 1 and copy.party.name == party.name)
+    _check("site code in the quotation number", number.endswith("-A-0001"))
+
+    # Master edit
+    a.query(PaperRate).filter(PaperRate.name == "Golden").first().rate = 44.0
+    a.commit()
+    sync(a, b)
+    _check("paper rate edit replicated", rate(b, "Golden") == 44.0)
+
+    # Master delete
+    a.delete(a.query(ReelSize).filter(ReelSize.width == 52.0).first())
+    a.commit()
+    sync(a, b)
+    _check("reel size delete replicated", b.query(ReelSize).filter(ReelSize.width == 52.0).first() is None)
+
+    # Conflict: both sites edit the same rate, B last; after syncing both ways B's value wins everywhere
+    a.query(PaperRate).filter(PaperRate.name == "Golden").first().rate = 50.0
+    a.commit()
+    b.query(PaperRate).filter(PaperRate.name == "Golden").first().rate = 55.0
+    b.commit()
+    sync(a, b, a)
+    _check("last writer wins on both sites", rate(a, "Golden") == 55.0 and rate(b, "Golden") == 55.0)
+    a.close()
+    b.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Check replication between two local database files.")
+    parser.add_argument("--keep", action="store_true", help="Keep the temp folder (databases, change sets)")
+    args = parser.parse_args()
+    folder = tempfile.mkdtemp(prefix="box_costing_replication_")
+    try:
+        run(folder)
+        print("Replication check passed.")
+    finally:
+        if args.keep:
+            print(f"Files kept in {folder}")
+        else:
+            shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Benchmark suite. Times the costing formulas, GSM optimizer, reel suggestion, quotation
+save, reports listing/search, party history, PDF generation and backup/restore against
+a synthetic scratch database, and writes the timings as JSON.
+
+    python benchmarks/run_benchmarks.py --quotations 100000
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/1.2.0_20261019_1030.json
+
+With --compare, benchmarks whose median is more than --threshold times the baseline
+are reported as regressions and the script exits with status 1.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import platform
+import argparse
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+def _time(func, repeat):
+    func() # Warm-up (imports, caches)
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": repeat,
+        "min_ms": round(min(runs), 3),
+        "median_ms": round(statistics.median(runs), 3),
+        "mean_ms": round(statistics.mean(runs), 3),
+        "max_ms": round(max(runs), 3),
+    }
+
+def _benchmarks(plies, backup_dir):
+    """name -> zero-argument callable. Imports happen here, after BOX_COSTING_DB is set."""
+    from database import SessionLocal
+    from models import Party, PaperRate, OperationRate, ReelSize, Quotation, Settings
+    from logic import cost_box, optimize_gsm, suggest_reel, suggest_reels, get_layer_names
+    from modules.quotations import save_quotation
+    from modules.reports import quotation_rows, party_history
+    from modules.pdf_utils import generate_quotation_pdf
+    from modules import backup_utils
+    from sqlalchemy import func
+
+    db = SessionLocal()
+    papers = [(p.name, p.rate, p.bf) for p in db.query(PaperRate).all()]
+    operations = [(o.operation_name, o.rate, o.unit) for o in db.query(OperationRate).filter(OperationRate.is_active == True)]
+    reel_widths = [w for (w,) in db.query(ReelSize.width).filter(ReelSize.is_active == True).order_by(ReelSize.width)]
+    busiest_party_id = db.query(Quotation.party_id).group_by(Quotation.party_id)\
+                         .order_by(func.count(Quotation.id).desc()).limit(1).scalar()
+    search_term = db.query(Party.name).filter(Party.id == busiest_party_id).scalar().split()[0].lower()
+    pdf_quotation_id = db.query(func.max(Quotation.id)).scalar()
+
+    # Backups of the scratch DB go to a temp folder, never the real backup path
+    setting = db.query(Settings).filter(Settings.key == "backup_path").first() or Settings(key="backup_path")
+    setting.value = backup_dir
+    db.add(setting)
+    db.commit()
+    db.close()
+
+    rng = random.Random(1)
+    specs = []
+    for _ in range(1000):
+        ply = rng.choice([3, 5, 7])
+        layers = [{"layer": n, "paper": p[0], "rate": p[1], "bf": p[2] or 18.0, "gsm": rng.choice([120, 150, 180])}
+                  for n, p in ((n, rng.choice(papers)) for n in get_layer_names(ply))]
+        specs.append(([rng.uniform(100, 600) for _ in range(3)], layers))
+    sheet_widths = [rng.uniform(200, 1800) for _ in range(10_000)]
+
+    def costing():
+        for dims, layers in specs:
+            cost_box(*dims, layers, operations, reel_widths=reel_widths)
+
+    def optimizer(ply):
+        configs = [{"layer": n, "bf": 18.0 + i, "rate": 40.0 + i, "flute_factor": 1.4 if "Flute" in n else 1.0}
+                   for i, n in enumerate(get_layer_names(ply))]
+        return lambda: optimize_gsm(configs, target_bs=1.6 * ply)
+
+    def reel_single():
+        for w in sheet_widths:
+            suggest_reel(w, reel_widths)
+
+    def reel_vectorized():
+        suggest_reels(sheet_widths, reel_widths)
+
+    def save():
+        db = SessionLocal()
+        try:
+            dims, layers = specs[0]
+            res = cost_box(*dims, layers, operations, reel_widths=reel_widths)
+            item = {k: res[k] for k in ("sheet_length", "sheet_width", "reel_width", "box_weight", "material_cost",
+                                        "conversion_cost", "cost_per_box", "margin_percent", "selling_price", "layer_details")}
+            item.update(box_name="Benchmark Box", box_type="RSC", length=dims[0], width=dims[1], height=dims[2],
+                        unit="mm", ply=len(layers), quantity=1000, sheet_weight=res["box_weight"])
+            save_quotation(db, db.get(Party, busiest_party_id), item)
+        finally:
+            db.close()
+
+    def listing(search_query):
+        def run():
+            # Same work as one rerun of Reports > All Quotations
+            db = SessionLocal()
+            try:
+                quotations = db.query(Quotation).order_by(Quotation.created_date.desc()).all()
+                for _ in quotation_rows(quotations, search_query):
+                    pass
+            finally:
+                db.close()
+        return run
+
+    def history():
+        db = SessionLocal()
+        try:
+            party_history(db, busiest_party_id)
+        finally:
+            db.close()
+
+    def pdf():
+        db = SessionLocal()
+        try:
+            q = db.get(Quotation, pdf_quotation_id)
+            generate_quotation_pdf(q, q.items, q.party)
+        finally:
+            db.close()
+
+    def backup():
+        ok, msg = backup_utils.create_backup()
+        if not ok:
+            raise RuntimeError(msg)
+
+    def restore():
+        ok, msg = backup_utils.restore_backup(backup_utils.list_backups()[0])
+        if not ok:
+            raise RuntimeError(msg)
+
+    benchmarks = {"costing.cost_box_x1000": costing}
+    for ply in plies:
+        benchmarks[f"optimizer.ply_{ply}"] = optimizer(ply)
+    benchmarks.update({
+        "reel.suggest_reel_x10000": reel_single,
+        "reel.suggest_reels_x10000": reel_vectorized,
+        "quotation.save": save,
+        "reports.listing": listing(""),
+        "reports.search": listing(search_term),
+        "reports.party_history": history,
+        "pdf.generate_quotation_pdf": pdf,
+        "backup.create": backup,
+        "backup.restore": restore,
+    })
+    return benchmarks
+
+def _dataset_counts():
+    from database import SessionLocal
+    from models import Party, Quotation, QuotationItem, QuotationItemLayer
+    db = SessionLocal()
+    try:
+        return {name: db.query(model).count() for name, model in
+                [("parties", Party), ("quotations", Quotation), ("items", QuotationItem), ("layers", QuotationItemLayer)]}
+    finally:
+        db.close()
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline, threshold):
+    """Prints current vs baseline medians. Returns names of regressed benchmarks."""
+    regressions = []
+    print(f"\nCompared with {baseline.get('version')} ({baseline.get('git_commit')}, {baseline.get('created')}):")
+    for name, res in results["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"  {name:32} {res['median_ms']:>10.2f} ms   (new)")
+            continue
+        ratio = res["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:32} {res['median_ms']:>10.2f} ms  vs {base['median_ms']:>10.2f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the box costing benchmark suite.")
+    parser.add_argument("--db", default=os.path.join(BENCH_DIR, "bench.db"), help="Scratch database (generated if missing)")
+    parser.add_argument("--quotations", type=int, default=10_000, help="Quotations to generate when the DB is missing")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark (after one warm-up)")
+    parser.add_argument("--plies", type=int, nargs="+", default=[3, 5], help="Optimizer plies (7 ply takes minutes)")
+    parser.add_argument("--only", help="Run benchmarks whose name starts with this prefix")
+    parser.add_argument("--out", help="Results JSON (default benchmarks/results/<version>_<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Median ratio above which a benchmark regressed")
+    args = parser.parse_args()
+
+    # Must be set before database.py is imported; the real box_costing.db is never touched
+    db_path = os.path.abspath(args.db)
+    os.environ["BOX_COSTING_DB"] = db_path
+    if not os.path.exists(db_path):
+        from generate_data import generate
+        print(f"Generating {args.quotations} quotations into {db_path}...")
+        generate(args.quotations, args.seed)
+
+    with open(os.path.join(ROOT, "VERSION")) as f:
+        version = f.read().strip()
+
+    backup_dir = tempfile.mkdtemp(prefix="bench_backups_")
+    try:
+        results = {
+            "version": version,
+            "git_commit": _git_commit(),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "dataset": dict(_dataset_counts(), seed=args.seed),
+            "results": {},
+        }
+        for name, func in _benchmarks(args.plies, backup_dir).items():
+            if args.only and not name.startswith(args.only):
+                continue
+            res = results["results"][name] = _time(func, args.repeat)
+            print(f"  {name:32} median {res['median_ms']:>10.2f} ms   min {res['min_ms']:>10.2f} ms")
+    finally:
+        shutil.rmtree(backup_dir, ignore_errors=True)
+
+    out = args.out or os.path.join(BENCH_DIR, "results", f"{version}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above x{args.threshold}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+from collections import namedtuple
+
+# Box style registry. Each style declares its flat blank once, as formulas of the box
+# dimensions (L, W, H) and, for die-cut styles, the blank size taken from the drawing
+# (BL, BW). The same lambdas work on numbers and on numpy arrays, so one call costs a
+# whole batch. Allowances are added the same way for every style:
+#   sheet length = length formula + cutting allowance (joint / trim)
+#   sheet width  = width formula + decel allowance
+# `pieces` sheets make one box; split=True styles can also be made 2PC (two pieces,
+# each half the length). Add a style with register_style(); the calculator, the
+# costing API and batch costing pick it up from STYLES.
+
+BoxStyle = namedtuple("BoxStyle", ["code", "label", "length", "width", "pieces", "split", "needs_blank"])
+
+STYLES = {}
+# Names used before the registry existed (calculator "Box Style", API "box_style")
+ALIASES = {"REGULAR": "RSC", "OVER FLIP": "FOL"}
+
+def register_style(code, label, length, width, pieces=1, split=False, needs_blank=False):
+    STYLES[code] = BoxStyle(code, label, length, width, pieces, split, needs_blank)
+
+register_style("RSC", "RSC - Regular Slotted (FEFCO 0201)",
+               length=lambda L, W, H, BL, BW: (L + W) * 2, width=lambda L, W, H, BL, BW: H + W, split=True)
+register_style("HSC", "HSC - Half Slotted, no top flaps (FEFCO 0200)",
+               length=lambda L, W, H, BL, BW: (L + W) * 2, width=lambda L, W, H, BL, BW: H + W / 2, split=True)
+register_style("FOL", "FOL - Full Overlap / Over Flip (FEFCO 0203)",
+               length=lambda L, W, H, BL, BW: (L + W) * 2, width=lambda L, W, H, BL, BW: H + W * 2, split=True)
+register_style("TRAY", "Tray - open top, walls folded up",
+               length=lambda L, W, H, BL, BW: L + H * 2, width=lambda L, W, H, BL, BW: W + H * 2)
+# Full telescope: base and lid are both trays of the box size (board caliper ignored)
+register_style("TELESCOPE", "Telescope - tray base + full-depth lid",
+               length=lambda L, W, H, BL, BW: L + H * 2, width=lambda L, W, H, BL, BW: W + H * 2, pieces=2)
+register_style("DIECUT", "Die-cut - blank size from the drawing",
+               length=lambda L, W, H, BL, BW: BL, width=lambda L, W, H, BL, BW: BW, needs_blank=True)
+
+def get_style(code):
+    """Style by code or legacy name; ValueError if unknown."""
+    style = STYLES.get(ALIASES.get(code, code))
+    if style is None:
+        raise ValueError(f"Unknown box style '{code}'. Known: {', '.join(STYLES)}")
+    return style
+
+def sheet_size(style, length, width, height, joint_type="1PC", cutting_plus=0.0, decel_plus=0.0,
+               blank_length=None, blank_width=None):
+    """One box: (sheet_length, sheet_width, sheets_per_box) in the unit of the dimensions."""
+    style = get_style(style)
+    if style.needs_blank and (blank_length is None or blank_width is None):
+        raise ValueError(f"Box style '{style.code}' needs the blank length and width")
+    base_len = style.length(length, width, height, blank_length, blank_width)
+    pieces = style.pieces
+    if joint_type == "2PC" and style.split: # Each piece covers half the perimeter
+        base_len = base_len / 2
+        pieces *= 2
+    base_wid = style.width(length, width, height, blank_length, blank_width)
+    return base_len + cutting_plus, base_wid + decel_plus, pieces
+
+def sheet_sizes(styles, length, width, height, joint_types=None, cutting_plus=0.0, decel_plus=0.0,
+                blank_length=None, blank_width=None):
+    """
+    Vectorized sheet_size for a batch of mixed styles: every argument an array (or a
+    scalar for all). Each style's formulas run once over its rows.
+    Returns (sheet_length, sheet_width, sheets_per_box) arrays.
+    """
+    import numpy as np
+    styles = [styles] if isinstance(styles, str) else list(styles)
+    n = len(styles)
+    rows_by_style = {}
+    for i, code in enumerate(styles):
+        rows_by_style.setdefault(code, []).append(i)
+    arr = lambda v, fill=np.nan: np.broadcast_to(np.asarray(fill if v is None else v, dtype=float), (n,))
+    L, W, H = arr(length), arr(width), arr(height)
+    BL, BW = arr(blank_length), arr(blank_width)
+    joints = np.broadcast_to(np.asarray("1PC" if joint_types is None else joint_types), (n,))
+
+    sheet_len = np.full(n, np.nan)
+    sheet_wid = np.full(n, np.nan)
+    pieces = np.ones(n, dtype=int)
+    for code, rows in rows_by_style.items():
+        style = get_style(code)
+        rows = np.asarray(rows)
+        if style.needs_blank and (np.isnan(BL[rows]).any() or np.isnan(BW[rows]).any()):
+            raise ValueError(f"Box style '{style.code}' needs the blank length and width")
+        base_len = np.asarray(style.length(L[rows], W[rows], H[rows], BL[rows], BW[rows]), dtype=float)
+        n_pieces = np.full(len(rows), style.pieces)
+        if style.split:
+            two = joints[rows] == "2PC"
+            base_len = np.where(two, base_len / 2, base_len)
+            n_pieces = np.where(two, n_pieces * 2, n_pieces)
+        sheet_len[rows] = base_len
+        sheet_wid[rows] = style.width(L[rows], W[rows], H[rows], BL[rows], BW[rows])
+        pieces[rows] = n_pieces
+    return sheet_len + arr(cutting_plus, 0.0), sheet_wid + arr(decel_plus, 0.0), pieces
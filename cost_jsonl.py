@@ -0,0 +1,134 @@
+"""
+Streams box costings for nightly jobs: reads one JSON box spec per line (file or stdin),
+writes one JSON result per line to stdout, in input order, with constant memory.
+
+    python cost_jsonl.py specs.jsonl > costed.jsonl
+    cat specs.jsonl | python cost_jsonl.py --workers 4 > costed.jsonl
+
+Spec format: see modules/costing_service.py. An "id" in the spec is copied to the result.
+Masters (paper, operation, reel, transport, party price lists) are loaded once at start. Lines that fail produce
+{"line": n, "error": "..."} and the run continues; exit status 1 if any line failed.
+"""
+import sys
+import json
+import argparse
+from collections import deque
+
+from modules.master_cache import get_masters
+from modules.costing_service import SpecError, cost_specs
+
+BATCH_SIZE = 500 # Lines per unit of work
+
+RESULT_FIELDS = [
+    ("weight_kg", "box_weight"),
+    ("material_cost", "material_cost"),
+    ("conversion_cost", "conversion_cost"),
+    ("freight_cost", "freight_cost"),
+    ("cost_per_box", "cost_per_box"),
+    ("margin_percent", "margin_percent"),
+    ("suggested_rate", "selling_price"),
+    ("ups", "ups"),
+    ("reel_width", "reel_width"),
+    ("reel_wastage_pct", "reel_wastage_pct"),
+    ("bursting_strength", "bursting_strength"),
+    ("edge_crush", "edge_crush"),
+    ("bct_kgf", "box_compression"),
+]
+
+_masters = None # Set once per process (main or pool worker)
+
+def _init_worker(masters):
+    global _masters
+    _masters = masters
+
+def _round(value, digits):
+    return round(value, digits) if isinstance(value, float) else value
+
+def _cost_batch(batch, digits=4):
+    """batch: list of (line number, raw line). Returns (output text, error count)."""
+    specs = []
+    for line_no, raw in batch:
+        try:
+            specs.append(json.loads(raw))
+        except ValueError as e:
+            specs.append(e)
+    costed = iter(cost_specs([s for s in specs if not isinstance(s, ValueError)], _masters))
+
+    out = []
+    errors = 0
+    for (line_no, raw), spec in zip(batch, specs):
+        result = {"line": line_no}
+        if isinstance(spec, dict) and "id" in spec:
+            result["id"] = spec["id"]
+        costing = spec if isinstance(spec, ValueError) else next(costed)
+        if isinstance(costing, ValueError): # SpecError or bad JSON
+            result["error"] = str(costing) if isinstance(costing, SpecError) else f"Invalid JSON: {costing}"
+            errors += 1
+        else:
+            for name, key in RESULT_FIELDS:
+                result[name] = _round(costing[key], digits)
+            if costing["load_plan"]: # Spec asked for freight
+                result["vehicle"] = costing["load_plan"]["vehicle"]
+                result["trips"] = costing["load_plan"]["trips"]
+        out.append(json.dumps(result))
+    return "\n".join(out) + "\n", errors
+
+def _batches(lines):
+    batch = []
+    for line_no, raw in enumerate(lines, 1):
+        if raw.strip():
+            batch.append((line_no, raw))
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def run(lines, output, workers=1):
+    """Costs every spec line, writing results to `output` in input order. Returns error count."""
+    errors = 0
+    masters = get_masters()
+    if workers <= 1:
+        _init_worker(masters)
+        for batch in _batches(lines):
+            text, failed = _cost_batch(batch)
+            output.write(text)
+            errors += failed
+        return errors
+
+    import multiprocessing
+    # Bounded window of batches in flight: ordered output without reading the whole input
+    max_pending = workers * 4
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(masters,)) as pool:
+        pending = deque()
+        for batch in _batches(lines):
+            pending.append(pool.apply_async(_cost_batch, (batch,)))
+            if len(pending) >= max_pending:
+                text, failed = pending.popleft().get()
+                output.write(text)
+                errors += failed
+        while pending:
+            text, failed = pending.popleft().get()
+            output.write(text)
+            errors += failed
+    return errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost box specs from JSON Lines.")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file (default: stdin)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (output stays in input order)")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        errors = run(source, sys.stdout, args.workers)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    sys.stdout.flush()
+    if errors:
+        print(f"{errors} spec(s) failed", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Headless costing API for ERP integration. Runs next to the Streamlit app on the same
+database and master data (cached, reloaded when Masters change).
+
+    python costing_api.py --port 8502 --workers 16
+
+    GET  /health
+    GET  /masters[?party=name] papers, active operations, reel widths and flute profiles
+                               (with the party's negotiated rates in force)
+    POST /cost                 box spec -> costing
+    POST /cost/batch           {"items": [spec, ...]} -> {"results": [...]}
+    POST /optimize             {"ply", "layers": [paper names], "target_bs" and/or "target_bct"
+                               with "length", "width"} -> GSM per layer
+    POST /quotations           spec + "party" (+ "box_name") -> saved Draft quotation
+                               (specs with a "party" are costed at its negotiated rates)
+    GET  /changes?since=0&limit=500[&entity=quotations]
+                               change feed page: {"changes": [...], "next": cursor}
+
+Spec format: see modules/costing_service.py. If BOX_COSTING_API_KEY is set, requests
+must send it in the X-API-Key header.
+"""
+import os
+import json
+import logging
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from sqlalchemy.exc import IntegrityError
+
+from database import init_db, SessionLocal
+from modules.master_cache import get_masters
+from modules.costing_service import SpecError, cost_spec, cost_specs, optimize_spec, create_quotation
+from modules import changelog
+
+MAX_BODY_BYTES = 5_000_000
+MAX_BATCH = 1000
+IDLE_TIMEOUT = 15 # Seconds a keep-alive connection may sit idle before its worker thread is freed
+API_KEY = os.environ.get("BOX_COSTING_API_KEY")
+
+_save_lock = threading.Lock() # Quotation numbers are "last + 1": one save at a time per process
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer handing each connection to a fixed pool of worker threads."""
+    request_queue_size = 256
+    daemon_threads = True
+
+    def __init__(self, address, handler, workers):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="costing-api")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+def _cost_batch(body):
+    items = body.get("items") if isinstance(body, dict) else None
+    if not isinstance(items, list):
+        raise SpecError("'items' must be a list of specs")
+    if len(items) > MAX_BATCH:
+        raise SpecError(f"At most {MAX_BATCH} items per batch")
+    masters = get_masters() # One snapshot for the whole batch
+    results = cost_specs(items, masters) # One vectorized pass, mixed box styles included
+    return {"results": [{"error": str(r)} if isinstance(r, SpecError) else r for r in results]}
+
+def _optimize(body):
+    result = optimize_spec(body)
+    if result is None:
+        raise SpecError("No GSM combination meets the target BS")
+    return result
+
+def _create_quotation(body):
+    db = SessionLocal()
+    try:
+        with _save_lock:
+            quotation, result = create_quotation(db, body)
+        return {
+            "id": quotation.id,
+            "quotation_number": quotation.quotation_number,
+            "status": quotation.status,
+            "total_amount": quotation.total_amount,
+            "item": result,
+        }
+    finally:
+        db.close()
+
+def _masters(params):
+    m = get_masters(party=params.get("party"))
+    return {
+        "version": m.version,
+        "papers": [{"name": p.name, "rate": p.rate, "bf": p.bf, "sct_index": p.sct_index} for p in m.papers.values()],
+        "operations": [{"name": o.name, "rate": o.rate, "unit": o.unit, "slabs": o.slabs, "min_charge": o.min_charge}
+                       for o in m.operations],
+        "reel_widths": m.reel_widths,
+        "flutes": [{"name": f.name, "take_up": f.take_up, "caliper_mm": f.caliper_mm} for f in m.flutes.values()],
+        "vehicles": [v._asdict() for v in m.vehicles],
+        "pallets": [p._asdict() for p in m.pallets.values()],
+    }
+
+def _changes(params):
+    try:
+        since = int(params.get("since", 0))
+        limit = min(int(params.get("limit", changelog.DEFAULT_PAGE_SIZE)), 5000)
+    except ValueError:
+        raise SpecError("'since' and 'limit' must be integers")
+    entity = params.get("entity")
+    db = SessionLocal()
+    try:
+        changes, cursor = changelog.changes_since(db, since, limit, [entity] if entity else None)
+    finally:
+        db.close()
+    return {"changes": changes, "next": cursor}
+
+ROUTES = {
+    ("GET", "/health"): lambda _: {"status": "ok"},
+    ("GET", "/masters"): _masters,
+    ("POST", "/cost"): cost_spec,
+    ("POST", "/cost/batch"): _cost_batch,
+    ("POST", "/optimize"): _optimize,
+    ("POST", "/quotations"): _create_quotation,
+    ("GET", "/changes"): _changes,
+}
+
+class CostingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive: ERP clients reuse connections
+    disable_nagle_algorithm = True # Headers and body are separate writes; don't wait 40 ms for an ACK
+    timeout = IDLE_TIMEOUT # Each connection holds a pool thread: idle clients must not hold them all
+    quiet = True
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, allow_nan=False).encode("utf-8") # NaN / Infinity aren't JSON
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        route = ROUTES.get((method, url.path.rstrip("/") or "/"))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return self._send(413, {"error": "Request body too large"})
+        raw = self.rfile.read(length) if length else b""
+
+        if API_KEY and self.headers.get("X-API-Key") != API_KEY:
+            return self._send(401, {"error": "Missing or wrong X-API-Key"})
+        if route is None:
+            return self._send(404, {"error": f"No route {method} {self.path}"})
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            return self._send(400, {"error": "Body is not valid JSON"})
+        if method == "GET":
+            body = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        changelog.set_current_user("api")
+
+        try:
+            self._send(200, route(body))
+        except SpecError as e:
+            self._send(400, {"error": str(e)})
+        except IntegrityError:
+            self._send(409, {"error": "Quotation number taken by a concurrent save, retry"})
+        except Exception:
+            logging.exception(f"Costing API error on {method} {self.path}")
+            self._send(500, {"error": "Internal error"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless box costing HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Use 0.0.0.0 to accept ERP calls from the LAN")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--workers", type=int, default=16, help="Worker threads (concurrent connections served)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    logging.basicConfig(filename="error.log", level=logging.ERROR,
+                        format='%(asctime)s %(levelname)s:%(message)s')
+    init_db()
+    get_masters() # Load masters before the first request
+    CostingHandler.quiet = not args.verbose
+
+    server = PooledHTTPServer((args.host, args.port), CostingHandler, args.workers)
+    print(f"Costing API on http://{args.host}:{args.port} with {args.workers} workers (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
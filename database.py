@@ -5,7 +5,9 @@ from sqlalchemy.ext.declarative import declarative_base
 import os
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'box_costing.db')}"
+# BOX_COSTING_DB points the app (or a benchmark run) at another database file
+DB_PATH = os.environ.get("BOX_COSTING_DB") or os.path.join(BASE_DIR, 'box_costing.db')
+DATABASE_URL = f"sqlite:///{DB_PATH}"
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -21,3 +23,48 @@ def get_db():
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _create_item_rtree()
+
+# R*Tree over item size / ply / quantity for range filters (Reports). Triggers keep it in
+# step with quotation_items for every writer (ORM, bulk inserts, archive, replication).
+ITEM_RTREE = "quotation_items_rtree"
+_RTREE_VALUES = "COALESCE({p}.length, 0), COALESCE({p}.length, 0), COALESCE({p}.width, 0), COALESCE({p}.width, 0), " \
+                "COALESCE({p}.height, 0), COALESCE({p}.height, 0), COALESCE({p}.ply, 0), COALESCE({p}.ply, 0), " \
+                "COALESCE({p}.quantity, 0), COALESCE({p}.quantity, 0)"
+
+def _create_item_rtree():
+    from sqlalchemy import inspect, text
+    if ITEM_RTREE in inspect(engine).get_table_names():
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE VIRTUAL TABLE {ITEM_RTREE} USING rtree(id, min_length, max_length, "
+                          "min_width, max_width, min_height, max_height, min_ply, max_ply, min_quantity, max_quantity)"))
+        conn.execute(text(f"CREATE TRIGGER {ITEM_RTREE}_insert AFTER INSERT ON quotation_items BEGIN "
+                          f"INSERT INTO {ITEM_RTREE} VALUES (NEW.id, {_RTREE_VALUES.format(p='NEW')}); END"))
+        conn.execute(text(f"CREATE TRIGGER {ITEM_RTREE}_update AFTER UPDATE OF id, length, width, height, ply, quantity "
+                          f"ON quotation_items BEGIN DELETE FROM {ITEM_RTREE} WHERE id = OLD.id; "
+                          f"INSERT INTO {ITEM_RTREE} VALUES (NEW.id, {_RTREE_VALUES.format(p='NEW')}); END"))
+        conn.execute(text(f"CREATE TRIGGER {ITEM_RTREE}_delete AFTER DELETE ON quotation_items BEGIN "
+                          f"DELETE FROM {ITEM_RTREE} WHERE id = OLD.id; END"))
+        # Existing items (one-off, when the index is first created)
+        conn.execute(text(f"INSERT INTO {ITEM_RTREE} SELECT i.id, {_RTREE_VALUES.format(p='i')} FROM quotation_items i"))
+
+def _add_missing_columns(bind=None, tables=None):
+    """
+    create_all() only creates missing tables. Columns and indexes added to a model
+    after its table already existed are added here (SQLite ALTER TABLE ADD COLUMN).
+    bind / tables: another database (e.g. a yearly archive) and the tables it holds.
+    """
+    from sqlalchemy import inspect, text
+    bind = bind or engine
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in tables or Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for col in table.columns:
+                if col.name not in existing:
+                    col_type = col.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{col.name}" {col_type}'))
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
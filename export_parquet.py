@@ -0,0 +1,18 @@
+import argparse
+from database import init_db
+from modules.parquet_export import export_parquet, EXPORT_DIR
+
+def main():
+    parser = argparse.ArgumentParser(description="Append changed quotations, items, parties and rate history to Parquet files.")
+    parser.add_argument("--out", default=EXPORT_DIR, help=f"Export folder (default {EXPORT_DIR})")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and export every row again")
+    args = parser.parse_args()
+
+    init_db()
+    counts = export_parquet(args.out, full=args.full)
+    for table, n in counts.items():
+        print(f"{table:24} {n} row(s)")
+    print(f"Written to {args.out}. Read with e.g. pandas.read_parquet('{args.out}/quotations').")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import math
+from collections import namedtuple
+
+# Truck-load and pallet planning, and the freight per box that follows from the
+# party's transport logic (Party.transport_rate_logic):
+#   per_kg   - the vehicle's rate per kg x shipped weight of a box (incl. its share of the pallet)
+#   per_trip - trips needed for the order x the vehicle's rate per trip / quantity
+#   fixed    - the party's transport_rate (per order) / quantity
+# Vehicles without a rate for the logic are left out (they would cost nothing and
+# always come out cheapest).
+#
+# Packing is a layer heuristic: for each way a box can stand, the floor of the space
+# gets the best two-block layout (a grid, then the strip it leaves filled with the boxes
+# turned 90°) and the layers stack to the height; the payload caps the count. Loaded
+# pallets stay upright and are packed into the vehicle the same way. One vehicle type
+# per order; all sizes in mm.
+
+Vehicle = namedtuple("Vehicle", "id name length_mm width_mm height_mm max_kg rate_per_trip rate_per_kg")
+Pallet = namedtuple("Pallet", "id name length_mm width_mm deck_height_mm max_height_mm max_kg tare_kg")
+
+TRANSPORT_LOGICS = ("per_kg", "per_trip", "fixed")
+RATE_FIELDS = {"per_kg": "rate_per_kg", "per_trip": "rate_per_trip"} # Vehicle rate each logic charges
+
+# Seeded into the Transport master on first visit (rates are placeholders to edit)
+DEFAULT_VEHICLES = [
+    # name, cargo length, width, height, payload kg, ₹/trip, ₹/kg
+    ("Tempo 8 ft", 2440, 1520, 1520, 1200, 1500.0, 2.0),
+    ("Truck 14 ft", 4270, 1830, 1830, 4000, 4000.0, 1.5),
+    ("Truck 19 ft", 5790, 2130, 2130, 7000, 7000.0, 1.2),
+    ("Container 32 ft", 9750, 2440, 2440, 7500, 14000.0, 1.0),
+]
+DEFAULT_PALLETS = [
+    # name, length, width, deck height, max loaded height, max load kg, tare kg
+    ("Standard 1200 x 1000", 1200, 1000, 150, 1500, 1000, 25.0),
+]
+
+def shipping_size(box_style, joint_type, length, width, height, piece_length, piece_width, caliper_mm, flat=True):
+    """
+    One box as shipped (a, b, c) in mm. Erected: the inner size plus the board. Flat:
+    slotted 1PC boxes fold once along the glued joint (half the piece, two boards thick);
+    other styles go as their unfolded pieces, stacked. piece_*: one piece's cutting size.
+    """
+    from box_styles import get_style
+    style = get_style(box_style)
+    if not flat:
+        return length + 2 * caliper_mm, width + 2 * caliper_mm, height + 2 * caliper_mm
+    if style.split and joint_type == "1PC":
+        return piece_length / 2, piece_width, 2 * caliper_mm
+    pieces = style.pieces * (2 if joint_type == "2PC" and style.split else 1)
+    return piece_length, piece_width, pieces * caliper_mm
+
+def floor_fit(x, y, length, width):
+    """
+    Most x * y rectangles on a length * width floor: n columns as given, then the rest
+    of the length with the rectangles turned 90°; every n, both ways round (numpy).
+    """
+    import numpy as np
+    best = 0
+    for a, b in ((x, y), (y, x)):
+        if a > length or b > width:
+            continue
+        n = np.arange(int(length // a) + 1)
+        rest = length - n * a
+        count = n * int(width // b) + (rest // b).astype(int) * int(width // a)
+        best = max(best, int(count.max()))
+    return best
+
+def fit_boxes(item, space, item_kg, max_kg=None, upright=False):
+    """
+    Most `item` cuboids (a, b, c) in `space` (length, width, height) under max_kg.
+    upright: c stays vertical. Returns {"count", "per_layer", "layers", "vertical",
+    "limited_by"} ("space" or "weight"); count 0 if one doesn't fit.
+    """
+    a, b, c = item
+    stands = [(a, b, c)] if upright else [(a, b, c), (a, c, b), (b, c, a)]
+    best = {"count": 0, "per_layer": 0, "layers": 0, "vertical": c, "limited_by": "space"}
+    by_weight = math.floor(max_kg / item_kg) if max_kg and item_kg > 0 else None
+    for x, y, v in stands:
+        if min(x, y, v) <= 0 or v > space[2]:
+            continue
+        per_layer = floor_fit(x, y, space[0], space[1])
+        layers = int(space[2] // v)
+        count = per_layer * layers
+        limited_by = "space"
+        if by_weight is not None and by_weight < count:
+            count, limited_by = by_weight, "weight"
+        if count > best["count"]:
+            best = {"count": count, "per_layer": per_layer, "layers": layers, "vertical": v, "limited_by": limited_by}
+    return best
+
+def plan_load(item, item_kg, vehicle, pallet=None):
+    """
+    Boxes per pallet (if palletised) and per vehicle. Returns {"boxes_per_pallet",
+    "pallets_per_vehicle", "boxes_per_vehicle", "kg_per_vehicle", "limited_by"}, or
+    None if a box (or a loaded pallet) doesn't fit.
+    """
+    truck = (vehicle.length_mm, vehicle.width_mm, vehicle.height_mm)
+    if pallet is None:
+        loose = fit_boxes(item, truck, item_kg, vehicle.max_kg)
+        if not loose["count"]:
+            return None
+        return {"boxes_per_pallet": None, "pallets_per_vehicle": None, "boxes_per_vehicle": loose["count"],
+                "kg_per_vehicle": loose["count"] * item_kg, "limited_by": loose["limited_by"]}
+
+    stack_room = min(pallet.max_height_mm, vehicle.height_mm) - pallet.deck_height_mm
+    on_pallet = fit_boxes(item, (pallet.length_mm, pallet.width_mm, stack_room), item_kg, pallet.max_kg)
+    if not on_pallet["count"]:
+        return None
+    # A part layer (weight-limited) still takes the full load height
+    load = (pallet.length_mm, pallet.width_mm,
+            pallet.deck_height_mm + math.ceil(on_pallet["count"] / on_pallet["per_layer"]) * on_pallet["vertical"])
+    pallet_kg = on_pallet["count"] * item_kg + (pallet.tare_kg or 0)
+    pallets = fit_boxes(load, truck, pallet_kg, vehicle.max_kg, upright=True)
+    if not pallets["count"]:
+        return None
+    return {"boxes_per_pallet": on_pallet["count"], "pallets_per_vehicle": pallets["count"],
+            "boxes_per_vehicle": pallets["count"] * on_pallet["count"], "kg_per_vehicle": pallets["count"] * pallet_kg,
+            "limited_by": pallets["limited_by"] if pallets["limited_by"] == "weight" else on_pallet["limited_by"]}
+
+def freight_per_box(plan, vehicle, logic, quantity, item_kg, pallet=None, fixed_amount=None):
+    """Freight per box (₹) for one load plan under the party's transport logic."""
+    if logic not in TRANSPORT_LOGICS:
+        raise ValueError(f"Unknown transport logic '{logic}'. Known: {', '.join(TRANSPORT_LOGICS)}")
+    if quantity <= 0:
+        return 0.0
+    if logic == "fixed":
+        return (fixed_amount or 0.0) / quantity
+    if logic == "per_kg":
+        tare_share = (pallet.tare_kg or 0) / plan["boxes_per_pallet"] if pallet else 0.0
+        return (item_kg + tare_share) * (vehicle.rate_per_kg or 0.0)
+    return math.ceil(quantity / plan["boxes_per_vehicle"]) * (vehicle.rate_per_trip or 0.0) / quantity
+
+def plan_freight(item, item_kg, quantity, vehicles, logic, pallet=None, fixed_amount=None):
+    """
+    Load plan and freight for every vehicle the box fits in and that has a rate for
+    `logic`, cheapest first (then fewest trips). Each entry: plan_load() fields plus "vehicle", "trips",
+    "freight_per_box" and "freight_total".
+    """
+    options = []
+    for vehicle in vehicles:
+        if logic in RATE_FIELDS and not getattr(vehicle, RATE_FIELDS[logic]):
+            continue
+        plan = plan_load(item, item_kg, vehicle, pallet)
+        if plan is None:
+            continue
+        per_box = freight_per_box(plan, vehicle, logic, quantity, item_kg, pallet, fixed_amount)
+        plan.update(vehicle=vehicle.name, trips=math.ceil(quantity / plan["boxes_per_vehicle"]),
+                    freight_per_box=per_box, freight_total=per_box * quantity)
+        options.append(plan)
+    options.sort(key=lambda o: (round(o["freight_per_box"], 6), o["trips"]))
+    return options
@@ -1,3 +1,5 @@
+import math
+
 def calculate_sheet_weight(length_mm, width_mm, gsm):
     """
     Calculate weight of a single sheet.
@@ -28,3 +30,384 @@ def calculate_selling_price(total_cost, margin_percent):
     if margin_percent >= 100:
         return 0 # Avoid division by zero or negative
     return total_cost / (1 - (margin_percent / 100))
+
+# Standard trim allowance on the corrugator deckle
+REEL_TRIM_ALLOWANCE_MM = 50
+
+def suggest_reel(sheet_width_mm, reel_widths_inch, ups=1, trim_allowance_mm=REEL_TRIM_ALLOWANCE_MM):
+    """
+    Smallest reel (inch) that fits `ups` sheets side-by-side plus trim allowance.
+    reel_widths_inch must be sorted ascending.
+    Returns (reel_width_inch, wastage_pct) or (None, 100.0) if no reel fits.
+    """
+    deckle_mm = sheet_width_mm * ups
+    min_reel_inch = (deckle_mm + trim_allowance_mm) / 25.4
+    for reel in reel_widths_inch:
+        if reel >= min_reel_inch:
+            reel_mm = reel * 25.4
+            return reel, (reel_mm - deckle_mm) / reel_mm * 100
+    return None, 100.0
+
+def suggest_reels(sheet_widths_mm, reel_widths_inch, ups=1, trim_allowance_mm=REEL_TRIM_ALLOWANCE_MM):
+    """
+    Vectorized suggest_reel for many sheet widths at once (np.searchsorted).
+    Returns (reel_width_inch, wastage_pct) arrays; NaN where no reel fits.
+    """
+    import numpy as np
+    reels = np.sort(np.asarray(reel_widths_inch, dtype=float))
+    deckle_mm = np.asarray(sheet_widths_mm, dtype=float) * ups
+    min_reel_inch = (deckle_mm + trim_allowance_mm) / 25.4
+    if len(reels) == 0:
+        nan = np.full(deckle_mm.shape, np.nan)
+        return nan, nan.copy()
+
+    idx = np.searchsorted(reels, min_reel_inch, side="left")
+    fits = (idx < len(reels)) & ~np.isnan(min_reel_inch)
+    reel = np.where(fits, reels[np.minimum(idx, len(reels) - 1)], np.nan)
+    reel_mm = reel * 25.4
+    wastage = (reel_mm - deckle_mm) / reel_mm * 100
+    return reel, wastage
+
+# Layer names per ply, top to bottom
+LAYER_NAMES = {
+    3: ["Top Liner", "Flute", "Bottom Liner"],
+    5: ["Top Liner", "Flute 1", "Middle Liner", "Flute 2", "Bottom Liner"],
+    7: ["Top Liner", "Flute 1", "Middle Liner 1", "Flute 2", "Middle Liner 2", "Flute 3", "Bottom Liner"],
+    9: ["Top Liner", "Flute 1", "Middle Liner 1", "Flute 2", "Middle Liner 2", "Flute 3", "Middle Liner 3", "Flute 4", "Bottom Liner"],
+}
+
+# GSMs tried by the optimizer
+STANDARD_GSMS = [80, 100, 120, 140, 150, 180, 200, 230, 250]
+
+def get_layer_names(ply):
+    return list(LAYER_NAMES.get(ply, []))
+
+def calculate_sheet_size(length, width, height, box_style="RSC", joint_type="1PC", cutting_plus=0.0, decel_plus=0.0,
+                         blank_length=None, blank_width=None):
+    """
+    Cutting size of one piece, in the same unit as the box dimensions, from the box
+    style's formulas (see box_styles). RSC 1PC: (L + W) * 2 + Cutting by H + W + Decel.
+    Returns (sheet_length, sheet_width, sheets_per_box).
+    """
+    from box_styles import sheet_size
+    return sheet_size(box_style, length, width, height, joint_type, cutting_plus, decel_plus, blank_length, blank_width)
+
+def layer_bursting_strength(bf, gsm):
+    # BS = BF * GSM / 1000
+    return (bf * gsm) / 1000
+
+def calculate_board(layers, flute_factor):
+    """
+    layers: list of {layer, paper, gsm, rate, bf}, flute layers optionally with their
+    profile {flute, take_up, caliper_mm}. Flute layers without a take-up use flute_factor.
+    Returns (total_effective_gsm, material_cost_per_sqm, bursting_strength, layer_details)
+    where material_cost_per_sqm = sum(effective GSM * rate) (divide by 1000 for kg).
+    """
+    total_effective_gsm = 0.0
+    material_cost_per_sqm = 0.0
+    bursting_strength = 0.0
+    layer_details = []
+    for l in layers:
+        ff = (l.get("take_up") or flute_factor) if "Flute" in l["layer"] else 1.0
+        effective_gsm = l["gsm"] * ff
+        total_effective_gsm += effective_gsm
+        material_cost_per_sqm += effective_gsm * l["rate"]
+        bursting_strength += layer_bursting_strength(l["bf"], l["gsm"])
+        detail = {
+            "layer": l["layer"],
+            "paper": l["paper"],
+            "gsm": l["gsm"],
+            "bf": l["bf"],
+            "flute_factor": ff # Needed to re-cost at historical rates
+        }
+        if l.get("flute"):
+            detail["flute"] = l["flute"]
+        layer_details.append(detail)
+    return total_effective_gsm, material_cost_per_sqm, bursting_strength, layer_details
+
+# Flute profiles (Masters > Flute Profiles): take-up factor and board caliper per wall
+DEFAULT_FLUTES = {"A": (1.54, 4.8), "C": (1.45, 4.0), "B": (1.32, 3.0), "E": (1.25, 1.6), "F": (1.20, 0.8)}
+DEFAULT_CALIPER_MM = 4.0 # Flute layers costed with the free-form factor only (C flute)
+
+# Stacking strength. Edge crush from the papers' short-span compression (SCT):
+#   ECT (kN/m) = ECT_K * sum(SCT * take-up), SCT (kN/m) = SCT index (N.m/g) * GSM / 1000
+# Papers without an SCT index get SCT_PER_BF x BF. Box compression, simplified McKee:
+#   BCT (N) = MCKEE_K * ECT (N/mm) * sqrt(caliper (mm) * box perimeter (mm))
+ECT_K = 0.75
+SCT_PER_BF = 1.1
+MCKEE_K = 5.87
+KGF = 9.80665 # N per kgf
+
+def layer_sct(sct_index, bf, gsm):
+    return (sct_index or SCT_PER_BF * bf) * gsm / 1000
+
+def board_ect(layers, flute_factor=1.40):
+    """Edge crush (kN/m = N/mm) of layers as passed to calculate_board (plus optional sct_index)."""
+    total = 0.0
+    for l in layers:
+        ff = (l.get("take_up") or flute_factor) if "Flute" in l["layer"] else 1.0
+        total += layer_sct(l.get("sct_index"), l["bf"], l["gsm"]) * ff
+    return ECT_K * total
+
+def board_caliper(layers):
+    """Board thickness (mm): sum of the flute walls' calipers."""
+    return sum(l.get("caliper_mm") or DEFAULT_CALIPER_MM for l in layers if "Flute" in l["layer"])
+
+def mckee_bct(ect, caliper_mm, perimeter_mm):
+    """Box compression (kgf) from edge crush (kN/m), board caliper and box perimeter 2(L+W)."""
+    return MCKEE_K * ect * math.sqrt(max(caliper_mm * perimeter_mm, 0.0)) / KGF
+
+def ect_for_bct(bct_kgf, caliper_mm, perimeter_mm):
+    """Edge crush (kN/m) a board needs to reach bct_kgf: McKee solved for ECT."""
+    root = math.sqrt(caliper_mm * perimeter_mm) if caliper_mm > 0 and perimeter_mm > 0 else 0.0
+    return bct_kgf * KGF / (MCKEE_K * root) if root else float("inf")
+
+def calculate_conversion_cost(operations, box_weight_kg, quantity=1000, area_sqm=0.0, sheets=1.0, colours=0):
+    """
+    operations: list of (name, rate, unit[, slabs, min_charge]), unit one of
+    operation_rules.DRIVERS (per_kg, per_sq_meter, per_box, per_sheet, per_colour, fixed).
+    area_sqm / sheets: board and sheets of one box. Minimum charge top-ups count as fixed.
+    Returns (variable_cost_per_box, fixed_cost_per_order, breakdown) with breakdown a
+    list of {operation, unit, rate, cost_per_box}.
+    """
+    from operation_rules import conversion_costs
+    variable, fixed, breakdown = conversion_costs([operations], box_weight_kg, area_sqm, sheets, colours, quantity,
+                                                  details=True)
+    return float(variable[0]), float(fixed[0]), breakdown[0]
+
+def suggested_margin(quantity):
+    """Default margin % by order quantity."""
+    if quantity <= 1000:
+        return 35.0
+    elif quantity <= 2000:
+        return 30.0
+    elif quantity <= 5000:
+        return 25.0
+    return 20.0
+
+OPTIMIZER_CHUNK = 200_000 # Combinations evaluated per numpy block
+
+def optimize_gsm(layer_configs, target_bs, standard_gsms=STANDARD_GSMS, progress=None, min_ect=None):
+    """
+    Cheapest GSM per layer meeting target_bs (and min_ect, kN/m, if given), trying every
+    combination. layer_configs: list of {layer, bf, rate, flute_factor, sct_index}.
+    Combinations are enumerated in itertools.product order as numpy blocks, so ties
+    resolve to the same combination as a plain loop. progress(fraction) is called per
+    block. Returns (best_combo, cost_indicator) or (None, inf).
+    """
+    import numpy as np
+    n_layers = len(layer_configs)
+    gsms = np.asarray(standard_gsms, dtype=float)
+    base = len(gsms)
+    total_combos = base ** n_layers
+    powers = base ** np.arange(n_layers - 1, -1, -1) # First layer is the slowest-changing digit
+    bs_weight = np.array([cfg["bf"] for cfg in layer_configs], dtype=float) / 1000
+    cost_weight = np.array([cfg["flute_factor"] * cfg["rate"] for cfg in layer_configs], dtype=float)
+    ect_weight = np.array([ECT_K * layer_sct(cfg.get("sct_index"), cfg["bf"], 1.0) * cfg["flute_factor"]
+                           for cfg in layer_configs], dtype=float)
+
+    best_combo = None
+    min_cost = float('inf')
+    for lo in range(0, total_combos, OPTIMIZER_CHUNK):
+        if progress:
+            progress(min(lo / total_combos, 1.0))
+        idx = np.arange(lo, min(lo + OPTIMIZER_CHUNK, total_combos))
+        combos = gsms[(idx[:, None] // powers) % base] # (block x layers)
+        cost = combos @ cost_weight
+        ok = combos @ bs_weight >= target_bs
+        if min_ect is not None:
+            ok &= combos @ ect_weight >= min_ect
+        if not ok.any():
+            continue
+        cost = np.where(ok, cost, np.inf)
+        best = int(cost.argmin()) # First minimum, like the strict < of a loop
+        if cost[best] < min_cost:
+            min_cost = float(cost[best])
+            best_combo = tuple(standard_gsms[d] for d in (idx[best] // powers) % base)
+    return best_combo, min_cost
+
+def cost_box(length_mm, width_mm, height_mm, layers, operations, quantity=1000, flute_factor=1.40,
+             wastage_pct=5.0, box_style="RSC", joint_type="1PC", cutting_plus_mm=40.0,
+             decel_plus_mm=0.0, margin_percent=None, reel_widths=None, blank_length_mm=None, blank_width_mm=None,
+             max_sheet_mm=None, freight=None, colours=0):
+    """
+    Full costing of one box outside the UI (benchmarks, scripts), same formulas as the calculator.
+    layers: list of {layer, paper, gsm, rate, bf} (see calculate_board); operations: list of (name, rate, unit).
+    max_sheet_mm: (length, width) to run the best multi-up layout (nesting.nest) on sheets
+    up to that size; the piece stays 1-up if it doesn't fit.
+    freight: {"logic", "vehicles", "pallet", "flat", "fixed_amount"} to add transport per
+    box from the cheapest load plan (load_plan.plan_freight). colours: print colours
+    (per_colour operations).
+    Returns a dict with the QuotationItem cost fields (incl. layer_details and
+    operation_details) plus edge_crush (kN/m),
+    box_compression (McKee BCT, kgf), ups, layout and load_plan (None: no freight, or the
+    box fits no vehicle).
+    """
+    sheet_length, sheet_width, sheets_per_box = calculate_sheet_size(
+        length_mm, width_mm, height_mm, box_style, joint_type, cutting_plus_mm, decel_plus_mm,
+        blank_length_mm, blank_width_mm)
+    piece_length, piece_width = sheet_length, sheet_width
+    ups, layout = 1, None
+    if max_sheet_mm:
+        sheet_length, sheet_width, sheets_per_box, ups, layout = _multi_up(
+            sheet_length, sheet_width, sheets_per_box, max_sheet_mm, reel_widths)
+    total_effective_gsm, cost_per_sqm, bs, layer_details = calculate_board(layers, flute_factor)
+
+    area_sqm = (sheet_length * sheet_width) / 1_000_000
+    box_weight = calculate_sheet_weight(sheet_length, sheet_width, total_effective_gsm) * sheets_per_box * (1 + wastage_pct/100)
+    material_cost = (area_sqm * cost_per_sqm) / 1000 * sheets_per_box * (1 + wastage_pct/100)
+
+    variable_cost, fixed_cost, operation_details = calculate_conversion_cost(
+        operations, box_weight, quantity, area_sqm * sheets_per_box * (1 + wastage_pct/100), sheets_per_box, colours)
+    conversion_cost = variable_cost + (fixed_cost / quantity if quantity > 0 else 0)
+    freight_cost, load_plan = 0.0, None
+    if freight:
+        freight_cost, load_plan = _freight(freight, box_style, joint_type, length_mm, width_mm, height_mm,
+                                           piece_length, piece_width, layers, box_weight / (1 + wastage_pct/100), quantity)
+    cost_per_box = material_cost + conversion_cost + freight_cost
+
+    if margin_percent is None:
+        margin_percent = suggested_margin(quantity)
+    reel_width, reel_wastage_pct = suggest_reel(sheet_width, reel_widths) if reel_widths else (None, None)
+    ect = board_ect(layers, flute_factor)
+    bct = mckee_bct(ect, board_caliper(layers), 2 * (length_mm + width_mm))
+
+    return {
+        "sheet_length": sheet_length,
+        "sheet_width": sheet_width,
+        "ups": ups,
+        "layout": layout,
+        "reel_width": reel_width,
+        "reel_wastage_pct": reel_wastage_pct if reel_width else None,
+        "box_weight": box_weight,
+        "bursting_strength": bs,
+        "edge_crush": ect,
+        "box_compression": bct,
+        "material_cost": material_cost,
+        "conversion_cost": conversion_cost,
+        "freight_cost": freight_cost,
+        "load_plan": load_plan,
+        "cost_per_box": cost_per_box,
+        "margin_percent": margin_percent,
+        "selling_price": calculate_selling_price(cost_per_box, margin_percent),
+        "layer_details": layer_details,
+        "operation_details": operation_details,
+    }
+
+def _multi_up(sheet_length, sheet_width, sheets_per_box, max_sheet_mm, reel_widths):
+    """Best layout of the piece: (sheet_length, sheet_width, sheets_per_box, ups, layout)."""
+    from nesting import nest
+    layouts = nest(sheet_length, sheet_width, *max_sheet_mm, reel_widths=reel_widths, top=1)
+    if not layouts:
+        return sheet_length, sheet_width, sheets_per_box, 1, None
+    best = layouts[0]
+    return best["sheet_length"], best["sheet_width"], sheets_per_box / best["ups"], best["ups"], best["layout"]
+
+def _freight(freight, box_style, joint_type, length, width, height, piece_length, piece_width, layers, box_kg, quantity):
+    """Cheapest load plan of the box as shipped: (freight per box, plan), (0, None) if it fits no vehicle."""
+    from load_plan import shipping_size, plan_freight
+    item = shipping_size(box_style, joint_type, length, width, height, piece_length, piece_width,
+                         board_caliper(layers), freight.get("flat", True))
+    options = plan_freight(item, box_kg, quantity, freight["vehicles"], freight["logic"], freight.get("pallet"),
+                           freight.get("fixed_amount"))
+    if not options:
+        return 0.0, None
+    return options[0]["freight_per_box"], options[0]
+
+def cost_boxes(specs):
+    """
+    Vectorized cost_box for a batch: `specs` is a list of cost_box keyword dicts (mixed
+    box styles allowed). Sheet sizes, weights, costs, operations (operation_rules) and
+    reels are computed as numpy arrays in one pass; only the layer sums loop in Python.
+    Returns a list of cost_box result dicts in the same order.
+    """
+    import numpy as np
+    from box_styles import sheet_sizes
+    from operation_rules import conversion_costs
+    n = len(specs)
+    if n == 0:
+        return []
+
+    # One pass over the specs: numeric columns, styles and board sums
+    rows, styles, joints, boards = [], [], [], []
+    for s in specs:
+        board = calculate_board(s["layers"], s.get("flute_factor", 1.40))
+        ect = board_ect(s["layers"], s.get("flute_factor", 1.40))
+        boards.append(board + (ect, mckee_bct(ect, board_caliper(s["layers"]), 2 * (s["length_mm"] + s["width_mm"]))))
+        margin = s.get("margin_percent")
+        rows.append((s["length_mm"], s["width_mm"], s["height_mm"], s.get("cutting_plus_mm", 40.0),
+                     s.get("decel_plus_mm", 0.0), s.get("blank_length_mm"), s.get("blank_width_mm"),
+                     s.get("wastage_pct", 5.0), s.get("quantity", 1000), board[0], board[1],
+                     s.get("colours", 0), np.nan if margin is None else margin))
+        styles.append(s.get("box_style", "RSC"))
+        joints.append(s.get("joint_type", "1PC"))
+    (L, W, H, cutting, decel, blank_l, blank_w, wastage_pct, quantity, total_gsm, cost_per_sqm,
+     colours, margin) = np.array(rows, dtype=float).T # None -> NaN
+
+    sheet_length, sheet_width, sheets_per_box = sheet_sizes(styles, L, W, H, joints, cutting, decel, blank_l, blank_w)
+    sheets_per_box = sheets_per_box.astype(float)
+    piece_length, piece_width = sheet_length.copy(), sheet_width.copy()
+    ups, layouts = [1] * n, [None] * n
+    for i, s in enumerate(specs): # Multi-up layouts: a layout search per spec that asks for one
+        if s.get("max_sheet_mm"):
+            sheet_length[i], sheet_width[i], sheets_per_box[i], ups[i], layouts[i] = _multi_up(
+                sheet_length[i], sheet_width[i], sheets_per_box[i], s["max_sheet_mm"], s.get("reel_widths"))
+    wastage = 1 + wastage_pct / 100
+    area_sqm = sheet_length * sheet_width / 1_000_000
+    box_weight = area_sqm * total_gsm / 1000 * sheets_per_box * wastage
+    material_cost = area_sqm * cost_per_sqm / 1000 * sheets_per_box * wastage
+    variable, fixed, operation_details = conversion_costs(
+        [s["operations"] for s in specs], box_weight, area_sqm * sheets_per_box * wastage, sheets_per_box, colours,
+        quantity, details=True)
+    fixed_per_box = np.divide(fixed, quantity, out=np.zeros(n), where=quantity > 0)
+    conversion_cost = variable + fixed_per_box
+    freight_cost, load_plans = np.zeros(n), [None] * n
+    for i, s in enumerate(specs): # Load planning per spec that asks for freight
+        if s.get("freight"):
+            freight_cost[i], load_plans[i] = _freight(
+                s["freight"], styles[i], joints[i], L[i], W[i], H[i], piece_length[i], piece_width[i],
+                s["layers"], box_weight[i] / wastage[i], int(quantity[i]))
+    cost_per_box = material_cost + conversion_cost + freight_cost
+
+    # suggested_margin() where no margin was given
+    default_margin = np.select([quantity <= 1000, quantity <= 2000, quantity <= 5000], [35.0, 30.0, 25.0], 20.0)
+    margin = np.where(np.isnan(margin), default_margin, margin)
+    selling_price = np.where(margin >= 100, 0.0, cost_per_box / (1 - np.minimum(margin, 99.999) / 100))
+
+    # Reels: one searchsorted per distinct reel list (normally one per batch)
+    reel = np.full(n, np.nan)
+    reel_wastage = np.full(n, np.nan)
+    groups = {}
+    for i, s in enumerate(specs):
+        if s.get("reel_widths"):
+            groups.setdefault(tuple(s["reel_widths"]), []).append(i)
+    for reels, rows in groups.items():
+        reel[rows], reel_wastage[rows] = suggest_reels(sheet_width[rows], list(reels))
+
+    # Back to Python floats column by column (NaN reel -> None, like cost_box)
+    reel = np.where(np.isnan(reel), None, reel).tolist()
+    reel_wastage = np.where(np.isnan(reel_wastage), None, reel_wastage).tolist()
+    columns = zip(sheet_length.tolist(), sheet_width.tolist(), ups, layouts, reel, reel_wastage, box_weight.tolist(),
+                  material_cost.tolist(), conversion_cost.tolist(), freight_cost.tolist(), load_plans,
+                  cost_per_box.tolist(), margin.tolist(), selling_price.tolist(), boards, operation_details)
+    return [{
+        "sheet_length": sl,
+        "sheet_width": sw,
+        "ups": up,
+        "layout": lay,
+        "reel_width": rw,
+        "reel_wastage_pct": rwp,
+        "box_weight": bw,
+        "bursting_strength": board[2],
+        "edge_crush": board[4],
+        "box_compression": board[5],
+        "material_cost": mc,
+        "conversion_cost": cc,
+        "freight_cost": fc,
+        "load_plan": lp,
+        "cost_per_box": cpb,
+        "margin_percent": m,
+        "selling_price": sp,
+        "layer_details": board[3],
+        "operation_details": ops,
+    } for sl, sw, up, lay, rw, rwp, bw, mc, cc, fc, lp, cpb, m, sp, board, ops in columns]
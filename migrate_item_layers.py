@@ -0,0 +1,12 @@
+from database import init_db
+from modules.paper_usage import backfill_item_layers
+
+def migrate_item_layers():
+    print("Creating quotation_item_layers table...")
+    init_db()
+    print("Migrating layer_details of existing items (in batches)...")
+    count = backfill_item_layers(batch_size=1000)
+    print(f"Done. {count} item(s) migrated.")
+
+if __name__ == "__main__":
+    migrate_item_layers()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Date, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Date, DateTime, JSON, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -20,7 +20,10 @@ class Party(Base):
     email = Column(String) # For auto-emailing
     default_margin = Column(Float, default=10.0)
     transport_rate_logic = Column(String, default="per_kg") # per_kg, per_trip, fixed
+    transport_rate = Column(Float) # Freight per order for "fixed" (₹); per_kg / per_trip use the vehicle's rates
+    price_list = Column(JSON) # Negotiated rates: {"papers": {name: ₹/kg}, "operations": {name: rate}}, see master_cache
     is_active = Column(Boolean, default=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True) # Incremental exports
 
 class PaperRate(Base):
     __tablename__ = "paper_rates"
@@ -28,25 +31,93 @@ class PaperRate(Base):
     name = Column(String, index=True) # Golden, Natural, Duplex, etc.
     rate = Column(Float) # Rate per KG
     bf = Column(Float, default=18.0) # Burst Factor
+    sct_index = Column(Float) # Short-span compression index (N.m/g) for edge crush; blank = estimate from BF
     unit = Column(String, default="KG")
-    # Optional: Party specific override could be a separate table or JSON field, keeping simple for now
+    # Party specific overrides: Party.price_list
 
 class OperationRate(Base):
     __tablename__ = "operation_rates"
     id = Column(Integer, primary_key=True, index=True)
     operation_name = Column(String, index=True) # Corrugation, Pasting, etc.
     rate = Column(Float)
-    unit = Column(String) # per_kg, per_sq_meter, per_box, fixed
+    unit = Column(String) # Cost driver (operation_rules.DRIVERS): per_kg, per_sq_meter, per_box, per_sheet, per_colour, fixed
+    slabs = Column(JSON) # Optional [[min quantity, rate], ...]: rate from that order quantity on
+    min_charge = Column(Float) # Optional minimum per order (₹)
     is_active = Column(Boolean, default=True)
 
+class FluteProfile(Base):
+    __tablename__ = "flute_profiles"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True) # A, B, C, E, F
+    take_up = Column(Float) # Flute factor: medium length per unit board length
+    caliper_mm = Column(Float) # Board thickness this flute adds
+    is_active = Column(Boolean, default=True)
+
+class VehicleType(Base):
+    __tablename__ = "vehicle_types"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True) # 14 ft truck, 32 ft container, ...
+    length_mm = Column(Float) # Cargo space
+    width_mm = Column(Float)
+    height_mm = Column(Float)
+    max_kg = Column(Float) # Payload
+    rate_per_trip = Column(Float) # ₹ per trip (parties on per_trip)
+    rate_per_kg = Column(Float) # ₹ per kg (parties on per_kg)
+    is_active = Column(Boolean, default=True)
+
+class PalletType(Base):
+    __tablename__ = "pallet_types"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    length_mm = Column(Float)
+    width_mm = Column(Float)
+    deck_height_mm = Column(Float, default=150.0)
+    max_height_mm = Column(Float) # Loaded height incl. deck
+    max_kg = Column(Float) # Load per pallet
+    tare_kg = Column(Float, default=25.0)
+    is_active = Column(Boolean, default=True)
+
+class PaperRateHistory(Base):
+    __tablename__ = "paper_rate_history"
+    id = Column(Integer, primary_key=True, index=True)
+    paper_rate_id = Column(Integer, ForeignKey("paper_rates.id"))
+    name = Column(String) # Paper name at that time (quotations store the name)
+    rate = Column(Float)
+    bf = Column(Float)
+    effective_from = Column(DateTime, default=datetime.utcnow)
+    changed_by = Column(String)
+
+    __table_args__ = (
+        Index("ix_paper_rate_history_name_from", "name", "effective_from"),
+        Index("ix_paper_rate_history_rate_from", "paper_rate_id", "effective_from"),
+    )
+
+class OperationRateHistory(Base):
+    __tablename__ = "operation_rate_history"
+    id = Column(Integer, primary_key=True, index=True)
+    operation_rate_id = Column(Integer, ForeignKey("operation_rates.id"))
+    operation_name = Column(String)
+    rate = Column(Float)
+    unit = Column(String)
+    slabs = Column(JSON) # Quantity slabs and minimum charge in force from effective_from (see OperationRate)
+    min_charge = Column(Float)
+    effective_from = Column(DateTime, default=datetime.utcnow)
+    changed_by = Column(String)
+
+    __table_args__ = (
+        Index("ix_operation_rate_history_name_from", "operation_name", "effective_from"),
+        Index("ix_operation_rate_history_rate_from", "operation_rate_id", "effective_from"),
+    )
+
 class Quotation(Base):
     __tablename__ = "quotations"
     id = Column(Integer, primary_key=True, index=True)
     quotation_number = Column(String, unique=True, index=True)
     party_id = Column(Integer, ForeignKey("parties.id"))
-    created_date = Column(DateTime, default=datetime.utcnow)
+    created_date = Column(DateTime, default=datetime.utcnow, index=True) # Date filters / newest-first listing
     status = Column(String, default="Draft") # Draft, Approved, Sent
     total_amount = Column(Float)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True) # Incremental exports
     
     party = relationship("Party")
     items = relationship("QuotationItem", back_populates="quotation")
@@ -54,7 +125,7 @@ class Quotation(Base):
 class QuotationItem(Base):
     __tablename__ = "quotation_items"
     id = Column(Integer, primary_key=True, index=True)
-    quotation_id = Column(Integer, ForeignKey("quotations.id"))
+    quotation_id = Column(Integer, ForeignKey("quotations.id"), index=True)
     
     # Box Specs
     box_name = Column(String)
@@ -66,6 +137,13 @@ class QuotationItem(Base):
     ply = Column(Integer)
     quantity = Column(Integer)
     layer_details = Column(JSON) # Stores list of {layer: name, gsm: val}
+    sheet_length = Column(Float) # Cutting size in mm (per piece)
+    sheet_width = Column(Float) # Cutting size in mm = deckle
+    reel_width = Column(Float) # Suggested 1-up reel (Inch)
+    freight_cost = Column(Float) # Transport per box (party's transport logic), included in cost_per_box
+    colours = Column(Integer) # Print colours (per_colour operations)
+    operation_details = Column(JSON) # Stores list of {operation, unit, rate, cost_per_box}
+    ups = Column(Integer, default=1) # Blanks per sheet (multi-up layout); sheet sizes are per sheet
     
     # Calculated Fields (Stored for history)
     sheet_weight = Column(Float)
@@ -75,8 +153,30 @@ class QuotationItem(Base):
     cost_per_box = Column(Float)
     margin_percent = Column(Float)
     selling_price = Column(Float)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True) # Incremental exports
     
     quotation = relationship("Quotation", back_populates="items")
+    layers = relationship("QuotationItemLayer", back_populates="item", order_by="QuotationItemLayer.position",
+                          cascade="all, delete-orphan")
+
+class QuotationItemLayer(Base):
+    # Normalized copy of QuotationItem.layer_details (the JSON stays for PDFs/history)
+    __tablename__ = "quotation_item_layers"
+    id = Column(Integer, primary_key=True, index=True)
+    item_id = Column(Integer, ForeignKey("quotation_items.id"), index=True)
+    position = Column(Integer) # 0 = Top Liner
+    layer = Column(String) # Top Liner, Flute 1, ...
+    paper = Column(String)
+    gsm = Column(Float)
+    bf = Column(Float)
+    flute_factor = Column(Float, default=1.0)
+    weight_kg = Column(Float) # This layer's share of box_weight (per box, incl. wastage)
+    
+    item = relationship("QuotationItem", back_populates="layers")
+
+    __table_args__ = (
+        Index("ix_quotation_item_layers_paper_gsm", "paper", "gsm", "layer"),
+    )
 
 class Terms(Base):
     __tablename__ = "terms"
@@ -96,3 +196,46 @@ class Settings(Base):
     id = Column(Integer, primary_key=True, index=True)
     key = Column(String, unique=True, index=True)
     value = Column(String)
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+    id = Column(Integer, primary_key=True) # Sequence number consumers sync from
+    entity = Column(String) # Table name, e.g. quotations
+    entity_id = Column(Integer)
+    operation = Column(String) # insert, update, delete
+    changes = Column(JSON) # {column: new value} (last values for deletes, when known)
+    changed_at = Column(DateTime, default=datetime.utcnow)
+    changed_by = Column(String)
+
+    __table_args__ = (
+        Index("ix_change_log_entity", "entity", "entity_id"),
+        {"sqlite_autoincrement": True}, # Never reuse a sequence number
+    )
+
+class ReplicationVersion(Base):
+    """Last change applied per replicated row (natural key), for last-writer-wins."""
+    __tablename__ = "replication_versions"
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String)
+    key = Column(String) # Party name, paper name, quotation number, ...
+    changed_at = Column(DateTime)
+    site = Column(String) # Site that made the change
+
+    __table_args__ = (
+        Index("ix_replication_versions_entity_key", "entity", "key", unique=True),
+    )
+
+class ReplicationLog(Base):
+    """Audit trail of every replicated change exported, applied or skipped (older than local)."""
+    __tablename__ = "replication_log"
+    id = Column(Integer, primary_key=True, index=True)
+    site = Column(String) # Remote site for imports, own site for exports
+    direction = Column(String) # export, import
+    file = Column(String)
+    entity = Column(String)
+    key = Column(String)
+    operation = Column(String) # upsert, delete
+    changed_at = Column(DateTime) # When the change was made at its site
+    outcome = Column(String) # exported, applied, skipped
+    detail = Column(String)
+    logged_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,206 @@
+import os
+import re
+import shutil
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from pathlib import Path
+from sqlalchemy import create_engine, select, union_all, MetaData, text
+from database import engine, SessionLocal, DB_PATH, Base, _add_missing_columns
+from models import Quotation, QuotationItem, QuotationItemLayer, Party, Settings
+from modules.quotations import record_archived_numbers
+
+# Hot/cold split: quotations older than ARCHIVE_AFTER_DAYS move (with their items and
+# layer rows) into one SQLite file per year next to the main DB, e.g.
+#   archive/quotations_2021.db   + archive/PDF_2021/<number>.pdf
+# The hot DB keeps everything from `archive_before` on. Reads ATTACH the yearly
+# files read-only, and only the years a date range actually reaches.
+# Parties and rates are never archived; archived quotations refer to hot party ids.
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(DB_PATH), "archive")
+ARCHIVE_AFTER_DAYS = 730
+ARCHIVE_BEFORE_KEY = "archive_before" # Everything created before this is in the archive files
+PDF_DIR = "PDF"
+
+_TABLES = [Quotation.__table__, QuotationItem.__table__, QuotationItemLayer.__table__]
+_FILE_RE = re.compile(r"^quotations_(\d{4})\.db$")
+_schema_tables = {} # schema -> (quotations, items, layers) bound to that schema
+
+def archive_path(year):
+    return os.path.join(ARCHIVE_DIR, f"quotations_{year}.db")
+
+def archived_years():
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted(int(m.group(1)) for f in os.listdir(ARCHIVE_DIR) if (m := _FILE_RE.match(f)))
+
+def archive_before(db):
+    """Date before which quotations live in the archive files, or None if nothing was archived."""
+    value = db.query(Settings.value).filter(Settings.key == ARCHIVE_BEFORE_KEY).scalar()
+    return datetime.fromisoformat(value) if value else None
+
+def years_needed(db, since):
+    """Archive years a listing starting at `since` (None = from the beginning) has to read; empty if the hot DB covers it."""
+    before = archive_before(db)
+    if before is None or (since is not None and since >= before):
+        return []
+    return [y for y in archived_years() if (since is None or since.year <= y) and y <= before.year]
+
+def _tables(schema):
+    """quotations / items / layers tables in an attached schema (None = main), with the model column types."""
+    if schema not in _schema_tables:
+        md = MetaData()
+        _schema_tables[schema] = tuple(t.to_metadata(md, schema=schema) for t in _TABLES)
+    return _schema_tables[schema]
+
+def _schema(year):
+    return f"arc_{year}"
+
+@contextmanager
+def attached(years, read_only=True):
+    """A connection on the hot DB with the given archive years attached as arc_<year>."""
+    conn = engine.connect()
+    names = []
+    try:
+        for year in years:
+            path = archive_path(year)
+            # URI filename so SQLite itself refuses writes to the archive
+            target = Path(path).resolve().as_uri() + "?mode=ro" if read_only else path
+            conn.exec_driver_sql(f"ATTACH DATABASE '{target}' AS {_schema(year)}")
+            names.append(_schema(year))
+        yield conn
+    finally:
+        conn.rollback()
+        for name in names:
+            conn.exec_driver_sql(f"DETACH DATABASE {name}")
+        conn.close()
+
+def _create_archive(year):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    arc_engine = create_engine(f"sqlite:///{archive_path(year)}")
+    try:
+        Base.metadata.create_all(bind=arc_engine, tables=_TABLES)
+        _add_missing_columns(bind=arc_engine, tables=_TABLES)
+    finally:
+        arc_engine.dispose()
+
+def archive_quotations(older_than_days=ARCHIVE_AFTER_DAYS, vacuum=False, db=None):
+    """
+    Moves quotations created more than `older_than_days` ago into their year's archive
+    file, one transaction per year (copy + delete commit together across both files).
+    Their PDFs move to archive/PDF_<year>/. Not written to the change feed: the
+    quotations still exist, only their storage moved. Returns {year: quotations moved}.
+    """
+    own_db = db is None
+    db = db or SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        cutoff = datetime(cutoff.year, cutoff.month, cutoff.day)
+        rows = db.query(Quotation.created_date, Quotation.quotation_number)\
+                 .filter(Quotation.created_date < cutoff).all()
+        by_year = {}
+        for created, number in rows:
+            by_year.setdefault(created.year, []).append(number)
+        if rows: # Numbering must not restart once a series' quotations are gone from the hot DB
+            record_archived_numbers(db, [number for _, number in rows])
+            db.commit()
+
+        moved = {}
+        for year, numbers in sorted(by_year.items()):
+            _create_archive(year)
+            start, end = datetime(year, 1, 1), min(cutoff, datetime(year + 1, 1, 1))
+            with attached([year], read_only=False) as conn:
+                q_ids = "SELECT id FROM main.quotations WHERE created_date >= :start AND created_date < :end"
+                i_ids = f"SELECT id FROM main.quotation_items WHERE quotation_id IN ({q_ids})"
+                wheres = {"quotations": f"id IN ({q_ids})",
+                          "quotation_items": f"quotation_id IN ({q_ids})",
+                          "quotation_item_layers": f"item_id IN ({i_ids})"}
+                params = {"start": start.isoformat(" "), "end": end.isoformat(" ")} # Stored datetime text format
+                for table in _TABLES:
+                    cols = ", ".join(f'"{c.name}"' for c in table.columns)
+                    conn.execute(text(f"INSERT OR REPLACE INTO {_schema(year)}.{table.name} ({cols}) "
+                                      f"SELECT {cols} FROM main.{table.name} WHERE {wheres[table.name]}"), params)
+                for table in reversed(_TABLES): # Children first, their filters use the parents
+                    conn.execute(text(f"DELETE FROM main.{table.name} WHERE {wheres[table.name]}"), params)
+                conn.commit()
+            _move_pdfs(year, numbers)
+            moved[year] = len(numbers)
+
+        if moved:
+            before = archive_before(db)
+            setting = db.query(Settings).filter(Settings.key == ARCHIVE_BEFORE_KEY).first() or Settings(key=ARCHIVE_BEFORE_KEY)
+            setting.value = max(cutoff, before or cutoff).isoformat()
+            db.add(setting)
+            db.commit()
+            from modules import forecast, similar
+            forecast.invalidate()
+            similar.invalidate()
+    finally:
+        if own_db:
+            db.close()
+
+    if vacuum and moved:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+    return moved
+
+def _move_pdfs(year, numbers):
+    pdf_archive = os.path.join(ARCHIVE_DIR, f"PDF_{year}")
+    for number in numbers:
+        src = os.path.join(PDF_DIR, f"{number}.pdf")
+        if os.path.exists(src):
+            os.makedirs(pdf_archive, exist_ok=True)
+            shutil.move(src, os.path.join(pdf_archive, f"{number}.pdf"))
+
+def load_archived_quotations(db, years, since=None, party_id=None):
+    """
+    Archived quotations of the given years (newest first) as detached Quotation objects
+    with their items and hot party filled in, for display only. Each carries
+    `archived_year` so callers can keep them read-only.
+    """
+    if not years:
+        return []
+    parties = {p.id: p for p in db.query(Party)}
+    result = []
+    with attached(years) as conn:
+        for year in years:
+            q_t, i_t, _ = _tables(_schema(year))
+            stmt = select(*q_t.c)
+            if since is not None:
+                stmt = stmt.where(q_t.c.created_date >= since)
+            if party_id is not None:
+                stmt = stmt.where(q_t.c.party_id == party_id)
+            quotations = {r.id: r for r in conn.execute(stmt)}
+            items = {}
+            if quotations:
+                for r in conn.execute(select(*i_t.c).where(i_t.c.quotation_id.in_(list(quotations)))\
+                                      .order_by(i_t.c.id)):
+                    items.setdefault(r.quotation_id, []).append(QuotationItem(**r._mapping))
+            for qid, r in quotations.items():
+                q = Quotation(**r._mapping)
+                q.items = items.get(qid, [])
+                q.party = parties.get(r.party_id)
+                q.archived_year = year
+                result.append(q)
+    result.sort(key=lambda q: q.created_date, reverse=True)
+    return result
+
+def _history_select(schema, party_id, since):
+    q_t, i_t, _ = _tables(schema)
+    stmt = select(q_t.c.created_date, q_t.c.quotation_number, i_t.c.length, i_t.c.width, i_t.c.height,
+                  i_t.c.ply, i_t.c.cost_per_box, i_t.c.selling_price, i_t.c.margin_percent)\
+        .join(i_t, i_t.c.quotation_id == q_t.c.id).where(q_t.c.party_id == party_id)
+    if since is not None:
+        stmt = stmt.where(q_t.c.created_date >= since)
+    return stmt
+
+def party_history_rows(db, party_id, since=None):
+    """
+    Item rows of a party's quotations from `since` on: one UNION ALL over the hot DB
+    and the attached archive years the range reaches. Oldest first.
+    """
+    years = years_needed(db, since)
+    with attached(years) as conn:
+        selects = [_history_select(None, party_id, since)] + [_history_select(_schema(y), party_id, since) for y in years]
+        stmt = union_all(*selects) if len(selects) > 1 else selects[0]
+        rows = conn.execute(stmt.order_by("created_date")).all()
+    return rows
@@ -5,10 +5,11 @@ import datetime
 import sqlite3
 import streamlit as st
 
-DB_FILE = "box_costing.db"
-
-from database import SessionLocal
+from database import SessionLocal, DB_PATH
 from models import Settings
+from modules import metrics
+
+DB_FILE = DB_PATH
 
 def get_backup_dir():
     db = SessionLocal()
@@ -36,6 +37,7 @@ def create_backup():
         source_conn.backup(dest_conn)
         source_conn.close()
         dest_conn.close()
+        metrics.backup_written(backup_path)
         return True, backup_path
     except Exception as e:
         return False, str(e)
@@ -60,10 +62,25 @@ def restore_backup(backup_filename):
         source_conn.backup(dest_conn)
         source_conn.close()
         dest_conn.close()
+        _after_restore()
         return True, "Database restored successfully."
     except Exception as e:
         return False, str(e)
 
+def _after_restore():
+    """Caches built from the old data must not survive a restore (also in other processes)."""
+    from database import init_db
+    from modules import forecast, master_cache, similar
+    init_db() # An older backup may predate newer tables, columns or the item R*Tree
+    forecast.invalidate()
+    similar.invalidate()
+    db = SessionLocal()
+    try:
+        master_cache.bump_version(db)
+        db.commit()
+    finally:
+        db.close()
+
 def delete_backup(backup_filename):
     path = get_backup_dir()
     backup_path = os.path.join(path, backup_filename)
@@ -80,3 +97,5 @@ def auto_backup_check():
     backups = list_backups()
     if not any(today in f for f in backups):
         create_backup()
+    elif backups:
+        metrics.backup_written(os.path.join(get_backup_dir(), backups[0]))
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from sqlalchemy import Table, Column, Integer, Float, MetaData, select, and_
+from database import ITEM_RTREE
+from models import Quotation, QuotationItem
+
+# Range filters for Reports. Size / ply / quantity ranges are answered by the R*Tree
+# (see database._create_item_rtree), rate and date by the matched rows themselves.
+# Filters: {"length": (lo, hi), "width": ..., "height": ..., "ply": [5, 7],
+#           "quantity": (lo, hi), "rate": (lo, hi), "date": (from, to)}
+# Sizes are in mm, any bound may be None (open).
+
+MM_PER_INCH = 25.4
+_RTREE_DIMS = ["length", "width", "height", "ply", "quantity"]
+
+_rtree = Table(ITEM_RTREE, MetaData(), Column("id", Integer, primary_key=True),
+               *[Column(f"{edge}_{dim}", Float) for dim in _RTREE_DIMS for edge in ("min", "max")])
+
+def _bounds(filters, key):
+    lo, hi = filters.get(key) or (None, None)
+    return lo, hi
+
+def _ply_bounds(filters):
+    plies = filters.get("ply")
+    return (min(plies), max(plies)) if plies else (None, None)
+
+def _date_bounds(filters):
+    start, end = _bounds(filters, "date")
+    start = datetime.combine(start, datetime.min.time()) if start else None
+    end = datetime.combine(end, datetime.min.time()) + timedelta(days=1) if end else None # Inclusive end day
+    return start, end
+
+def has_filters(filters):
+    return any(v is not None and v != [] and v != (None, None) for v in filters.values())
+
+def matching_quotation_ids(filters):
+    """
+    Subquery of quotation ids with at least one item inside every given range.
+    R*Tree boxes are stored as float32 rounded outwards, so the item columns are
+    checked again on the (few) rows it returns.
+    """
+    conds = []
+    for dim in _RTREE_DIMS:
+        lo, hi = _ply_bounds(filters) if dim == "ply" else _bounds(filters, dim)
+        if lo is not None:
+            conds.append(_rtree.c[f"max_{dim}"] >= lo)
+        if hi is not None:
+            conds.append(_rtree.c[f"min_{dim}"] <= hi)
+    stmt = select(QuotationItem.quotation_id).distinct()
+    if conds:
+        stmt = stmt.select_from(_rtree).join(QuotationItem, QuotationItem.id == _rtree.c.id).where(and_(*conds))
+
+    for dim, col in (("length", QuotationItem.length), ("width", QuotationItem.width), ("height", QuotationItem.height),
+                     ("quantity", QuotationItem.quantity), ("rate", QuotationItem.selling_price)):
+        lo, hi = _bounds(filters, dim)
+        if lo is not None:
+            stmt = stmt.where(col >= lo)
+        if hi is not None:
+            stmt = stmt.where(col <= hi)
+    if filters.get("ply"):
+        stmt = stmt.where(QuotationItem.ply.in_(list(filters["ply"])))
+
+    start, end = _date_bounds(filters)
+    if start or end:
+        stmt = stmt.join(Quotation, Quotation.id == QuotationItem.quotation_id)
+        if start:
+            stmt = stmt.where(Quotation.created_date >= start)
+        if end:
+            stmt = stmt.where(Quotation.created_date < end)
+    return stmt
+
+def quotation_matches(q, filters):
+    """Same filters in Python, for quotations not in the hot DB (archive)."""
+    start, end = _date_bounds(filters)
+    if (start and q.created_date < start) or (end and q.created_date >= end):
+        return False
+
+    def item_matches(i):
+        values = {"length": i.length, "width": i.width, "height": i.height,
+                  "quantity": i.quantity, "rate": i.selling_price}
+        for key, value in values.items():
+            lo, hi = _bounds(filters, key)
+            if (lo is not None and (value is None or value < lo)) or (hi is not None and (value is None or value > hi)):
+                return False
+        return not filters.get("ply") or i.ply in filters["ply"]
+    return any(item_matches(i) for i in q.items)
@@ -1,9 +1,14 @@
 import streamlit as st
-import pandas as pd
 import os
 from database import SessionLocal
-from models import Party, PaperRate, OperationRate
-from modules.pdf_utils import generate_quotation_pdf, generate_whatsapp_link
+from models import Party
+from modules.master_cache import get_masters
+from box_styles import STYLES
+from logic import (
+    suggest_reel, REEL_TRIM_ALLOWANCE_MM, get_layer_names, calculate_sheet_size, layer_bursting_strength,
+    calculate_board, calculate_conversion_cost, suggested_margin, optimize_gsm, board_ect, board_caliper,
+    mckee_bct, ect_for_bct
+)
 
 def calculator_page():
     st.title("Cost Calculator")
@@ -90,8 +95,9 @@ def calculator_page():
             default_cutting = 1.5 if unit_selection == "Inch" else 40.0
             default_decel = 0.0
             
-            box_style = col_s1.selectbox("Box Style", ["REGULAR", "OVER FLIP"])
-            joint_type = col_s2.selectbox("Joint Type", ["1PC", "2PC"])
+            box_style = col_s1.selectbox("Box Style", list(STYLES), format_func=lambda c: STYLES[c].label)
+            style = STYLES[box_style]
+            joint_type = col_s2.selectbox("Joint Type", ["1PC", "2PC"] if style.split else ["1PC"])
             cutting_plus = col_s3.number_input(f"CUTTING+", value=default_cutting)
             decel_plus = col_s4.number_input(f"DECEL+", value=default_decel)
             
@@ -112,42 +118,51 @@ def calculator_page():
                 height = col3.number_input("Height (mm)", min_value=0.0, value=150.0)
 
             ply = col4.selectbox("Ply", [3, 5, 7, 9])
+
+            blank_length = blank_width = None
+            if style.needs_blank: # Die-cut: flat blank size from the drawing, in the input unit
+                col_b1, col_b2 = st.columns(2)
+                default_blank = (30.0, 20.0) if unit_selection == "Inch" else (760.0, 510.0)
+                blank_length = col_b1.number_input(f"Blank Length ({unit_selection})", min_value=0.0, value=default_blank[0])
+                blank_width = col_b2.number_input(f"Blank Width ({unit_selection})", min_value=0.0, value=default_blank[1])
         
         with right_col:
             # 3. Paper Specifications (Dynamic based on Ply)
             st.subheader("Paper Specifications")
             
-            # Fetch paper rates for dropdown
-            paper_rates = db.query(PaperRate).all()
+            # Fetch paper rates for dropdown (cached masters, reloaded when Masters change);
+            # a party with a price list gets its negotiated paper and operation rates
+            masters = get_masters(db, party=selected_party.name if selected_party else None)
+            price_list = (selected_party.price_list or {}) if selected_party else {}
+            if price_list.get("papers") or price_list.get("operations"):
+                negotiated = {**(price_list.get("papers") or {}), **(price_list.get("operations") or {})}
+                st.caption("🤝 Negotiated rates: " + ", ".join(f"{name} ₹{rate:g}" for name, rate in negotiated.items()))
+            paper_rates = list(masters.papers.values())
             if not paper_rates:
                 st.warning("No Paper Rates found. Please add them in Master Data.")
                 paper_options = {} 
                 paper_details = {}
             else:
-                # Update options to store more data
-                paper_options = {f"{p.name} ({p.rate}/kg)": p.rate for p in paper_rates}
+                # Options are paper names (a selection survives a rate change or another party's rates)
+                paper_options = {p.name: f"{p.name} ({p.rate}/kg)" for p in paper_rates}
                 # Store full objects for lookup
-                paper_details = {f"{p.name} ({p.rate}/kg)": p for p in paper_rates}
+                paper_details = {p.name: p for p in paper_rates}
             
-            layers = []
-            if ply == 3:
-                layers = ["Top Liner", "Flute", "Bottom Liner"]
-            elif ply == 5:
-                layers = ["Top Liner", "Flute 1", "Middle Liner", "Flute 2", "Bottom Liner"]
-            elif ply == 7:
-                layers = ["Top Liner", "Flute 1", "Middle Liner 1", "Flute 2", "Middle Liner 2", "Flute 3", "Bottom Liner"]
-            elif ply == 9:
-                layers = ["Top Liner", "Flute 1", "Middle Liner 1", "Flute 2", "Middle Liner 2", "Flute 3", "Middle Liner 3", "Flute 4", "Bottom Liner"]
+            layers = get_layer_names(ply)
             
-            # --- Flute Factor Input ---
-            c_f1, c_f2 = st.columns(2)
-            flute_factor = c_f1.number_input("Flute Factor (Take-up)", value=1.40, step=0.05, min_value=1.0)
-            wastage_pct = c_f2.number_input("Wastage %", value=5.0, step=0.5, min_value=0.0)
+            # --- Flute profiles (take-up + caliper from Masters) ---
+            flutes = masters.flutes
+            flute_names = list(flutes)
+            default_flute = "B" if "B" in flutes else (flute_names[0] if flute_names else None)
+            flute_factor = 1.40 # Only used if no flute profiles are active
+            c_f1, _ = st.columns(2)
+            wastage_pct = c_f1.number_input("Wastage %", value=5.0, step=0.5, min_value=0.0)
             
             total_effective_gsm = 0.0
             total_material_cost_per_sqm = 0.0 # Based on effective weight
             total_theoretical_bs = 0.0 # Bursting Strength
             current_layer_details = [] # Capture for PDF
+            layer_inputs = []
             
             if paper_options:
                 with st.expander(f"Layer Details ({len(layers)} Layers)", expanded=True):
@@ -155,96 +170,78 @@ def calculator_page():
                     selected_layer_configs = []
                     
                     for layer in layers:
-                        c1, c2, c3 = st.columns([2, 1, 1])
+                        c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
                         # use session state keys for papers to persist selections
-                        sel_paper = c1.selectbox(f"{layer}", list(paper_options.keys()), key=layer, label_visibility="visible")
+                        sel_paper = c1.selectbox(f"{layer}", list(paper_options.keys()), format_func=paper_options.get,
+                                                 key=layer, label_visibility="visible")
                         gsm = c2.number_input(f"GSM", min_value=60, value=120, key=f"gsm_{layer}", label_visibility="visible")
+                        flute = None
+                        if "Flute" in layer and flute_names:
+                            flute = flutes[c3.selectbox("Flute", flute_names, index=flute_names.index(default_flute),
+                                                        key=f"flute_{layer}")]
                         
                         if sel_paper:
-                            # Extract just name for cleaner save (remove rate info if possible, or keep full)
-                            # sel_paper string format: "Name (Rate/kg)"
-                            paper_name_only = sel_paper.split(' (')[0] if '(' in sel_paper else sel_paper
+                            paper_name_only = sel_paper
                             
                             p_obj = paper_details[sel_paper]
                             rate = p_obj.rate
                             bf = p_obj.bf if p_obj.bf else 18.0
+                            layer_bs = layer_bursting_strength(bf, gsm)
                             
-                            current_layer_details.append({
-                                "layer": layer,
-                                "paper": paper_name_only,
-                                "gsm": gsm,
-                                "bf": bf
-                            })
-                            
-                            # Apply flute factor ONLY to flute layers
-                            if "Flute" in layer:
-                                effective_gsm = gsm * flute_factor
-                                layer_bs = (bf * gsm) / 1000
-                                is_flute = True
-                            else:
-                                effective_gsm = gsm
-                                layer_bs = (bf * gsm) / 1000
-                                is_flute = False
-                                
-                            total_effective_gsm += effective_gsm
-                            total_theoretical_bs += layer_bs
-                            
-                            # Cost = Effective GSM (kg/sqm) * Rate (per kg)
-                            total_material_cost_per_sqm += (effective_gsm * rate)
+                            layer_input = {"layer": layer, "paper": paper_name_only, "gsm": gsm, "rate": rate, "bf": bf,
+                                           "sct_index": p_obj.sct_index}
+                            if flute:
+                                layer_input.update(flute=flute.name, take_up=flute.take_up, caliper_mm=flute.caliper_mm)
+                            layer_inputs.append(layer_input)
                             
+                            # Take-up applies ONLY to flute layers
                             selected_layer_configs.append({
                                 "layer": layer,
                                 "bf": bf,
                                 "rate": rate,
-                                "flute_factor": flute_factor if is_flute else 1.0
+                                "sct_index": p_obj.sct_index,
+                                "flute_factor": (flute.take_up if flute else flute_factor) if "Flute" in layer else 1.0
                             })
                             
                         # Show BS contribution
-                        c3.markdown(f"<small>BS: {layer_bs:.2f}</small>", unsafe_allow_html=True)
+                        c4.markdown(f"<small>BS: {layer_bs:.2f}</small>", unsafe_allow_html=True)
+                
+                # Cost = Effective GSM (kg/sqm) * Rate (per kg)
+                total_effective_gsm, total_material_cost_per_sqm, total_theoretical_bs, current_layer_details = \
+                    calculate_board(layer_inputs, flute_factor)
             else:
                 total_effective_gsm = 0
 
             # --- Strength Display & Optimization ---
+            # Stacking strength: edge crush from the papers, McKee BCT from caliper and box perimeter
+            perimeter_mm = 2 * (length + width)
+            board_ect_kn = board_ect(layer_inputs, flute_factor) if layer_inputs else 0.0
+            caliper_mm = board_caliper(layer_inputs)
+            bct_kgf = mckee_bct(board_ect_kn, caliper_mm, perimeter_mm)
             c_bs1, c_bs2 = st.columns([2, 1])
-            c_bs1.info(f"⚡ Theoretical Box Bursting Strength (BS): {total_theoretical_bs:.2f} kg/cm²")
+            c_bs1.info(f"⚡ Theoretical Box Bursting Strength (BS): {total_theoretical_bs:.2f} kg/cm²  \n"
+                       f"🧱 Edge Crush (ECT): {board_ect_kn:.2f} kN/m · Caliper {caliper_mm:.1f} mm · "
+                       f"Compression (BCT): {bct_kgf:.0f} kgf")
             
             with c_bs2:
-                target_bs = st.number_input("Target Strength (BS)", min_value=1.0, value=6.0, step=0.5)
+                target_kind = st.radio("Optimize for", ["BS", "BCT"], horizontal=True,
+                                       help="BCT = stacking strength the customer specifies (kgf, McKee estimate)")
+                if target_kind == "BS":
+                    target_bs = st.number_input("Target Strength (BS)", min_value=1.0, value=6.0, step=0.5)
+                    min_ect = None
+                else:
+                    target_bct = st.number_input("Target BCT (kgf)", min_value=1.0, value=300.0, step=10.0)
+                    target_bs = 0.0
+                    min_ect = ect_for_bct(target_bct, caliper_mm, perimeter_mm)
             
             if st.button("✨ Optimize GSM for Cost"):
-                import itertools
-                standard_gsms = [80, 100, 120, 140, 150, 180, 200, 230, 250]
-                
-                best_combo = None
-                min_cost = float('inf')
-                
                 # Progress bar for visual feedback
                 prog_bar = st.progress(0)
                 
-                # Solver: Iterate combinations of GSMs for the selected papers
-                # Limit search if too huge (e.g. 5 ply = 32k ops, fast enough in python usually)
-                combinations = list(itertools.product(standard_gsms, repeat=len(selected_layer_configs)))
-                total_combos = len(combinations)
-                
-                for idx, combo in enumerate(combinations):
-                    # Check validity
-                    if idx % 1000 == 0:
-                        prog_bar.progress(min(idx / total_combos, 1.0))
-                    
-                    calc_bs = 0.0
-                    calc_cost = 0.0
-                    
-                    for i, layer_gsm in enumerate(combo):
-                        cfg = selected_layer_configs[i]
-                        # BS = BF * GSM / 1000
-                        calc_bs += (cfg['bf'] * layer_gsm) / 1000
-                        # Cost = GSM * Factor * Rate
-                        calc_cost += (layer_gsm * cfg['flute_factor'] * cfg['rate'])
-                        
-                    if calc_bs >= target_bs:
-                        if calc_cost < min_cost:
-                            min_cost = calc_cost
-                            best_combo = combo
+                # Solver: every combination of GSMs for the selected papers, evaluated
+                # as numpy blocks (7 ply = 4.8M combinations in well under a second)
+                best_combo, min_cost = optimize_gsm(selected_layer_configs, target_bs, progress=prog_bar.progress,
+                                                    min_ect=min_ect)
                 
                 prog_bar.empty()
                 
@@ -265,7 +262,7 @@ def calculator_page():
                     st.toast("GSMs Updated! Rerunning...", icon="✅")
                     st.rerun()
                 else:
-                    st.error("No combination met the Target BS with available GSMs.")
+                    st.error(f"No combination met the Target {target_kind} with available GSMs.")
             
         
         with left_col: # Reel suggestion uses sheet info from left col logic, but we are inside 'right_col' currently?
@@ -302,31 +299,16 @@ def calculator_page():
         </style>
         """, unsafe_allow_html=True)
         
-        calc_method = st.radio("Calculation Method", ["Auto-Calculate (RSC)", "Manual Sheet Size"])
+        calc_method = st.radio("Calculation Method", ["Auto-Calculate (Box Style)", "Manual Sheet Size"])
         
-        if calc_method == "Auto-Calculate (RSC)":
-            # Calculations of Sheet Size (Per Die/Per Piece)
-            # Sheet Length:
-            if joint_type == "1PC":
-                # Standard: (L + W) * 2 + Cutting
-                base_len = (length_in + width_in) * 2 if unit_selection == "Inch" else (length + width) * 2
-                sheets_per_box = 1
-            else: # 2PC
-                # Split: (L + W) + Cutting (One piece covers half perimeter)
-                base_len = (length_in + width_in) if unit_selection == "Inch" else (length + width)
-                sheets_per_box = 2
-                
-            calc_sheet_len = base_len + cutting_plus
-            
-            # Sheet Width calculation based on Style
-            if box_style == "OVER FLIP":
-                 # Width + Width + Height
-                 base_width_allowance = width_in * 2 if unit_selection == "Inch" else width * 2
+        if calc_method == "Auto-Calculate (Box Style)":
+            # Calculations of Sheet Size (Per Die/Per Piece), in the input unit
+            if unit_selection == "Inch":
+                dims = (length_in, width_in, height_in)
             else:
-                 # Width + Height (Standard RSC)
-                 base_width_allowance = width_in if unit_selection == "Inch" else width
-                 
-            calc_sheet_wid = height_in + base_width_allowance + decel_plus if unit_selection == "Inch" else height + base_width_allowance + decel_plus
+                dims = (length, width, height)
+            calc_sheet_len, calc_sheet_wid, sheets_per_box = calculate_sheet_size(
+                *dims, box_style, joint_type, cutting_plus, decel_plus, blank_length, blank_width)
             
             # Display nicely in columns
             c1, c2 = st.columns(2)
@@ -353,7 +335,7 @@ def calculator_page():
                 sheet_width = calc_sheet_wid
             
             if sheets_per_box > 1:
-                st.info(f"ℹ️ 2PC Box Selected: Calculation is for 1 piece. Total cost will include 2 pieces.")
+                st.info(f"ℹ️ {sheets_per_box} pieces per box: Calculation is for 1 piece. Total cost will include {sheets_per_box} pieces.")
                 
         else:
             sheets_per_box = 1 # Default manual
@@ -367,6 +349,36 @@ def calculator_page():
                 sheet_length = c1.number_input("Sheet Cutting Length (mm)", value=1000.0)
                 sheet_width = c2.number_input("Sheet Cutting Width (mm)", value=1000.0)
         
+        piece_length, piece_width = sheet_length, sheet_width # One piece (the flat box for load planning)
+
+        # Multi-up: several blanks per printed / die-cut sheet (small boxes, die-cut)
+        ups = 1
+        with st.expander("🧩 Multi-up Layout (Nesting)", expanded=False):
+            multi_up = st.checkbox("Print / die-cut several blanks per sheet", key="nest_on")
+            if multi_up:
+                from nesting import nest, DEFAULT_MAX_SHEET_MM, DEFAULT_GAP_MM, DEFAULT_MARGIN_MM
+                n1, n2, n3, n4 = st.columns(4)
+                max_sheet_len = n1.number_input("Max Sheet Length (mm)", min_value=100.0, value=DEFAULT_MAX_SHEET_MM[0])
+                max_sheet_wid = n2.number_input("Max Sheet Width (mm)", min_value=100.0, value=DEFAULT_MAX_SHEET_MM[1])
+                nest_gap = n3.number_input("Gap (mm)", min_value=0.0, value=DEFAULT_GAP_MM)
+                nest_margin = n4.number_input("Margin (mm)", min_value=0.0, value=DEFAULT_MARGIN_MM)
+                layouts = nest(sheet_length, sheet_width, max_sheet_len, max_sheet_wid, nest_gap, nest_margin,
+                               reel_widths=masters.reel_widths)
+                if not layouts:
+                    st.warning("The blank doesn't fit on the maximum sheet (or on any active reel).")
+                else:
+                    import pandas as pd
+                    st.dataframe(pd.DataFrame(layouts).round(2), use_container_width=True, hide_index=True)
+                    choice = st.selectbox("Layout", range(len(layouts)), key="nest_choice",
+                                          format_func=lambda i: f"{layouts[i]['ups']}-up, {layouts[i]['layout']} "
+                                                                f"({layouts[i]['waste_pct']:.1f}% waste)")
+                    layout = layouts[choice]
+                    ups = layout["ups"]
+                    sheet_length, sheet_width = layout["sheet_length"], layout["sheet_width"]
+                    sheets_per_box = sheets_per_box / ups
+                    st.info(f"{ups} blanks per {sheet_length:.0f} x {sheet_width:.0f} mm sheet: "
+                            f"{sheets_per_box:.3f} sheets per box.")
+
         # Weight Calculation (REVISED)
         # Area in sq m for ONE sheet
         area_sqm = (sheet_length * sheet_width) / 1_000_000
@@ -383,29 +395,24 @@ def calculator_page():
         
         # 5. Operations
         # Operations calculation
-        ops = db.query(OperationRate).filter(OperationRate.is_active==True).all()
-        # Split costs
-        variable_conversion_cost = 0.0
-        total_fixed_cost = 0.0
-        selected_ops = []
+        # Costed after the order quantity is known (quantity slabs, minimum charges)
+        ops = masters.operations
+        chosen_ops = []
         
-        with st.expander("Operations & Conversion Details", expanded=False):
+        ops_expander = st.expander("Operations & Conversion Details", expanded=False)
+        with ops_expander:
+            from operation_rules import DRIVERS, format_slabs
+            print_colours = st.number_input("Print Colours", min_value=0, max_value=8, value=0, step=1,
+                                            help="Drives per_colour operations")
             for op in ops:
-                cost = 0
-                use_op = st.checkbox(f"{op.operation_name} ({op.rate} {op.unit})", value=True)
+                if op.unit not in DRIVERS:
+                    st.warning(f"{op.name}: unknown unit '{op.unit}', not costed. Fix it in Masters → Operation Rates.")
+                    continue
+                extras = "".join([f", slabs {format_slabs(op.slabs)}" if op.slabs else "",
+                                  f", min ₹{op.min_charge:g}" if op.min_charge else ""])
+                use_op = st.checkbox(f"{op.name} ({op.rate} {op.unit}{extras})", value=True)
                 if use_op:
-                    if op.unit == "per_kg":
-                        cost = final_weight_kg * op.rate
-                        variable_conversion_cost += cost
-                        selected_ops.append((op.operation_name, cost, 'per_box'))
-                    elif op.unit == "per_box":
-                        cost = op.rate
-                        variable_conversion_cost += cost
-                        selected_ops.append((op.operation_name, cost, 'per_box'))
-                    elif op.unit == "fixed":
-                        cost = op.rate
-                        total_fixed_cost += cost
-                        selected_ops.append((op.operation_name, cost, 'fixed'))
+                    chosen_ops.append((op.name, op.rate, op.unit, op.slabs, op.min_charge))
         
         # After sheet size:
         
@@ -416,43 +423,27 @@ def calculator_page():
         
         # --- REEL SIZE OPTIMIZATION (DB DRIVEN) ---
         with st.expander("Reel Size Suggestion (Deckle Optimization)", expanded=True):
-            from models import ReelSize
-            
             # Assumption: Deckle matches Sheet Width implicitly
-            deckle_needed_mm = sheet_width
-            trim_allowance_mm = 50 # Standard trim
-            
             st.caption(f"Calculated based on Cutting Size (Width): {sheet_width:.1f} mm")
             
-            min_reel_mm = deckle_needed_mm + trim_allowance_mm
-            min_reel_inch = min_reel_mm / 25.4
+            min_reel_inch = (sheet_width + REEL_TRIM_ALLOWANCE_MM) / 25.4
             
             # Fetch Active Reels from Master
-            active_reels = db.query(ReelSize).filter(ReelSize.is_active == True).order_by(ReelSize.width).all()
+            reel_widths = masters.reel_widths
+            suggested_reel_inch = None
             
-            if not active_reels:
+            if not reel_widths:
                 st.warning("No Active Reel Sizes found in Master. Please configure 'Reel Master'.")
-                suggested_reel_inch = 0
-                trim_percent = 0
             else:
-                # 1. Single Up Logic
-                best_reel = None
-                best_trim_pct = 100.0
-                
-                # Find smallest reel that fits
-                for r in active_reels:
-                    if r.width >= min_reel_inch:
-                        best_reel = r
-                        
-                        calc_trim_mm = (r.width * 25.4) - deckle_needed_mm
-                        best_trim_pct = (calc_trim_mm / (r.width * 25.4)) * 100
-                        break # Since ordered by width, first match is smallest capable
+                # 1. Single Up Logic (smallest capable reel)
+                best_reel, best_trim_pct = suggest_reel(sheet_width, reel_widths)
+                suggested_reel_inch = best_reel
                 
                 r1, r2, r3, r4 = st.columns(4)
                 r1.metric("Min Required", f"{min_reel_inch:.2f}\"")
                 
                 if best_reel:
-                    r2.metric(f"Suggested Reel", f"{best_reel.width}\"")
+                    r2.metric(f"Suggested Reel", f"{best_reel}\"")
                     r3.metric("Wastage", f"{best_trim_pct:.1f}%")
                     
                     if best_trim_pct > 10.0:
@@ -467,29 +458,29 @@ def calculator_page():
                 
                 # 2. Double Up Logic (Improved Productivity)
                 if min_reel_inch < 40: # Only relevant if single is small
-                    double_deckle_mm = (sheet_width * 2) + trim_allowance_mm
-                    double_required_inch = double_deckle_mm / 25.4
-                    
-                    best_double_reel = None
-                    double_trim_pct = 100.0
-                    
-                    for r in active_reels:
-                        if r.width >= double_required_inch:
-                            best_double_reel = r
-                            calc_trim = (r.width * 25.4) - (sheet_width * 2)
-                            double_trim_pct = (calc_trim / (r.width * 25.4)) * 100
-                            break
+                    best_double_reel, double_trim_pct = suggest_reel(sheet_width, reel_widths, ups=2)
                     
                     if best_double_reel:
                         st.markdown("---")
                         c_d1, c_d2, c_d3 = st.columns([2,1,1])
                         c_d1.info(f"💡 **Double Up Strategy**: Run 2 sheets side-by-side.")
-                        c_d2.metric("2-Up Reel", f"{best_double_reel.width}\"")
+                        c_d2.metric("2-Up Reel", f"{best_double_reel}\"")
                         c_d3.metric("2-Up Wastage", f"{double_trim_pct:.1f}%")
                         
                         if best_reel and double_trim_pct < best_trim_pct:
                             c_d1.success(f"✅ Double Up saves {best_trim_pct - double_trim_pct:.1f}% material!")
         
+        # Similar boxes quoted before (in-memory index, no DB query per keystroke)
+        with st.expander("🔎 Similar Past Quotations", expanded=False):
+            from modules.similar import similar_items
+            total_gsm = sum(l["gsm"] for l in layer_inputs)
+            matches = similar_items(length, width, height, ply, total_gsm, k=5, db=db)
+            if matches:
+                import pandas as pd
+                st.dataframe(pd.DataFrame(matches), use_container_width=True, hide_index=True)
+            else:
+                st.caption("No saved quotations yet.")
+
         material_cost_per_sheet = (area_sqm * total_material_cost_per_sqm) / 1000
         material_cost = material_cost_per_sheet * sheets_per_box * (1 + wastage_pct/100) # Include wastage in cost
 
@@ -498,26 +489,72 @@ def calculator_page():
         selected_qty = c_q1.number_input("Order Quantity", min_value=1, value=1000, step=100)
         
         # Suggested margin logic
-        if selected_qty <= 1000:
-            s_margin = 35.0
-        elif selected_qty <= 2000:
-            s_margin = 30.0
-        elif selected_qty <= 5000:
-            s_margin = 25.0
-        else:
-            s_margin = 20.0
+        s_margin = suggested_margin(selected_qty)
             
         margin_input = c_q2.number_input("Margin (%)", value=s_margin, step=0.5, key="margin_val")
 
+        # Split costs: per box, and per order (fixed operations, minimum charge top-ups)
+        variable_conversion_cost, total_fixed_cost, operation_details = calculate_conversion_cost(
+            chosen_ops, final_weight_kg, selected_qty, area_sqm * sheets_per_box * (1 + wastage_pct/100),
+            sheets_per_box, print_colours)
+        if operation_details:
+            with ops_expander:
+                import pandas as pd
+                st.dataframe(pd.DataFrame(operation_details).round(4), use_container_width=True, hide_index=True)
+
+        # Freight: load plan over the Vehicles master, charged by the party's transport logic
+        freight_cost = 0.0
+        with st.expander("🚚 Freight (Truck & Pallet Load)", expanded=False):
+            if not masters.vehicles:
+                st.caption("No vehicles yet: set them up in Masters → Costing Master → Vehicles & Pallets.")
+            else:
+                from load_plan import shipping_size, plan_freight, TRANSPORT_LOGICS
+                # No keys on the party-dependent widgets: picking another party resets them to its defaults
+                party_logic = selected_party.transport_rate_logic if selected_party else None
+                f1, f2, f3, f4 = st.columns(4)
+                add_freight = f1.checkbox("Add freight to cost", value=selected_party is not None)
+                transport_logic = f2.selectbox("Transport Logic", TRANSPORT_LOGICS,
+                                               index=TRANSPORT_LOGICS.index(party_logic) if party_logic in TRANSPORT_LOGICS else 0)
+                ship_flat = f3.radio("Ship", ["Flat", "Erected"], horizontal=True, key="freight_ship") == "Flat"
+                pallet_name = f4.selectbox("Pallet", ["Loose"] + list(masters.pallets), key="freight_pallet")
+                fixed_amount = None
+                if transport_logic == "fixed":
+                    fixed_amount = st.number_input("Transport per Order (₹)", min_value=0.0,
+                                                   value=float(selected_party.transport_rate or 0.0) if selected_party else 0.0)
+
+                shipped = shipping_size(box_style, joint_type, length, width, height, piece_length, piece_width,
+                                        caliper_mm, ship_flat)
+                options = plan_freight(shipped, total_weight_kg, selected_qty, masters.vehicles, transport_logic,
+                                       masters.pallets.get(pallet_name), fixed_amount)
+                if not options:
+                    st.warning(f"The box (or a loaded pallet) doesn't fit any active vehicle with a {transport_logic} rate.")
+                else:
+                    import pandas as pd
+                    st.dataframe(pd.DataFrame(options)[[
+                        "vehicle", "boxes_per_pallet", "pallets_per_vehicle", "boxes_per_vehicle", "trips",
+                        "limited_by", "freight_per_box", "freight_total"]].round(2), use_container_width=True, hide_index=True)
+                    best = options[0]
+                    st.info(f"Cheapest: {best['trips']} x {best['vehicle']} ({best['boxes_per_vehicle']} boxes each, "
+                            f"{shipped[0]:.0f} x {shipped[1]:.0f} x {shipped[2]:.0f} mm shipped) = "
+                            f"₹{best['freight_per_box']:.2f} per box.")
+                    if add_freight:
+                        freight_cost = best["freight_per_box"]
+
         # Initial calculation for total cost
         amortized_fixed = total_fixed_cost / selected_qty if selected_qty > 0 else 0
-        total_cost = material_cost + variable_conversion_cost + amortized_fixed
+        total_cost = material_cost + variable_conversion_cost + amortized_fixed + freight_cost
         
         # Calculated selling price based on margin
         calc_sp = total_cost / (1 - (margin_input/100)) if margin_input < 100 else 0
         
         # Final Rate Override (The "Button" area)
         final_rate = c_q3.number_input("Final Rate (₹/Box)", value=float(round(calc_sp, 2)), step=0.1)
+        # Data-driven cross-check: what comparable accepted orders were priced at
+        from modules.price_model import suggest_rate
+        hist = suggest_rate(length, width, height, ply, final_weight_kg, selected_qty,
+                            party_id=selected_party.id if selected_party else None)
+        if hist:
+            c_q3.caption(f"📈 History suggests ₹{hist[0]:.2f} (range ₹{hist[1]:.2f}–{hist[2]:.2f})")
         
         # If final rate is changed manually, update margin_input logic (optional, keeping it simple for now as requested)
         selling_price = final_rate
@@ -549,65 +586,33 @@ def calculator_page():
             st.error("Please select a Party to save the quotation.")
         else:
             try:
-                from models import Quotation, QuotationItem
-                from datetime import datetime
-                
-                # --- GENERATE CUSTOM QUOTATION NUMBER ---
-                # 1. Get Initials
-                # e.g. "Jyoti Electrical Industries" -> "JEI"
-                words = selected_party.name.strip().split()
-                initials = "".join([w[0].upper() for w in words if w])[:4] # Max 4 chars
-                if not initials:
-                    initials = "GEN" # Fallback
-                
-                # 2. Find last number for these initials
-                last_q = db.query(Quotation).filter(Quotation.quotation_number.like(f"{initials}-%"))\
-                           .order_by(Quotation.id.desc()).first()
+                from modules.quotations import save_quotation
                 
-                if last_q:
-                    # Extract number part
-                    try:
-                        last_num = int(last_q.quotation_number.split("-")[-1])
-                        new_num = last_num + 1
-                    except:
-                        new_num = 1
-                else:
-                    new_num = 1
-                
-                q_number = f"{initials}-{new_num:04d}"
-                
-                # Create Header
-                new_quotation = Quotation(
-                    quotation_number=q_number,
-                    party_id=selected_party.id,
-                    status="Draft",
-                    total_amount=selling_price * selected_qty
-                )
-                db.add(new_quotation)
-                db.flush() # Get ID
-                
-                # Create Item
-                new_item = QuotationItem(
-                    quotation_id=new_quotation.id,
-                    box_name=box_name_input,
-                    box_type="RSC", # Default for now
-                    length=length,
-                    width=width,
-                    height=height,
-                    unit=unit_selection,
-                    ply=ply,
-                    quantity=selected_qty,
-                    layer_details=current_layer_details, # Save Specs
-                    sheet_weight=final_weight_kg,
-                    box_weight=final_weight_kg,
-                    material_cost=material_cost,
-                    conversion_cost=conversion_cost,
-                    cost_per_box=total_cost,
-                    margin_percent=margin_input,
-                    selling_price=selling_price
-                )
-                db.add(new_item)
-                db.commit()
+                new_quotation = save_quotation(db, selected_party, {
+                    "box_name": box_name_input,
+                    "box_type": box_style,
+                    "length": length,
+                    "width": width,
+                    "height": height,
+                    "unit": unit_selection,
+                    "ply": ply,
+                    "quantity": selected_qty,
+                    "layer_details": current_layer_details, # Save Specs
+                    "sheet_length": sheet_length,
+                    "sheet_width": sheet_width,
+                    "reel_width": suggested_reel_inch,
+                    "ups": ups,
+                    "sheet_weight": final_weight_kg,
+                    "box_weight": final_weight_kg,
+                    "material_cost": material_cost,
+                    "conversion_cost": conversion_cost,
+                    "freight_cost": freight_cost,
+                    "colours": print_colours,
+                    "operation_details": operation_details,
+                    "cost_per_box": total_cost,
+                    "margin_percent": margin_input,
+                    "selling_price": selling_price
+                })
                 
                 st.session_state['last_saved_q_id'] = new_quotation.id
                 st.success(f"Quotation {new_quotation.quotation_number} saved successfully!")
@@ -623,6 +628,9 @@ def calculator_page():
         saved_q = db.query(Quotation).filter(Quotation.id == saved_q_id).first()
         
         if saved_q:
+            # ReportLab is heavy; only import it once there is something to export
+            from modules.pdf_utils import generate_quotation_pdf, generate_whatsapp_link
+            
             st.markdown("### Export & Share")
             c1, c2, c3 = st.columns([1, 1, 2])
             
@@ -0,0 +1,99 @@
+import threading
+from datetime import datetime, date
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models import ChangeLog, Party, PaperRate, OperationRate, ReelSize, Terms, FluteProfile, VehicleType, PalletType, Quotation, QuotationItem
+
+# Append-only change feed for downstream sync (ERP, accounting, spreadsheets).
+# ORM inserts/updates/deletes of tracked models are logged automatically on flush;
+# bulk operations (bulk_*_mappings, query.update/delete) bypass the ORM and must
+# call log_changes() themselves. Rows are written in the same transaction as the
+# change. SQLite has a single writer, so sequence numbers are committed in order.
+
+TRACKED = (Party, PaperRate, OperationRate, ReelSize, Terms, FluteProfile, VehicleType, PalletType, Quotation, QuotationItem)
+DEFAULT_PAGE_SIZE = 500
+
+_local = threading.local() # One Streamlit script thread per session / one API worker per request
+
+def set_current_user(user):
+    _local.user = user
+
+def current_user():
+    return getattr(_local, "user", None)
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _entry(model, entity_id, operation, changes, when, user):
+    return {
+        "entity": model.__tablename__,
+        "entity_id": entity_id,
+        "operation": operation,
+        "changes": {k: _json_value(v) for k, v in (changes or {}).items()},
+        "changed_at": when,
+        "changed_by": user,
+    }
+
+def _values(obj):
+    return {a.key: getattr(obj, a.key) for a in inspect(obj).mapper.column_attrs}
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    when = datetime.utcnow()
+    user = current_user()
+    rows = []
+    for obj in session.new:
+        if isinstance(obj, TRACKED):
+            rows.append(_entry(type(obj), obj.id, "insert", _values(obj), when, user))
+    for obj in session.dirty:
+        if isinstance(obj, TRACKED):
+            state = inspect(obj)
+            changed = {a.key: getattr(obj, a.key) for a in state.mapper.column_attrs
+                       if state.attrs[a.key].history.has_changes()}
+            if changed:
+                rows.append(_entry(type(obj), obj.id, "update", changed, when, user))
+    for obj in session.deleted:
+        if isinstance(obj, TRACKED):
+            rows.append(_entry(type(obj), obj.id, "delete", _values(obj), when, user)) # Last values, for replicas
+    if rows:
+        session.connection().execute(ChangeLog.__table__.insert(), rows)
+
+def log_changes(db, model, operation, rows):
+    """
+    Logs bulk changes made outside the ORM unit of work. rows: for insert/update the
+    mappings that were written (each with "id"), for delete a list of ids or of
+    mappings with the deleted values. Call before commit.
+    """
+    if not rows:
+        return 0
+    when = datetime.utcnow()
+    user = current_user()
+    entries = []
+    for r in rows:
+        if operation == "delete" and not isinstance(r, dict):
+            entries.append(_entry(model, r, "delete", None, when, user))
+        else:
+            entries.append(_entry(model, r["id"], operation, {k: v for k, v in r.items() if k != "id"}, when, user))
+    db.execute(ChangeLog.__table__.insert(), entries)
+    return len(entries)
+
+def changes_since(db, since=0, limit=DEFAULT_PAGE_SIZE, entities=None):
+    """
+    Cursor read: up to `limit` changes with sequence number > since, oldest first.
+    Returns (changes, next_cursor); pass next_cursor as `since` for the next page.
+    """
+    q = db.query(ChangeLog).filter(ChangeLog.id > since)
+    if entities:
+        q = q.filter(ChangeLog.entity.in_(list(entities)))
+    changes = [{
+        "seq": c.id,
+        "entity": c.entity,
+        "entity_id": c.entity_id,
+        "operation": c.operation,
+        "changes": c.changes,
+        "changed_at": c.changed_at.isoformat() if c.changed_at else None,
+        "changed_by": c.changed_by,
+    } for c in q.order_by(ChangeLog.id).limit(limit)]
+    return changes, (changes[-1]["seq"] if changes else since)
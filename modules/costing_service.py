@@ -0,0 +1,306 @@
+import math
+from logic import (get_layer_names, cost_box, cost_boxes, optimize_gsm, board_ect, board_caliper, mckee_bct,
+                   ect_for_bct, LAYER_NAMES)
+from box_styles import STYLES, get_style
+from load_plan import TRANSPORT_LOGICS
+from operation_rules import DRIVERS
+from modules.master_cache import get_masters
+
+# Box specs as JSON (costing API, batch tools). Same defaults as the calculator page:
+# {"length": 12, "width": 8, "height": 6, "unit": "Inch", "ply": 3,
+#  "layers": [{"paper": "Golden", "gsm": 150}, ...], "quantity": 1000}
+# Optional: flutes (flute profile per flute layer, top to bottom, e.g. ["B", "C"] or "BC";
+# without it flute_factor is the take-up), wastage_pct, box_style (box_styles.STYLES code, default RSC),
+# joint_type, cutting_plus, decel_plus, blank_length / blank_width (die-cut; all in the
+# spec unit), max_sheet ([length, width] in the spec unit: best multi-up layout on sheets up
+# to that size), margin_percent, operations (names to apply, default all active; slabs and
+# minimum charges from the master), colours (print colours, for per_colour operations),
+# freight (true, or {"logic": per_kg / per_trip / fixed, "fixed_amount": ₹ per order,
+# "vehicle": name, "pallet": name, "ship": "flat" / "erected"}: transport per box from the
+# cheapest load plan over the active vehicles, added to the cost; logic and fixed amount
+# default to the party's), party (name: the party's negotiated paper / operation rates
+# from its price list are used).
+
+DEFAULT_CUTTING = {"Inch": 1.5, "mm": 40.0}
+MAX_SIZE_MM = 3000.0 # Largest box dimension / die-cut blank side accepted
+
+class SpecError(ValueError):
+    """Invalid box spec; the message is safe to return to the caller."""
+
+def _for_party(spec, masters, party=None):
+    """The party's effective masters (its price list in force) from the rate index."""
+    name = party.name if party else spec.get("party")
+    return masters.party_rates.get(name, masters) if isinstance(name, str) else masters
+
+def _name(value, key):
+    """A master name from the spec (paper, operation, flute, ...); SpecError unless a string."""
+    if not isinstance(value, str):
+        raise SpecError(f"'{key}' must be a name (string), got {value!r}")
+    return value
+
+def _number(spec, key, default=None, minimum=None, below=None):
+    value = spec.get(key, default)
+    if value is None:
+        raise SpecError(f"'{key}' is required")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise SpecError(f"'{key}' must be a number")
+    if not math.isfinite(value): # json.loads accepts NaN / Infinity
+        raise SpecError(f"'{key}' must be a finite number")
+    if minimum is not None and value < minimum:
+        raise SpecError(f"'{key}' must be >= {minimum}")
+    if below is not None and value >= below:
+        raise SpecError(f"'{key}' must be below {below}")
+    return value
+
+def _layers(spec, masters, ply, need_gsm=True):
+    names = get_layer_names(ply)
+    layers = spec.get("layers")
+    if not isinstance(layers, list) or len(layers) != len(names):
+        raise SpecError(f"'layers' must list {len(names)} layers (top to bottom) for {ply} ply")
+    result = []
+    for name, l in zip(names, layers):
+        if isinstance(l, str):
+            l = {"paper": l}
+        if not isinstance(l, dict):
+            raise SpecError(f"Layer '{name}' must be a paper name or {{\"paper\", \"gsm\"}}")
+        paper = masters.papers.get(_name(l.get("paper"), "paper"))
+        if paper is None:
+            raise SpecError(f"Unknown paper '{l.get('paper')}' for {name}")
+        gsm = _number(l, "gsm", minimum=1) if need_gsm else None
+        result.append({"layer": name, "paper": paper.name, "gsm": gsm, "rate": paper.rate, "bf": paper.bf,
+                       "sct_index": paper.sct_index})
+    _apply_flutes(spec, masters, result)
+    return result
+
+def _apply_flutes(spec, masters, layers):
+    """Sets flute, take_up and caliper_mm on the flute layers from spec["flutes"] (if given)."""
+    flutes = spec.get("flutes")
+    if flutes is None:
+        return
+    flute_layers = [l for l in layers if "Flute" in l["layer"]]
+    if isinstance(flutes, str):
+        flutes = [flutes] if flutes in masters.flutes else list(flutes) # "BC" = B over C
+    if not isinstance(flutes, list) or len(flutes) != len(flute_layers):
+        raise SpecError(f"'flutes' must list {len(flute_layers)} flute profile(s), top to bottom")
+    for l, name in zip(flute_layers, flutes):
+        flute = masters.flutes.get(_name(name, "flutes"))
+        if flute is None:
+            raise SpecError(f"Unknown flute profile '{name}'. Known: {', '.join(masters.flutes)}")
+        l.update(flute=flute.name, take_up=flute.take_up, caliper_mm=flute.caliper_mm)
+
+def _size(spec, key, to_mm):
+    """A box dimension in mm (spec in `to_mm` units), at most MAX_SIZE_MM."""
+    value = _number(spec, key, minimum=0) * to_mm
+    if value > MAX_SIZE_MM:
+        raise SpecError(f"'{key}' must be at most {MAX_SIZE_MM / to_mm:.4g} ({MAX_SIZE_MM:g} mm)")
+    return value
+
+def _max_sheet(spec, to_mm):
+    max_sheet = spec.get("max_sheet")
+    if max_sheet is None:
+        return None
+    if not isinstance(max_sheet, list) or len(max_sheet) != 2:
+        raise SpecError("'max_sheet' must be [length, width]")
+    return tuple(_number({"max_sheet": v}, "max_sheet", minimum=1) * to_mm for v in max_sheet)
+
+def _freight(spec, masters, party=None):
+    freight = spec.get("freight")
+    if not freight:
+        return None
+    if freight is True:
+        freight = {}
+    if not isinstance(freight, dict):
+        raise SpecError("'freight' must be true or an object")
+    logic = freight.get("logic") or (party.transport_rate_logic if party else None) or "per_kg"
+    if logic not in TRANSPORT_LOGICS:
+        raise SpecError(f"'freight.logic' must be one of {', '.join(TRANSPORT_LOGICS)}")
+    vehicles = masters.vehicles
+    if freight.get("vehicle") is not None:
+        vehicles = [v for v in vehicles if v.name == _name(freight["vehicle"], "freight.vehicle")]
+        if not vehicles:
+            raise SpecError(f"Unknown or inactive vehicle '{freight['vehicle']}'")
+    if not vehicles:
+        raise SpecError("No active vehicles in the Costing Master (Vehicles & Pallets)")
+    pallet = None
+    if freight.get("pallet") is not None:
+        pallet = masters.pallets.get(_name(freight["pallet"], "freight.pallet"))
+        if pallet is None:
+            raise SpecError(f"Unknown or inactive pallet '{freight['pallet']}'")
+    if freight.get("ship", "flat") not in ("flat", "erected"):
+        raise SpecError("'freight.ship' must be 'flat' or 'erected'")
+    default_amount = (party.transport_rate if party else None) or 0.0
+    return {
+        "logic": logic,
+        "vehicles": vehicles,
+        "pallet": pallet,
+        "flat": freight.get("ship", "flat") == "flat",
+        "fixed_amount": _number(freight, "fixed_amount", default_amount, minimum=0) if logic == "fixed" else None,
+    }
+
+def _ply(spec):
+    layers = spec.get("layers")
+    ply = int(_number(spec, "ply", (len(layers) if isinstance(layers, list) else 0) or None))
+    if ply not in LAYER_NAMES:
+        raise SpecError(f"'ply' must be one of {sorted(LAYER_NAMES)}")
+    return ply
+
+def _operations(spec, masters):
+    wanted = spec.get("operations")
+    ops = masters.operations
+    if wanted is not None:
+        if not isinstance(wanted, list):
+            raise SpecError("'operations' must be a list of operation names")
+        wanted = [_name(w, "operations") for w in wanted]
+        known = {o.name for o in ops}
+        unknown = [w for w in wanted if w not in known]
+        if unknown:
+            raise SpecError(f"Unknown or inactive operation(s): {', '.join(unknown)}")
+        ops = [o for o in ops if o.name in wanted]
+    bad = [f"{o.name} ({o.unit})" for o in ops if o.unit not in DRIVERS]
+    if bad: # A master row the calculator can't cost either
+        raise SpecError(f"Operation(s) with an unknown unit: {', '.join(bad)}; fix them in Masters or leave them "
+                        f"out of 'operations'")
+    return [(o.name, o.rate, o.unit, o.slabs, o.min_charge) for o in ops]
+
+def parse_spec(spec, masters=None, party=None):
+    """
+    Validates a spec and returns cost_box() keyword arguments (all lengths in mm).
+    party: the Party quoted to (its rates and transport logic are the defaults), else
+    spec["party"] (name) for its rates.
+    """
+    if not isinstance(spec, dict):
+        raise SpecError("Spec must be a JSON object")
+    masters = _for_party(spec, masters or get_masters(), party)
+    unit = spec.get("unit", "Inch")
+    if not isinstance(unit, str) or unit not in DEFAULT_CUTTING:
+        raise SpecError("'unit' must be 'Inch' or 'mm'")
+    to_mm = 25.4 if unit == "Inch" else 1.0
+    try:
+        style = get_style(spec.get("box_style", "RSC"))
+    except (ValueError, TypeError):
+        raise SpecError(f"'box_style' must be one of {', '.join(STYLES)}")
+    joint_type = spec.get("joint_type", "1PC")
+    if joint_type not in ("1PC", "2PC"):
+        raise SpecError("'joint_type' must be '1PC' or '2PC'")
+    if joint_type == "2PC" and not style.split:
+        raise SpecError(f"'{style.code}' boxes can't be made 2PC")
+    blank = lambda key: _size(spec, key, to_mm) if style.needs_blank else None
+
+    return {
+        "length_mm": _size(spec, "length", to_mm),
+        "width_mm": _size(spec, "width", to_mm),
+        "height_mm": _size(spec, "height", to_mm),
+        "layers": _layers(spec, masters, _ply(spec)),
+        "operations": _operations(spec, masters),
+        "quantity": int(_number(spec, "quantity", 1000, minimum=1)),
+        "flute_factor": _number(spec, "flute_factor", 1.40, minimum=1.0),
+        "wastage_pct": _number(spec, "wastage_pct", 5.0, minimum=0),
+        "box_style": style.code,
+        "joint_type": joint_type,
+        "blank_length_mm": blank("blank_length"),
+        "blank_width_mm": blank("blank_width"),
+        "cutting_plus_mm": _number(spec, "cutting_plus", DEFAULT_CUTTING[unit]) * to_mm,
+        "decel_plus_mm": _number(spec, "decel_plus", 0.0) * to_mm,
+        "max_sheet_mm": _max_sheet(spec, to_mm),
+        "freight": _freight(spec, masters, party),
+        "colours": int(_number(spec, "colours", 0, minimum=0)),
+        "margin_percent": None if spec.get("margin_percent") is None else _number(spec, "margin_percent", below=100),
+        "reel_widths": masters.reel_widths,
+    }
+
+def cost_spec(spec, masters=None):
+    """Costs one spec. Returns the cost_box() result plus the quantity and order value."""
+    args = parse_spec(spec, masters)
+    result = cost_box(**args)
+    result["quantity"] = args["quantity"]
+    result["total_amount"] = result["selling_price"] * args["quantity"]
+    return result
+
+def cost_specs(specs, masters=None):
+    """
+    Costs a batch of specs in one vectorized pass (logic.cost_boxes). Returns one entry
+    per spec: the cost_spec() result, or the SpecError for an invalid spec.
+    """
+    masters = masters or get_masters()
+    parsed = []
+    for spec in specs:
+        try:
+            parsed.append(parse_spec(spec, masters))
+        except SpecError as e:
+            parsed.append(e)
+    valid = [args for args in parsed if not isinstance(args, SpecError)]
+    costed = iter(cost_boxes(valid))
+    results = []
+    for args in parsed:
+        if isinstance(args, SpecError):
+            results.append(args)
+            continue
+        result = next(costed)
+        result["quantity"] = args["quantity"]
+        result["total_amount"] = result["selling_price"] * args["quantity"]
+        results.append(result)
+    return results
+
+def optimize_spec(spec, masters=None):
+    """
+    GSM optimizer for {"ply", "layers": [paper names], "target_bs", "flute_factor" or "flutes"}.
+    With "target_bct" (kgf) plus the box "length" and "width" (spec unit), the board must
+    also reach that stacking strength (McKee). Returns the cheapest GSM per layer meeting
+    the targets with its edge crush and BCT, or None.
+    """
+    masters = _for_party(spec, masters or get_masters())
+    ply = _ply(spec)
+    flute_factor = _number(spec, "flute_factor", 1.40, minimum=1.0)
+    target_bct = None if spec.get("target_bct") is None else _number(spec, "target_bct", minimum=0)
+    target_bs = _number(spec, "target_bs", 0.0 if target_bct is not None else None, minimum=0)
+    if ply > 7:
+        raise SpecError("The optimizer supports up to 7 ply") # 9 ply = 387M combinations
+    layers = _layers(spec, masters, ply, need_gsm=False)
+
+    perimeter = None
+    min_ect = None
+    if target_bct is not None or "length" in spec:
+        to_mm = 25.4 if spec.get("unit", "Inch") == "Inch" else 1.0
+        perimeter = 2 * (_size(spec, "length", to_mm) + _size(spec, "width", to_mm))
+    if target_bct is not None:
+        min_ect = ect_for_bct(target_bct, board_caliper(layers), perimeter)
+
+    configs = [{"layer": l["layer"], "bf": l["bf"], "rate": l["rate"], "sct_index": l["sct_index"],
+                "flute_factor": (l.get("take_up") or flute_factor) if "Flute" in l["layer"] else 1.0} for l in layers]
+    best_combo, cost_indicator = optimize_gsm(configs, target_bs, min_ect=min_ect)
+    if best_combo is None:
+        return None
+    for l, g in zip(layers, best_combo):
+        l["gsm"] = g
+    ect = board_ect(layers, flute_factor)
+    result = {
+        "layers": [{"layer": l["layer"], "paper": l["paper"], "gsm": l["gsm"], **({"flute": l["flute"]} if l.get("flute") else {})}
+                   for l in layers],
+        "cost_indicator": cost_indicator,
+        "edge_crush": ect,
+    }
+    if perimeter is not None:
+        result["box_compression"] = mckee_bct(ect, board_caliper(layers), perimeter)
+    return result
+
+def create_quotation(db, spec, status="Draft"):
+    """Costs a spec and saves it as a quotation for spec["party"] (name). Returns (quotation, result)."""
+    from models import Party
+    from modules.quotations import save_quotation
+
+    party = db.query(Party).filter(Party.name == spec.get("party"), Party.is_active == True).first()
+    if party is None:
+        raise SpecError(f"Unknown or inactive party '{spec.get('party')}'")
+    args = parse_spec(spec, party=party)
+    result = cost_box(**args)
+    item = {k: result[k] for k in ("sheet_length", "sheet_width", "ups", "reel_width", "box_weight", "material_cost",
+                                   "conversion_cost", "freight_cost", "cost_per_box", "margin_percent", "selling_price",
+                                   "layer_details", "operation_details")}
+    item.update(
+        box_name=spec.get("box_name", ""), box_type=args["box_style"], length=args["length_mm"], width=args["width_mm"],
+        height=args["height_mm"], unit=spec.get("unit", "Inch"), ply=len(args["layers"]),
+        quantity=args["quantity"], sheet_weight=result["box_weight"], colours=args["colours"],
+    )
+    return save_quotation(db, party, item, status=status), result
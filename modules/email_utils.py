@@ -1,10 +1,9 @@
-import smtplib
 import streamlit as st
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
 import os
+from modules.perf import timed
+from modules import metrics
 
+@timed("Email: send_email_with_pdf")
 def send_email_with_pdf(to_email, subject, body, pdf_path):
     """
     Sends an email with a PDF attachment using SMTP credentials from st.secrets.
@@ -18,6 +17,17 @@ def send_email_with_pdf(to_email, subject, body, pdf_path):
     Returns:
         bool: True if sent successfully, False otherwise.
     """
+    sent = _send_email_with_pdf(to_email, subject, body, pdf_path)
+    metrics.inc("box_costing_emails_total", result="sent" if sent else "failed")
+    return sent
+
+def _send_email_with_pdf(to_email, subject, body, pdf_path):
+    # Imported here so the login page doesn't pay for smtplib/email on cold start
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.mime.application import MIMEApplication
+
     # Check for secrets
     if "smtp" not in st.secrets:
         st.error("SMTP secrets not configured! Please add [smtp] section to .streamlit/secrets.toml")
@@ -0,0 +1,114 @@
+import threading
+from sqlalchemy import select, func, cast, String
+from database import SessionLocal
+from models import Quotation, QuotationItem, QuotationItemLayer, ReelSize
+from logic import suggest_reels
+
+# Orders whose paper is committed
+COMMITTED_STATUSES = ("Finalised", "Dispatched")
+
+_GROUP_COLS = ["week", "paper", "gsm", "reel_width"]
+
+# Per-quotation committed kg, kept in memory and patched when a quotation changes status
+_cache = {"rows": None}
+_cache_lock = threading.Lock()
+
+def _load_layers(db, quotation_ids=None):
+    """
+    One query: committed kg per item / paper / GSM (summed in SQLite) with what is
+    needed to bucket it. Dates come back as text and are parsed vectorized.
+    """
+    import pandas as pd
+    kg = func.sum(QuotationItemLayer.weight_kg * QuotationItem.quantity)
+    stmt = select(
+        Quotation.id, cast(Quotation.created_date, String), QuotationItemLayer.paper,
+        QuotationItemLayer.gsm, kg, QuotationItem.reel_width, QuotationItem.sheet_width,
+        QuotationItem.width, QuotationItem.height
+    ).join(QuotationItem, QuotationItem.quotation_id == Quotation.id)\
+     .join(QuotationItemLayer, QuotationItemLayer.item_id == QuotationItem.id)\
+     .where(Quotation.status.in_(COMMITTED_STATUSES))\
+     .group_by(QuotationItem.id, QuotationItemLayer.paper, QuotationItemLayer.gsm)
+    if quotation_ids is not None:
+        stmt = stmt.where(Quotation.id.in_(list(quotation_ids)))
+    return pd.DataFrame(db.execute(stmt).all(), columns=[
+        "quotation_id", "created_date", "paper", "gsm", "kg",
+        "reel_width", "sheet_width", "width", "height"
+    ])
+
+def _committed_rows(df, reel_widths):
+    """
+    Vectorized over all rows: bucket committed kg by order week (Monday) and
+    reel width. Items saved before sheet/reel sizes were stored get an RSC deckle
+    estimate (width + height) and the smallest fitting reel.
+    """
+    import pandas as pd
+    if df.empty:
+        return pd.DataFrame(columns=["quotation_id"] + _GROUP_COLS + ["kg"])
+
+    deckle = df["sheet_width"].fillna(df["width"] + df["height"])
+    est_reel, _ = suggest_reels(deckle.to_numpy(dtype=float), reel_widths)
+    reel = df["reel_width"].fillna(pd.Series(est_reel, index=df.index))
+
+    created = pd.to_datetime(df["created_date"], format="ISO8601")
+    out = pd.DataFrame({
+        "quotation_id": df["quotation_id"],
+        "week": created.dt.normalize() - pd.to_timedelta(created.dt.weekday, unit="D"),
+        "paper": df["paper"],
+        "gsm": df["gsm"],
+        "reel_width": reel.fillna(0.0), # 0 = no reel in master fits
+        "kg": df["kg"].fillna(0.0),
+    })
+    return out.groupby(["quotation_id"] + _GROUP_COLS, as_index=False)["kg"].sum()
+
+def _active_reel_widths(db):
+    return [w for (w,) in db.query(ReelSize.width).filter(ReelSize.is_active == True).order_by(ReelSize.width)]
+
+def refresh_quotations(quotation_ids, db=None):
+    """
+    Incremental refresh after quotations change status / are edited or deleted:
+    only their rows are recomputed. No-op until the forecast was first built.
+    """
+    if _cache["rows"] is None or not quotation_ids:
+        return
+    own_db = db is None
+    db = db or SessionLocal()
+    try:
+        import pandas as pd
+        ids = set(quotation_ids)
+        fresh = _committed_rows(_load_layers(db, ids), _active_reel_widths(db))
+        with _cache_lock:
+            rows = _cache["rows"]
+            rows = rows[~rows["quotation_id"].isin(ids)]
+            _cache["rows"] = pd.concat([rows, fresh], ignore_index=True) if not fresh.empty else rows
+    finally:
+        if own_db:
+            db.close()
+
+def invalidate():
+    """Drop the cache (e.g. after a restore or reel master change); next call rebuilds it."""
+    with _cache_lock:
+        _cache["rows"] = None
+
+def get_committed_paper(db=None):
+    """
+    Committed kg per week / paper / GSM / reel width for Finalised & Dispatched orders.
+    First call computes everything in one pass; later calls reuse the cache.
+    """
+    own_db = db is None
+    db = db or SessionLocal()
+    try:
+        with _cache_lock:
+            rows = _cache["rows"]
+        if rows is None:
+            rows = _committed_rows(_load_layers(db), _active_reel_widths(db))
+            with _cache_lock:
+                _cache["rows"] = rows
+    finally:
+        if own_db:
+            db.close()
+    return rows.groupby(_GROUP_COLS, as_index=False)["kg"].sum().sort_values(_GROUP_COLS)
+
+def purchase_plan(forecast):
+    """Total committed kg per paper / GSM / reel width (all weeks), largest first."""
+    plan = forecast.groupby(["paper", "gsm", "reel_width"], as_index=False)["kg"].sum()
+    return plan.sort_values("kg", ascending=False).reset_index(drop=True)
@@ -0,0 +1,198 @@
+from datetime import datetime
+from models import Party, Quotation, QuotationItem, QuotationItemLayer
+from modules.rate_history import load_paper_rate_history, attach_rates_as_of, BASELINE_DATE
+
+# Monte Carlo margin risk: how much of a quoted margin survives paper rate moves
+# during the validity period ("valid for 15 days" on the PDF / WhatsApp text).
+# Each scenario picks one historical window of that many days and applies every
+# paper's rate change over that window at once (so papers keep moving together
+# as they did). Without enough history, changes are drawn from a normal
+# distribution with FALLBACK_VOL. Only material cost moves; conversion cost and
+# the quoted rate stay fixed.
+
+VALIDITY_DAYS = 15
+LOOKBACK_DAYS = 3 * 365 # Rate history used for the windows
+MIN_WINDOWS = 30 # Fewer distinct windows than this -> fallback distribution
+FALLBACK_VOL = 0.04 # Std. dev. of the log rate change over VALIDITY_DAYS
+SCENARIOS = 10_000
+OPEN_STATUSES = ("Draft", "Finalised") # Quoted, or accepted but paper not bought yet
+CHUNK = 500 # Quotations per block of the per-quotation statistics
+
+def rate_shocks(db, papers, horizon_days=VALIDITY_DAYS, scenarios=SCENARIOS, seed=None, today=None):
+    """
+    (scenarios x papers) log rate changes over `horizon_days`, plus the method used
+    ("history" or "fallback"). Historical windows are sampled jointly for all papers.
+    """
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    fallback_vol = FALLBACK_VOL * np.sqrt(horizon_days / VALIDITY_DAYS) # Scaled to the horizon
+    today = pd.Timestamp(today or datetime.utcnow()).normalize()
+    start = today - pd.Timedelta(days=LOOKBACK_DAYS)
+
+    history = load_paper_rate_history(db)
+    history = history[history["paper"].isin(papers)]
+    # Rates in force on every day of the lookback (baseline rows count from its start)
+    history = history.assign(day=pd.to_datetime(history["effective_from"]).clip(lower=start).dt.normalize())
+    daily = history.sort_values("effective_from").groupby(["day", "paper"])["rate"].last().unstack()
+    daily = daily.reindex(pd.date_range(start, today, freq="D")).ffill().reindex(columns=papers)
+
+    changes = np.log(daily.to_numpy()[horizon_days:] / daily.to_numpy()[:-horizon_days])
+    has_history = (history["effective_from"] > BASELINE_DATE).any()
+    windows = changes[~np.isnan(changes).all(axis=1)]
+    if not has_history or len(windows) < MIN_WINDOWS:
+        return rng.normal(0.0, fallback_vol, (scenarios, len(papers))), "fallback"
+
+    shocks = windows[rng.integers(0, len(windows), scenarios)]
+    # Papers without history in the lookback get the fallback distribution
+    missing = np.isnan(shocks)
+    shocks[missing] = rng.normal(0.0, fallback_vol, missing.sum())
+    return shocks, "history"
+
+def _load_exposures(db, quotation_ids):
+    """
+    Per item: quantity, cost, rate, and its material cost split by paper (by kg x
+    rate in force when quoted, scaled to the saved material cost). Papers on a party's
+    price list are weighted at its negotiated rate (master_cache rate index).
+    """
+    import pandas as pd
+    from modules.master_cache import get_masters
+    rows = db.query(
+        QuotationItem.id, QuotationItem.quotation_id, QuotationItem.quantity, QuotationItem.cost_per_box,
+        QuotationItem.selling_price, QuotationItem.material_cost, Quotation.created_date, Party.name,
+        QuotationItemLayer.paper, QuotationItemLayer.weight_kg
+    ).join(Quotation, Quotation.id == QuotationItem.quotation_id)\
+     .outerjoin(Party, Party.id == Quotation.party_id)\
+     .join(QuotationItemLayer, QuotationItemLayer.item_id == QuotationItem.id)\
+     .filter(QuotationItem.quotation_id.in_(list(quotation_ids))).all()
+    layers = pd.DataFrame(rows, columns=["item_id", "quotation_id", "quantity", "cost_per_box", "selling_price",
+                                         "material_cost", "created_date", "party", "paper", "weight_kg"])
+    if layers.empty:
+        return layers, layers
+    layers = attach_rates_as_of(layers, load_paper_rate_history(db), key="paper")
+    negotiated = pd.Series({(party, paper): rate for party, price_list in get_masters(db).price_lists.items()
+                            for paper, rate in (price_list.get("papers") or {}).items()}, dtype=float)
+    if len(negotiated):
+        by_party = negotiated.reindex(pd.MultiIndex.from_arrays([layers["party"], layers["paper"]])).to_numpy()
+        layers["rate"] = layers["rate"].where(pd.isna(by_party), by_party)
+    layers["value"] = layers["weight_kg"].fillna(0) * layers["rate"].fillna(0)
+    # No known rate for the item's papers: split by weight instead
+    by_value = layers.groupby("item_id")["value"].transform("sum")
+    by_kg = layers.groupby("item_id")["weight_kg"].transform("sum")
+    share = (layers["value"] / by_value).where(by_value > 0, layers["weight_kg"] / by_kg).fillna(0)
+    layers["exposure"] = share * layers["material_cost"].fillna(by_value)
+
+    items = layers.groupby("item_id", as_index=False).agg(
+        quotation_id=("quotation_id", "first"), quantity=("quantity", "first"),
+        cost_per_box=("cost_per_box", "first"), selling_price=("selling_price", "first"))
+    exposure = layers.pivot_table(index="item_id", columns="paper", values="exposure", aggfunc="sum", fill_value=0.0)
+    return items, exposure.reindex(items["item_id"])
+
+def simulate(db, quotation_ids, scenarios=SCENARIOS, horizon_days=VALIDITY_DAYS, seed=None):
+    """
+    Re-costs every item of the quotations under `scenarios` rate paths at once.
+    Returns {"method", "scenarios", "quotations": DataFrame (per quotation: quoted
+    and simulated margin percentiles, probability of loss), "book_margins": array
+    of the whole book's margin % per scenario, "book_loss_prob"}. None if no items.
+    """
+    import numpy as np
+    import pandas as pd
+    items, exposure = _load_exposures(db, quotation_ids)
+    if items.empty:
+        return None
+    papers = list(exposure.columns)
+    shocks, method = rate_shocks(db, papers, horizon_days, scenarios, seed)
+
+    qty = items["quantity"].fillna(0).to_numpy(dtype=float)
+    revenue = qty * items["selling_price"].fillna(0).to_numpy(dtype=float)
+    base_profit = revenue - qty * items["cost_per_box"].fillna(0).to_numpy(dtype=float)
+
+    # Sum items per quotation first; scenarios then only need (scenarios x papers) @ (papers x quotations)
+    q_ids, q_index = np.unique(items["quotation_id"].to_numpy(), return_inverse=True)
+    q_revenue = np.bincount(q_index, weights=revenue)
+    q_base_profit = np.bincount(q_index, weights=base_profit)
+    q_exposure = pd.DataFrame(exposure.to_numpy() * qty[:, None]).groupby(q_index).sum().to_numpy().T
+    rate_factor = np.expm1(shocks)
+
+    stats = {"p5": [], "p50": [], "p95": [], "loss": []}
+    for lo in range(0, len(q_ids), CHUNK): # Bounded memory for a large book
+        hi = lo + CHUNK
+        q_profit = q_base_profit[lo:hi] - rate_factor @ q_exposure[:, lo:hi] # (scenarios x quotations)
+        q_margin = q_profit / np.where(q_revenue[lo:hi] > 0, q_revenue[lo:hi], np.nan) * 100
+        p5, p50, p95 = np.nanpercentile(q_margin, [5, 50, 95], axis=0) if len(q_margin.T) else ([], [], [])
+        stats["p5"].append(p5)
+        stats["p50"].append(p50)
+        stats["p95"].append(p95)
+        stats["loss"].append((q_profit < 0).mean(axis=0) * 100)
+
+    numbers = dict(db.query(Quotation.id, Quotation.quotation_number).filter(Quotation.id.in_(q_ids.tolist())))
+    table = pd.DataFrame({
+        "Q No": [numbers.get(int(q)) for q in q_ids],
+        "Value": q_revenue,
+        "Quoted Margin %": q_base_profit / np.where(q_revenue > 0, q_revenue, np.nan) * 100,
+        "P5 Margin %": np.concatenate(stats["p5"]),
+        "Median Margin %": np.concatenate(stats["p50"]),
+        "P95 Margin %": np.concatenate(stats["p95"]),
+        "P(Loss) %": np.concatenate(stats["loss"]),
+    })
+
+    book_revenue = q_revenue.sum()
+    book_profit = q_base_profit.sum() - rate_factor @ q_exposure.sum(axis=1)
+    return {
+        "method": method,
+        "scenarios": scenarios,
+        "horizon_days": horizon_days,
+        "quotations": table,
+        "book_margins": book_profit / book_revenue * 100 if book_revenue > 0 else np.zeros(scenarios),
+        "book_quoted_margin": q_base_profit.sum() / book_revenue * 100 if book_revenue > 0 else 0.0,
+        "book_loss_prob": float((book_profit < 0).mean()),
+    }
+
+def open_quotation_ids(db, party_id):
+    return [qid for (qid,) in db.query(Quotation.id).filter(Quotation.party_id == party_id,
+                                                              Quotation.status.in_(OPEN_STATUSES))]
+
+def margin_risk_tab(db):
+    """Reports tab: simulate one quotation or a party's open quotations."""
+    import streamlit as st
+    import pandas as pd
+    from models import Party
+
+    st.subheader("Margin Risk (Paper Rate Volatility)")
+    st.caption(f"Re-costs quotations under {SCENARIOS:,} paper rate scenarios drawn from the rate history "
+               f"over the {VALIDITY_DAYS}-day validity. Only material cost moves.")
+
+    mode = st.radio("Simulate", ["Party's open quotations", "One quotation"], horizontal=True, key="risk_mode")
+    if mode == "One quotation":
+        number = st.text_input("Quotation Number", key="risk_qno").strip()
+        q = db.query(Quotation).filter(Quotation.quotation_number == number).first() if number else None
+        ids = [q.id] if q else []
+        if number and not q:
+            st.warning("Quotation not found.")
+    else:
+        parties = db.query(Party).order_by(Party.name).all()
+        party = st.selectbox("Party", parties, format_func=lambda p: p.name, key="risk_party")
+        ids = open_quotation_ids(db, party.id) if party else []
+        st.caption(f"{len(ids)} open ({' / '.join(OPEN_STATUSES)}) quotation(s).")
+
+    if not ids or not st.button("Run Simulation", key="risk_run"):
+        return
+    result = simulate(db, ids)
+    if result is None:
+        st.info("These quotations have no costed items.")
+        return
+
+    book = result["book_margins"]
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Quoted Margin", f"{result['book_quoted_margin']:.1f}%")
+    m2.metric("Median Margin", f"{pd.Series(book).median():.1f}%")
+    m3.metric("Worst 5%", f"{pd.Series(book).quantile(0.05):.1f}%")
+    m4.metric("Probability of Loss", f"{result['book_loss_prob'] * 100:.1f}%")
+    if result["method"] == "fallback":
+        st.caption(f"Not enough rate history yet: assumed ±{FALLBACK_VOL * 100:.0f}% typical paper rate move.")
+
+    hist = pd.cut(pd.Series(book), bins=30).value_counts(sort=False)
+    hist.index = [f"{iv.mid:.1f}" for iv in hist.index]
+    st.markdown("**Realized Margin % Distribution**")
+    st.bar_chart(hist)
+    st.dataframe(result["quotations"].round(2), use_container_width=True, hide_index=True)
@@ -0,0 +1,121 @@
+import time
+import threading
+from collections import namedtuple
+from database import SessionLocal
+from models import Party, PaperRate, OperationRate, ReelSize, Settings, FluteProfile, VehicleType, PalletType
+from logic import DEFAULT_FLUTES
+from load_plan import Vehicle, Pallet
+from operation_rules import parse_slabs
+
+# Paper / operation / reel / flute / transport masters kept in memory for costing (calculator page, costing API).
+# Every save in Masters bumps the "masters_version" setting; each process re-checks that
+# one row at most every CHECK_INTERVAL seconds and reloads when it changed.
+#
+# Party price lists (Party.price_list) are resolved at load time into a per-party rate
+# index: party_rates[party name] is a complete Masters with that party's negotiated paper
+# and operation rates in force (a negotiated operation rate replaces the list rate and
+# its quantity slabs; the minimum charge stays). Costing for a party is then one dict
+# lookup, get_masters(party=name). On reload, a party's rate tables are rebuilt only if
+# its price list or the list paper / operation rates changed.
+
+CHECK_INTERVAL = 5.0
+VERSION_KEY = "masters_version"
+
+Paper = namedtuple("Paper", "id name rate bf sct_index")
+Operation = namedtuple("Operation", "id name rate unit slabs min_charge") # slabs: ((quantity, rate), ...) or None
+Flute = namedtuple("Flute", "id name take_up caliper_mm")
+# papers / flutes / pallets: name -> tuple; price_lists / party_rates: party name -> price list / Masters
+Masters = namedtuple("Masters", "version papers operations reel_widths flutes vehicles pallets price_lists party_rates",
+                     defaults=({}, {}))
+
+_cache = {"masters": None, "checked": 0.0}
+_lock = threading.Lock()
+
+def _current_version(db):
+    return db.query(Settings.value).filter(Settings.key == VERSION_KEY).scalar() or "0"
+
+def bump_version(db):
+    """Marks masters as changed. Call before the commit that saves the master change."""
+    setting = db.query(Settings).filter(Settings.key == VERSION_KEY).first()
+    if setting is None:
+        setting = Settings(key=VERSION_KEY, value="0")
+        db.add(setting)
+    setting.value = str(int(setting.value or 0) + 1)
+    invalidate()
+
+def invalidate():
+    with _lock:
+        _cache["checked"] = 0.0
+
+def _apply_price_list(masters, price_list):
+    """(papers, operations) of `masters` with the price list's rates in force."""
+    paper_rates = price_list.get("papers") or {}
+    op_rates = price_list.get("operations") or {}
+    papers = {name: p._replace(rate=float(paper_rates[name])) if paper_rates.get(name) is not None else p
+              for name, p in masters.papers.items()}
+    operations = [o._replace(rate=float(op_rates[o.name]), slabs=None) if op_rates.get(o.name) is not None else o
+                  for o in masters.operations]
+    return papers, operations
+
+def _party_rates(masters, price_lists, previous=None):
+    """Per party: `masters` with its price list in force. Rate tables carry over from `previous` when unchanged."""
+    same_rates = previous is not None and previous.papers == masters.papers and previous.operations == masters.operations
+    views = {}
+    for name, price_list in price_lists.items():
+        old = previous.party_rates.get(name) if same_rates else None
+        if old is not None and previous.price_lists.get(name) == price_list:
+            papers, operations = old.papers, old.operations
+        else:
+            papers, operations = _apply_price_list(masters, price_list)
+        views[name] = masters._replace(papers=papers, operations=operations)
+    return views
+
+def _load(db, version, previous=None):
+    papers = {p.name: Paper(p.id, p.name, p.rate, p.bf if p.bf else 18.0, p.sct_index)
+              for p in db.query(PaperRate).order_by(PaperRate.id)}
+    operations = [Operation(o.id, o.operation_name, o.rate, o.unit, parse_slabs(o.slabs), o.min_charge)
+                  for o in db.query(OperationRate).filter(OperationRate.is_active == True).order_by(OperationRate.id)]
+    reel_widths = [w for (w,) in db.query(ReelSize.width).filter(ReelSize.is_active == True).order_by(ReelSize.width)]
+    flutes = {f.name: Flute(f.id, f.name, f.take_up, f.caliper_mm)
+              for f in db.query(FluteProfile).filter(FluteProfile.is_active == True).order_by(FluteProfile.id)}
+    if not db.query(FluteProfile.id).first(): # Master never set up: standard profiles
+        flutes = {name: Flute(None, name, take_up, caliper) for name, (take_up, caliper) in DEFAULT_FLUTES.items()}
+    # Rows without their sizes can't be load-planned: left out
+    vehicles = [Vehicle(v.id, v.name, v.length_mm, v.width_mm, v.height_mm, v.max_kg, v.rate_per_trip, v.rate_per_kg)
+                for v in db.query(VehicleType).filter(VehicleType.is_active == True).order_by(VehicleType.id)
+                if v.length_mm and v.width_mm and v.height_mm]
+    pallets = {p.name: Pallet(p.id, p.name, p.length_mm, p.width_mm, p.deck_height_mm or 0.0, p.max_height_mm,
+                              p.max_kg, p.tare_kg)
+               for p in db.query(PalletType).filter(PalletType.is_active == True).order_by(PalletType.id)
+               if p.length_mm and p.width_mm and p.max_height_mm}
+    masters = Masters(version, papers, operations, reel_widths, flutes, vehicles, pallets)
+    price_lists = {name: price_list for name, price_list in db.query(Party.name, Party.price_list).filter(Party.is_active == True)
+                   if price_list and (price_list.get("papers") or price_list.get("operations"))}
+    return masters._replace(price_lists=price_lists, party_rates=_party_rates(masters, price_lists, previous))
+
+def get_masters(db=None, party=None):
+    """
+    Current Masters (papers by name, active operations, sorted active reel widths, active
+    flutes by name, active vehicles, active pallets by name). party: a party name; its
+    negotiated rates are in force (the general masters if it has no price list).
+    """
+    now = time.monotonic()
+    with _lock:
+        masters = _cache["masters"]
+        if masters is not None and now - _cache["checked"] < CHECK_INTERVAL:
+            return masters.party_rates.get(party, masters) if party else masters
+
+    own_db = db is None
+    db = db or SessionLocal()
+    try:
+        version = _current_version(db)
+        if masters is None or masters.version != version:
+            masters = _load(db, version, masters)
+    finally:
+        if own_db:
+            db.close()
+
+    with _lock:
+        _cache["masters"] = masters
+        _cache["checked"] = now
+    return masters.party_rates.get(party, masters) if party else masters
@@ -1,7 +1,11 @@
 import streamlit as st
 import pandas as pd
 from database import get_db, SessionLocal
-from models import Party, PaperRate, OperationRate
+from models import Party, PaperRate, OperationRate, FluteProfile, VehicleType, PalletType, Quotation
+from modules.rate_history import record_rate_changes
+from modules import forecast, master_cache
+from modules.changelog import log_changes
+from operation_rules import DRIVERS, parse_slabs, format_slabs
 
 def party_creation_page():
     st.title("Party Creation")
@@ -17,6 +21,8 @@ def party_creation_page():
     email = col1.text_input("Email Address")
     margin = col2.number_input("Default Margin (%)", value=10.0)
     transport_logic = st.selectbox("Transport Rate Logic", ["per_kg", "per_trip", "fixed"])
+    transport_rate = st.number_input("Fixed Transport per Order (₹)", min_value=0.0, value=0.0,
+                                     help="Used with 'fixed'; per_kg and per_trip take the vehicle rates (Costing Master).")
     
     st.markdown("###")
     if st.button("Save Party", type="primary"):
@@ -28,7 +34,8 @@ def party_creation_page():
                 gst_number=gst, 
                 email=email,
                 default_margin=margin, 
-                transport_rate_logic=transport_logic
+                transport_rate_logic=transport_logic,
+                transport_rate=transport_rate or None
             )
             db.add(new_party)
             db.commit()
@@ -38,6 +45,90 @@ def party_creation_page():
     
     db.close()
 
+NOTICE_KEY = "masters_notice"
+
+def _saved(message):
+    """Reruns to show the saved rows; `message` is shown after the rerun (st.rerun drops this run's output)."""
+    st.session_state[NOTICE_KEY] = message
+    st.rerun()
+
+def _editor_changes(df_original, editor_key, field_map):
+    """
+    Reads the edited-rows state of an st.data_editor and turns it into DB changes.
+    Only cells that actually differ from the originally loaded frame are kept.
+    field_map: editor column name -> model attribute name.
+    Returns (updates, inserts, delete_ids) where updates/inserts are lists of mappings.
+    """
+    state = st.session_state.get(editor_key) or {}
+    ids = df_original["ID"].tolist()
+    delete_ids = [int(ids[i]) for i in state.get("deleted_rows", [])]
+
+    updates = []
+    for row_pos, changes in state.get("edited_rows", {}).items():
+        row_pos = int(row_pos)
+        row_id = int(ids[row_pos])
+        if row_id in delete_ids:
+            continue
+        mapping = {}
+        for col, val in changes.items():
+            if col not in field_map:
+                continue
+            old_val = df_original.iloc[row_pos][col]
+            if pd.isna(old_val) and val is None:
+                continue
+            if val == old_val:
+                continue
+            mapping[field_map[col]] = val
+        if mapping:
+            mapping["id"] = row_id
+            updates.append(mapping)
+
+    inserts = []
+    for row in state.get("added_rows", []):
+        mapping = {field_map[col]: val for col, val in row.items() if col in field_map and val is not None}
+        if mapping:
+            inserts.append(mapping)
+
+    return updates, inserts, delete_ids
+
+def _apply_editor_changes(db, model, updates, inserts, delete_ids, on_changed=None):
+    """
+    Applies an editor diff in a single transaction: one bulk UPDATE of the changed
+    cells, one bulk INSERT of new rows and one DELETE for removed rows.
+    on_changed(updates, inserts) runs before commit (inserts carry their new "id").
+    Returns number of rows touched.
+    """
+    try:
+        if updates:
+            db.bulk_update_mappings(model, updates)
+        if inserts:
+            db.bulk_insert_mappings(model, inserts, return_defaults=True)
+        deleted = []
+        if delete_ids:
+            # Keep the deleted values in the change feed (replicas match masters by name)
+            deleted = [{c.name: getattr(r, c.name) for c in model.__table__.columns}
+                       for r in db.query(model).filter(model.id.in_(delete_ids))]
+            db.query(model).filter(model.id.in_(delete_ids)).delete(synchronize_session=False)
+        # Bulk statements skip ORM events, so the change feed is written here
+        log_changes(db, model, "update", updates)
+        log_changes(db, model, "insert", inserts)
+        log_changes(db, model, "delete", deleted)
+        if on_changed:
+            on_changed(updates, inserts)
+        master_cache.bump_version(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(updates) + len(inserts) + len(delete_ids)
+
+def _rate_history_hook(db, model, fields):
+    """Builds an on_changed callback that logs rate history for rows whose rate fields changed."""
+    def hook(updates, inserts):
+        ids = [m["id"] for m in updates if fields & m.keys()] + [m["id"] for m in inserts if "id" in m]
+        record_rate_changes(db, model, ids, user=st.session_state.get("username"))
+    return hook
+
 def _party_master_subpage():
     st.subheader("Party Master - View & Edit")
     
@@ -52,11 +143,12 @@ def _party_master_subpage():
             "GST": p.gst_number, 
             "Email": p.email,
             "Margin": p.default_margin, 
-            "Transport": p.transport_rate_logic
+            "Transport": p.transport_rate_logic,
+            "Fixed Transport": p.transport_rate
         } for p in parties]
         
         df_parties = pd.DataFrame(data)
-        edited_parties = st.data_editor(
+        st.data_editor(
             df_parties, 
             key="party_editor",
             column_config={
@@ -67,7 +159,10 @@ def _party_master_subpage():
                     validate="^[0-9]*$", # Basic validation
                     required=False
                 ),
-                "Email": st.column_config.TextColumn("Email")
+                "Email": st.column_config.TextColumn("Email"),
+                "Transport": st.column_config.SelectboxColumn("Transport", options=["per_kg", "per_trip", "fixed"]),
+                "Fixed Transport": st.column_config.NumberColumn("Fixed Transport", format="₹%.0f",
+                                                                 help="Freight per order for 'fixed'")
             }, 
             disabled=["ID"], 
             use_container_width=True,
@@ -75,30 +170,86 @@ def _party_master_subpage():
         )
         
         if st.button("Save Party Changes"):
-            for index, row in edited_parties.iterrows():
-                # Check if new row (ID might be missing if we allowed add? dynamic)
-                # For now let's assume editing existing. dynamic adding rows via editor is tricky without ID handling.
-                # If ID exists, update.
-                if "ID" in row and pd.notna(row["ID"]):
-                    p_id = int(row["ID"])
-                    p_obj = db.query(Party).filter(Party.id == p_id).first()
-                    if p_obj:
-                        p_obj.name = row["Name"]
-                        p_obj.address = row["Address"]
-                        p_obj.mobile_number = row["Mobile"]
-                        p_obj.gst_number = row["GST"]
-                        p_obj.email = row["Email"]
-                        p_obj.default_margin = row["Margin"]
-                        p_obj.transport_rate_logic = row["Transport"]
-                # Else handle new... logic omitted for simplicity unless requested
-            db.commit()
-            st.success("Party details updated successfully!")
-            st.rerun()
+            field_map = {
+                "Name": "name",
+                "Address": "address",
+                "Mobile": "mobile_number",
+                "GST": "gst_number",
+                "Email": "email",
+                "Margin": "default_margin",
+                "Transport": "transport_rate_logic",
+                "Fixed Transport": "transport_rate"
+            }
+            updates, inserts, delete_ids = _editor_changes(df_parties, "party_editor", field_map)
+            
+            # New rows need a name (unique, used for quotation numbers)
+            skipped = [m for m in inserts if not m.get("name")]
+            inserts = [m for m in inserts if m.get("name")]
+            
+            # Parties with quotations can't be deleted, they are deactivated instead
+            if delete_ids:
+                used_ids = {pid for (pid,) in db.query(Quotation.party_id).filter(Quotation.party_id.in_(delete_ids)).distinct()}
+                for pid in used_ids:
+                    updates.append({"id": pid, "is_active": False})
+                delete_ids = [pid for pid in delete_ids if pid not in used_ids]
+            
+            try:
+                touched = _apply_editor_changes(db, Party, updates, inserts, delete_ids)
+                _saved(f"Party details saved! {touched} row(s) touched ({len(updates)} updated, {len(inserts)} added, "
+                       f"{len(delete_ids)} deleted)." + (f" {len(skipped)} new row(s) without a Name were skipped." if skipped else ""))
+            except Exception as e:
+                st.error(f"Error saving parties: {e}")
+        _price_list_section(db, [p for p in parties if p.is_active])
     else:
         st.info("No parties found.")
     
     db.close()
 
+def _price_list_section(db, parties):
+    """Negotiated paper / operation rates of one party (Party.price_list); blank = list rate."""
+    st.markdown("---")
+    st.markdown("#### Price List (Negotiated Rates)")
+    if not parties:
+        return
+    party = st.selectbox("Party", parties, format_func=lambda p: p.name, key="price_list_party")
+    masters = master_cache.get_masters(db)
+    price_list = party.price_list or {}
+    paper_rates = price_list.get("papers") or {}
+    op_rates = price_list.get("operations") or {}
+    rows = [{"Kind": "Paper", "Name": p.name, "Unit": "per_kg", "List Rate": p.rate,
+             "Negotiated Rate": paper_rates.get(p.name)} for p in masters.papers.values()]
+    rows += [{"Kind": "Operation", "Name": o.name, "Unit": o.unit, "List Rate": o.rate,
+              "Negotiated Rate": op_rates.get(o.name)} for o in masters.operations]
+    st.caption("Leave blank to use the list rate. A negotiated operation rate replaces its quantity slabs; "
+               "the minimum charge still applies.")
+    edited = st.data_editor(
+        pd.DataFrame(rows, columns=["Kind", "Name", "Unit", "List Rate", "Negotiated Rate"]),
+        key=f"price_list_{party.id}", # Per party: switching parties drops unsaved edits
+        column_config={"Negotiated Rate": st.column_config.NumberColumn("Negotiated Rate", min_value=0.0, format="₹%.2f")},
+        disabled=["Kind", "Name", "Unit", "List Rate"],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    if st.button("Save Price List"):
+        shown = {(r["Kind"], r["Name"]) for r in rows}
+        # Rates for papers / operations not listed (e.g. deactivated) are kept
+        papers = {name: rate for name, rate in paper_rates.items() if ("Paper", name) not in shown}
+        operations = {name: rate for name, rate in op_rates.items() if ("Operation", name) not in shown}
+        for row in edited.to_dict("records"):
+            rate = row["Negotiated Rate"]
+            if rate is not None and rate == rate: # Not blank / NaN
+                (papers if row["Kind"] == "Paper" else operations)[row["Name"]] = float(rate)
+        new_list = {"papers": papers, "operations": operations} if papers or operations else None
+        if new_list == (party.price_list or None):
+            st.info("No changes to save.")
+            return
+        try:
+            _apply_editor_changes(db, Party, [{"id": party.id, "price_list": new_list}], [], [])
+            _saved(f"Price list for {party.name} saved ({len(papers)} paper, {len(operations)} operation rate(s)).")
+        except Exception as e:
+            st.error(f"Error saving price list: {e}")
+
 def _costing_master_subpage():
     from models import User
     from passlib.context import CryptContext
@@ -136,91 +287,259 @@ def _costing_master_subpage():
             st.session_state["user_role"] = "User"
             st.rerun()
     
-    tab1, tab2 = st.tabs(["Paper Rates", "Operation Rates"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Paper Rates", "Operation Rates", "Flute Profiles", "Vehicles & Pallets"])
     db = SessionLocal()
     
     with tab1:
         st.subheader("Paper Rates")
         with st.form("add_paper_form", clear_on_submit=True):
-            c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+            c1, c2, c3, c4, c5 = st.columns([2, 1, 1, 1, 1])
             p_name = c1.text_input("Paper Name")
             rate = c2.number_input("Rate (₹/kg)", min_value=0.0)
             bf = c3.number_input("Burst Factor (BF)", min_value=0.0, value=18.0)
-            submitted = c4.form_submit_button("Add Rate")
+            sct = c4.number_input("SCT Index (N·m/g)", min_value=0.0, value=0.0,
+                                  help="Short-span compression index from the mill's test report. 0 = estimate from BF.")
+            submitted = c5.form_submit_button("Add Rate")
             if submitted and p_name:
-                db.add(PaperRate(name=p_name, rate=rate, bf=bf))
+                new_rate = PaperRate(name=p_name, rate=rate, bf=bf, sct_index=sct or None)
+                db.add(new_rate)
+                db.flush()
+                record_rate_changes(db, PaperRate, [new_rate.id], user=st.session_state.get("username"))
+                master_cache.bump_version(db)
                 db.commit()
-                st.success("Added")
-                st.rerun()
+                _saved(f"Paper '{p_name}' added.")
         
         st.markdown("### Edit Rates")
         rates = db.query(PaperRate).all()
         if rates:
-            df_rates = pd.DataFrame([{"ID": r.id, "Name": r.name, "Rate": r.rate, "BF": r.bf} for r in rates])
-            edited_rates = st.data_editor(
+            df_rates = pd.DataFrame([{"ID": r.id, "Name": r.name, "Rate": r.rate, "BF": r.bf, "SCT Index": r.sct_index}
+                                     for r in rates])
+            st.data_editor(
                 df_rates, 
                 key="paper_editor",
                 column_config={
                     "ID": None,
                     "Rate": st.column_config.NumberColumn("Rate", format="₹%.2f"),
-                    "BF": st.column_config.NumberColumn("BF", format="%.1f")
+                    "BF": st.column_config.NumberColumn("BF", format="%.1f"),
+                    "SCT Index": st.column_config.NumberColumn("SCT Index", format="%.1f",
+                                                               help="N·m/g; blank = estimate from BF")
                 }, 
                 disabled=["ID"],
-                use_container_width=True
+                use_container_width=True,
+                num_rows="dynamic"
             )
             
             if st.button("Save Paper Changes"):
-                # Iterate and update
-                for index, row in edited_rates.iterrows():
-                    r_id = int(row["ID"])
-                    r_obj = db.query(PaperRate).filter(PaperRate.id == r_id).first()
-                    if r_obj:
-                        r_obj.name = row["Name"]
-                        r_obj.rate = row["Rate"]
-                        r_obj.bf = row["BF"]
-                db.commit()
-                st.success("Paper Rates Updated!")
-                st.rerun()
+                updates, inserts, delete_ids = _editor_changes(df_rates, "paper_editor", {"Name": "name", "Rate": "rate", "BF": "bf", "SCT Index": "sct_index"})
+                skipped = [m for m in inserts if not m.get("name")]
+                inserts = [m for m in inserts if m.get("name")]
+                try:
+                    touched = _apply_editor_changes(db, PaperRate, updates, inserts, delete_ids,
+                                                    on_changed=_rate_history_hook(db, PaperRate, {"name", "rate", "bf"}))
+                    _saved(f"Paper Rates Updated! {touched} row(s) touched ({len(updates)} updated, {len(inserts)} added, "
+                           f"{len(delete_ids)} deleted)." + (f" {len(skipped)} new row(s) without a Name were skipped." if skipped else ""))
+                except Exception as e:
+                    st.error(f"Error saving paper rates: {e}")
 
     with tab2:
         st.subheader("Operation Rates")
+        st.caption("Each operation charges its rate per unit of its driver. Slabs ('5000:0.9, 20000:0.8') "
+                   "lower the rate from that order quantity on; a minimum charge applies per order.")
         with st.form("add_op_form", clear_on_submit=True):
-            c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+            c1, c2, c3, c4, c5, c6 = st.columns([2, 1, 1, 2, 1, 1])
             op_name = c1.text_input("Operation")
             op_rate = c2.number_input("Rate", min_value=0.0)
-            unit = c3.selectbox("Unit", ["per_kg", "per_box", "fixed"])
-            submitted = c4.form_submit_button("Add Op")
+            unit = c3.selectbox("Unit", list(DRIVERS), format_func=lambda u: f"{u} ({DRIVERS[u].label})")
+            slabs_text = c4.text_input("Quantity Slabs", placeholder="5000:0.9, 20000:0.8")
+            min_charge = c5.number_input("Min Charge (₹)", min_value=0.0)
+            submitted = c6.form_submit_button("Add Op")
             if submitted and op_name:
-                db.add(OperationRate(operation_name=op_name, rate=op_rate, unit=unit))
-                db.commit()
-                st.success("Added")
-                st.rerun()
+                try:
+                    slabs = parse_slabs(slabs_text)
+                    new_op = OperationRate(operation_name=op_name, rate=op_rate, unit=unit,
+                                           slabs=[list(x) for x in slabs] if slabs else None, min_charge=min_charge or None)
+                    db.add(new_op)
+                    db.flush()
+                    record_rate_changes(db, OperationRate, [new_op.id], user=st.session_state.get("username"))
+                    master_cache.bump_version(db)
+                    db.commit()
+                    _saved(f"Operation '{op_name}' added.")
+                except ValueError as e:
+                    st.error(str(e))
                 
         st.markdown("### Edit Operations")
         ops = db.query(OperationRate).all()
         if ops:
-            df_ops = pd.DataFrame([{"ID": o.id, "Operation": o.operation_name, "Rate": o.rate, "Unit": o.unit} for o in ops])
-            edited_ops = st.data_editor(
+            df_ops = pd.DataFrame([{"ID": o.id, "Operation": o.operation_name, "Rate": o.rate, "Unit": o.unit,
+                                    "Slabs": format_slabs(parse_slabs(o.slabs)), "Min Charge": o.min_charge,
+                                    "Active": o.is_active} for o in ops])
+            st.data_editor(
                 df_ops,
                 key="op_editor",
-                column_config={"ID": None},
+                column_config={
+                    "ID": None,
+                    "Unit": st.column_config.SelectboxColumn("Unit", options=list(DRIVERS)),
+                    "Slabs": st.column_config.TextColumn("Slabs", help="quantity:rate pairs, e.g. 5000:0.9, 20000:0.8"),
+                    "Min Charge": st.column_config.NumberColumn("Min Charge", format="₹%.0f", min_value=0.0),
+                    "Active": st.column_config.CheckboxColumn("Active"),
+                },
                 disabled=["ID"],
-                use_container_width=True
+                use_container_width=True,
+                num_rows="dynamic"
             )
             
             if st.button("Save Operation Changes"):
-                for index, row in edited_ops.iterrows():
-                    o_id = int(row["ID"])
-                    o_obj = db.query(OperationRate).filter(OperationRate.id == o_id).first()
-                    if o_obj:
-                        o_obj.operation_name = row["Operation"]
-                        o_obj.rate = row["Rate"]
-                        o_obj.unit = row["Unit"]
-                db.commit()
-                st.success("Operation Rates Updated!")
-                st.rerun()
+                updates, inserts, delete_ids = _editor_changes(df_ops, "op_editor", {
+                    "Operation": "operation_name", "Rate": "rate", "Unit": "unit", "Slabs": "slabs",
+                    "Min Charge": "min_charge", "Active": "is_active"})
+                # New rows need a name and a cost driver
+                skipped = [m for m in inserts if not m.get("operation_name") or m.get("unit") not in DRIVERS]
+                inserts = [m for m in inserts if m not in skipped]
+                try:
+                    for m in updates + inserts: # Slab text -> [[quantity, rate], ...]
+                        if "slabs" in m:
+                            slabs = parse_slabs(m["slabs"] or None)
+                            m["slabs"] = [list(x) for x in slabs] if slabs else None
+                    # Slabs and minimum charge price the operation too: their changes go to the history
+                    hook = _rate_history_hook(db, OperationRate, {"operation_name", "rate", "unit", "slabs", "min_charge"})
+                    touched = _apply_editor_changes(db, OperationRate, updates, inserts, delete_ids, on_changed=hook)
+                    _saved(f"Operation Rates Updated! {touched} row(s) touched ({len(updates)} updated, {len(inserts)} added, "
+                           f"{len(delete_ids)} deleted)." + (f" {len(skipped)} new row(s) without an Operation or Unit were skipped." if skipped else ""))
+                except Exception as e:
+                    st.error(f"Error saving operation rates: {e}")
+
+    with tab3:
+        _flute_profiles_tab(db)
+    with tab4:
+        _transport_tab(db)
     db.close()
 
+def _flute_profiles_tab(db):
+    from logic import DEFAULT_FLUTES
+    st.subheader("Flute Profiles")
+    st.caption("Take-up (flute factor) prices the fluting paper; caliper feeds the box compression (BCT) estimate.")
+    if not db.query(FluteProfile.id).first(): # First visit: the standard profiles
+        db.add_all([FluteProfile(name=name, take_up=take_up, caliper_mm=caliper)
+                    for name, (take_up, caliper) in DEFAULT_FLUTES.items()])
+        master_cache.bump_version(db)
+        db.commit()
+
+    flutes = db.query(FluteProfile).order_by(FluteProfile.id).all()
+    df_flutes = pd.DataFrame([{"ID": f.id, "Flute": f.name, "Take-up": f.take_up, "Caliper (mm)": f.caliper_mm,
+                               "Active": f.is_active} for f in flutes])
+    st.data_editor(
+        df_flutes,
+        key="flute_editor",
+        column_config={
+            "ID": None,
+            "Take-up": st.column_config.NumberColumn("Take-up", format="%.2f", min_value=1.0),
+            "Caliper (mm)": st.column_config.NumberColumn("Caliper (mm)", format="%.1f", min_value=0.0),
+            "Active": st.column_config.CheckboxColumn("Active"),
+        },
+        disabled=["ID"],
+        num_rows="dynamic",
+        use_container_width=True
+    )
+    if st.button("Save Flute Profiles"):
+        updates, inserts, delete_ids = _editor_changes(df_flutes, "flute_editor", {
+            "Flute": "name", "Take-up": "take_up", "Caliper (mm)": "caliper_mm", "Active": "is_active"})
+        try:
+            touched = _apply_editor_changes(db, FluteProfile, updates, inserts, delete_ids)
+            _saved(f"Flute Profiles Updated! {touched} row(s) touched.")
+        except Exception as e:
+            st.error(f"Error saving flute profiles: {e}")
+
+def _blank_sizes(updates, inserts, required):
+    """Editor changes that would leave a required size empty: (updates clearing one, new rows missing one)."""
+    blank = lambda v: v is None or v != v or v <= 0
+    return ([m for m in updates if any(f in m and blank(m[f]) for f in required)],
+            [m for m in inserts if not m.get("name") or any(blank(m.get(f)) for f in required)])
+
+def _transport_tab(db):
+    from load_plan import DEFAULT_VEHICLES, DEFAULT_PALLETS
+    st.subheader("Vehicles")
+    st.caption("Cargo space and payload for load planning; ₹/trip is charged to per_trip parties, ₹/kg to per_kg parties.")
+    if not db.query(VehicleType.id).first() and not db.query(PalletType.id).first(): # First visit: typical fleet
+        db.add_all([VehicleType(name=n, length_mm=l, width_mm=w, height_mm=h, max_kg=kg, rate_per_trip=trip, rate_per_kg=per_kg)
+                    for n, l, w, h, kg, trip, per_kg in DEFAULT_VEHICLES])
+        db.add_all([PalletType(name=n, length_mm=l, width_mm=w, deck_height_mm=deck, max_height_mm=h, max_kg=kg, tare_kg=tare)
+                    for n, l, w, deck, h, kg, tare in DEFAULT_PALLETS])
+        master_cache.bump_version(db)
+        db.commit()
+
+    mm = lambda label: st.column_config.NumberColumn(label, format="%.0f", min_value=0.0)
+    vehicles = db.query(VehicleType).order_by(VehicleType.id).all()
+    df_vehicles = pd.DataFrame([{"ID": v.id, "Vehicle": v.name, "Length (mm)": v.length_mm, "Width (mm)": v.width_mm,
+                                 "Height (mm)": v.height_mm, "Payload (kg)": v.max_kg, "₹/Trip": v.rate_per_trip,
+                                 "₹/kg": v.rate_per_kg, "Active": v.is_active} for v in vehicles])
+    st.data_editor(
+        df_vehicles,
+        key="vehicle_editor",
+        column_config={
+            "ID": None,
+            "Length (mm)": mm("Length (mm)"), "Width (mm)": mm("Width (mm)"), "Height (mm)": mm("Height (mm)"),
+            "Payload (kg)": mm("Payload (kg)"),
+            "₹/Trip": st.column_config.NumberColumn("₹/Trip", format="₹%.0f", min_value=0.0),
+            "₹/kg": st.column_config.NumberColumn("₹/kg", format="₹%.2f", min_value=0.0),
+            "Active": st.column_config.CheckboxColumn("Active"),
+        },
+        disabled=["ID"],
+        num_rows="dynamic",
+        use_container_width=True
+    )
+    if st.button("Save Vehicles"):
+        updates, inserts, delete_ids = _editor_changes(df_vehicles, "vehicle_editor", {
+            "Vehicle": "name", "Length (mm)": "length_mm", "Width (mm)": "width_mm", "Height (mm)": "height_mm",
+            "Payload (kg)": "max_kg", "₹/Trip": "rate_per_trip", "₹/kg": "rate_per_kg", "Active": "is_active"})
+        # Load planning needs the cargo size of every vehicle
+        cleared, skipped = _blank_sizes(updates, inserts, ("length_mm", "width_mm", "height_mm"))
+        inserts = [m for m in inserts if m not in skipped]
+        if cleared:
+            st.error(f"Length, width and height can't be blank ({len(cleared)} row(s)). Nothing saved.")
+        else:
+            try:
+                touched = _apply_editor_changes(db, VehicleType, updates, inserts, delete_ids)
+                _saved(f"Vehicles Updated! {touched} row(s) touched." +
+                       (f" {len(skipped)} new row(s) without a name or size were skipped." if skipped else ""))
+            except Exception as e:
+                st.error(f"Error saving vehicles: {e}")
+
+    st.subheader("Pallets")
+    pallets = db.query(PalletType).order_by(PalletType.id).all()
+    df_pallets = pd.DataFrame([{"ID": p.id, "Pallet": p.name, "Length (mm)": p.length_mm, "Width (mm)": p.width_mm,
+                                "Deck (mm)": p.deck_height_mm, "Max Height (mm)": p.max_height_mm,
+                                "Max Load (kg)": p.max_kg, "Tare (kg)": p.tare_kg, "Active": p.is_active} for p in pallets])
+    st.data_editor(
+        df_pallets,
+        key="pallet_editor",
+        column_config={
+            "ID": None,
+            "Length (mm)": mm("Length (mm)"), "Width (mm)": mm("Width (mm)"), "Deck (mm)": mm("Deck (mm)"),
+            "Max Height (mm)": st.column_config.NumberColumn("Max Height (mm)", format="%.0f", min_value=0.0,
+                                                             help="Loaded height incl. the deck"),
+            "Max Load (kg)": mm("Max Load (kg)"), "Tare (kg)": mm("Tare (kg)"),
+            "Active": st.column_config.CheckboxColumn("Active"),
+        },
+        disabled=["ID"],
+        num_rows="dynamic",
+        use_container_width=True
+    )
+    if st.button("Save Pallets"):
+        updates, inserts, delete_ids = _editor_changes(df_pallets, "pallet_editor", {
+            "Pallet": "name", "Length (mm)": "length_mm", "Width (mm)": "width_mm", "Deck (mm)": "deck_height_mm",
+            "Max Height (mm)": "max_height_mm", "Max Load (kg)": "max_kg", "Tare (kg)": "tare_kg", "Active": "is_active"})
+        cleared, skipped = _blank_sizes(updates, inserts, ("length_mm", "width_mm", "max_height_mm"))
+        inserts = [m for m in inserts if m not in skipped]
+        if cleared:
+            st.error(f"Length, width and max height can't be blank ({len(cleared)} row(s)). Nothing saved.")
+        else:
+            try:
+                touched = _apply_editor_changes(db, PalletType, updates, inserts, delete_ids)
+                _saved(f"Pallets Updated! {touched} row(s) touched." +
+                       (f" {len(skipped)} new row(s) without a name or size were skipped." if skipped else ""))
+            except Exception as e:
+                st.error(f"Error saving pallets: {e}")
+
 def _terms_master_subpage():
     from models import Terms
     st.subheader("Terms & Conditions")
@@ -259,9 +578,10 @@ def _reel_master_subpage():
             exists = db.query(ReelSize).filter(ReelSize.width == r_width).first()
             if not exists:
                 db.add(ReelSize(width=r_width))
+                master_cache.bump_version(db)
                 db.commit()
-                st.success(f"Added {r_width} inch reel.")
-                st.rerun()
+                forecast.invalidate()
+                _saved(f"Added {r_width} inch reel.")
             else:
                 st.warning("Size already exists.")
 
@@ -271,7 +591,7 @@ def _reel_master_subpage():
         data = [{"ID": r.id, "Width (Inch)": r.width, "Active": r.is_active} for r in reels]
         df_reels = pd.DataFrame(data)
         
-        edited_reels = st.data_editor(
+        st.data_editor(
             df_reels,
             key="reel_editor",
             column_config={
@@ -280,24 +600,29 @@ def _reel_master_subpage():
                 "Active": st.column_config.CheckboxColumn("Active")
             },
             disabled=["ID"],
-            use_container_width=True
+            use_container_width=True,
+            num_rows="dynamic"
         )
         
         if st.button("Save Reel Changes"):
-            for index, row in edited_reels.iterrows():
-                r_id = int(row["ID"])
-                r_obj = db.query(ReelSize).filter(ReelSize.id == r_id).first()
-                if r_obj:
-                    r_obj.width = row["Width (Inch)"]
-                    r_obj.is_active = row["Active"]
-            db.commit()
-            st.success("Reel Master Updated!")
-            st.rerun()
+            updates, inserts, delete_ids = _editor_changes(df_reels, "reel_editor", {"Width (Inch)": "width", "Active": "is_active"})
+            skipped = [m for m in inserts if not m.get("width")]
+            inserts = [m for m in inserts if m.get("width")]
+            try:
+                touched = _apply_editor_changes(db, ReelSize, updates, inserts, delete_ids)
+                forecast.invalidate() # Reel estimates depend on active reels
+                _saved(f"Reel Master Updated! {touched} row(s) touched ({len(updates)} updated, {len(inserts)} added, "
+                       f"{len(delete_ids)} deleted)." + (f" {len(skipped)} new row(s) without a Width were skipped." if skipped else ""))
+            except Exception as e:
+                st.error(f"Error saving reel sizes: {e}")
             
     db.close()
 
 def masters_page():
     st.title("Masters Configuration")
+    notice = st.session_state.pop(NOTICE_KEY, None)
+    if notice:
+        st.success(notice)
     
     tab1, tab2, tab3, tab4 = st.tabs(["Costing Master", "Party Master", "Reel Master", "Terms & Conditions"])
     
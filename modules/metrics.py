@@ -0,0 +1,150 @@
+import os
+import time
+import logging
+import threading
+
+# In-memory operational metrics, served in Prometheus text format on localhost.
+# Everything is updated by the app as things happen; a scrape never queries the database.
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = int(os.environ.get("BOX_COSTING_METRICS_PORT", "9108")) # 0 disables the endpoint
+ACTIVE_SESSION_WINDOW = 300 # Seconds since last rerun for a session to count as active
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help, histogram buckets)
+_DEFINITIONS = {
+    "box_costing_quotations_saved_total": ("counter", "Quotations saved.", None),
+    "box_costing_pdf_generation_seconds": ("histogram", "Quotation PDF generation time (count = PDFs generated).", LATENCY_BUCKETS),
+    "box_costing_emails_total": ("counter", "Quotation emails by result (sent / failed).", None),
+    "box_costing_rerun_seconds": ("histogram", "Streamlit page rerun time.", LATENCY_BUCKETS),
+    "box_costing_last_backup_timestamp_seconds": ("gauge", "Unix time of the newest backup.", None),
+    "box_costing_last_backup_bytes": ("gauge", "Size of the newest backup.", None),
+}
+
+_lock = threading.Lock()
+_values = {} # (name, labels) -> float, or histogram state [bucket counts..., sum, count]
+_sessions = {} # session key -> last seen
+_server = {"started": False}
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def inc(name, amount=1, **labels):
+    with _lock:
+        k = _key(name, labels)
+        _values[k] = _values.get(k, 0) + amount
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _values[_key(name, labels)] = value
+
+def observe(name, value, **labels):
+    buckets = _DEFINITIONS[name][2]
+    with _lock:
+        k = _key(name, labels)
+        state = _values.get(k)
+        if state is None:
+            state = _values[k] = [0] * len(buckets) + [0.0, 0]
+        for i, le in enumerate(buckets):
+            if value <= le:
+                state[i] += 1
+        state[-2] += value
+        state[-1] += 1
+
+def session_seen(session_key):
+    """Called on every rerun; sessions seen within ACTIVE_SESSION_WINDOW count as active."""
+    now = time.time()
+    with _lock:
+        _sessions[session_key] = now
+        for k in [k for k, t in _sessions.items() if now - t > ACTIVE_SESSION_WINDOW]:
+            del _sessions[k]
+
+def backup_written(path):
+    """Record the newest backup (after create / on startup from the backup folder)."""
+    try:
+        set_gauge("box_costing_last_backup_timestamp_seconds", os.path.getmtime(path))
+        set_gauge("box_costing_last_backup_bytes", os.path.getsize(path))
+    except OSError:
+        pass
+
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def render():
+    """All metrics in Prometheus text exposition format."""
+    from database import DB_PATH
+    now = time.time()
+    with _lock:
+        values = {k: (list(v) if isinstance(v, list) else v) for k, v in _values.items()}
+        active = sum(1 for t in _sessions.values() if now - t <= ACTIVE_SESSION_WINDOW)
+
+    lines = []
+    for name, (kind, help_text, buckets) in _DEFINITIONS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (n, labels), v in sorted(values.items()):
+            if n != name:
+                continue
+            if kind == "histogram":
+                for le, count in zip(buckets, v):
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', le)])} {count}")
+                lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {v[-1]}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {v[-2]}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {v[-1]}")
+            else:
+                lines.append(f"{name}{_fmt_labels(labels)} {v}")
+
+    last_backup = values.get(_key("box_costing_last_backup_timestamp_seconds", {}))
+    # File sizes are a stat() call, not a query
+    gauges = [
+        ("box_costing_active_sessions", "Sessions with a rerun in the last 5 minutes.", active),
+        ("box_costing_backup_age_seconds", "Seconds since the newest backup (-1 if none).", now - last_backup if last_backup else -1),
+        ("box_costing_db_bytes", "Size of the SQLite database file.", _file_size(DB_PATH)),
+        ("box_costing_db_wal_bytes", "Size of the SQLite write-ahead log.", _file_size(DB_PATH + "-wal")),
+    ]
+    for name, help_text, value in gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serves /metrics from a daemon thread. Only the first call per process starts it."""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    with _lock:
+        if _server["started"] or not port:
+            return False
+        _server["started"] = True
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # Scrapes every few seconds would flood the console
+
+    try:
+        httpd = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        logging.error(f"Metrics endpoint not started on {host}:{port}: {e}")
+        return False
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="box-costing-metrics", daemon=True).start()
+    return True
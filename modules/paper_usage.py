@@ -0,0 +1,96 @@
+from sqlalchemy import func, select, exists
+from database import SessionLocal
+from models import Quotation, QuotationItem, QuotationItemLayer
+
+# Flute layers saved before the flute factor was stored in layer_details used the calculator default
+DEFAULT_FLUTE_FACTOR = 1.40
+
+def build_item_layers(layer_details, box_weight):
+    """
+    Turns a layer_details list ({layer, paper, gsm, bf, flute_factor}) into
+    QuotationItemLayer rows. Box weight is split by effective GSM (gsm x flute factor),
+    the same proportion the calculator uses for weight.
+    """
+    rows = []
+    for pos, ld in enumerate(layer_details or []):
+        layer = ld.get("layer") or ""
+        ff = ld.get("flute_factor") or (DEFAULT_FLUTE_FACTOR if "Flute" in layer else 1.0)
+        rows.append({
+            "position": pos,
+            "layer": layer,
+            "paper": ld.get("paper"),
+            "gsm": float(ld.get("gsm") or 0),
+            "bf": ld.get("bf"),
+            "flute_factor": ff,
+        })
+
+    total_eff_gsm = sum(r["gsm"] * r["flute_factor"] for r in rows)
+    for r in rows:
+        share = (r["gsm"] * r["flute_factor"] / total_eff_gsm) if total_eff_gsm else 0
+        r["weight_kg"] = (box_weight or 0) * share
+    return [QuotationItemLayer(**r) for r in rows]
+
+def backfill_item_layers(batch_size=500):
+    """
+    Creates quotation_item_layers rows for items saved before the table existed.
+    Works in id-ordered batches with a commit per batch; no-op once done.
+    Returns number of items migrated.
+    """
+    db = SessionLocal()
+    migrated = 0
+    last_id = 0
+    try:
+        has_layers = exists().where(QuotationItemLayer.item_id == QuotationItem.id)
+        while True:
+            batch = db.execute(
+                select(QuotationItem.id, QuotationItem.layer_details, QuotationItem.box_weight)
+                .where(QuotationItem.id > last_id, ~has_layers)
+                .order_by(QuotationItem.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+
+            for item_id, layer_details, box_weight in batch:
+                for layer in build_item_layers(layer_details, box_weight):
+                    layer.item_id = item_id
+                    db.add(layer)
+            db.commit()
+            migrated += len(batch)
+            last_id = batch[-1][0]
+    finally:
+        db.close()
+    return migrated
+
+def find_quotations_using(db, paper, gsm=None, layer=None, statuses=None):
+    """
+    Quotations using a paper (optionally a GSM / layer position name, e.g. "Top Liner")
+    in any item. Single query over the (paper, gsm, layer) index.
+    """
+    q = db.query(Quotation).join(QuotationItem, QuotationItem.quotation_id == Quotation.id)\
+          .join(QuotationItemLayer, QuotationItemLayer.item_id == QuotationItem.id)\
+          .filter(QuotationItemLayer.paper == paper)
+    if gsm is not None:
+        q = q.filter(QuotationItemLayer.gsm == gsm)
+    if layer is not None:
+        q = q.filter(QuotationItemLayer.layer == layer)
+    if statuses:
+        q = q.filter(Quotation.status.in_(list(statuses)))
+    return q.distinct().order_by(Quotation.created_date.desc()).all()
+
+def paper_kg_summary(db, statuses=None, paper=None):
+    """
+    Total kg per paper & GSM across quotations (weight per box x quantity),
+    e.g. paper_kg_summary(db, ["Finalised"], "Natural"). One aggregate query.
+    Returns list of (paper, gsm, kg).
+    """
+    kg = func.sum(QuotationItemLayer.weight_kg * QuotationItem.quantity)
+    q = db.query(QuotationItemLayer.paper, QuotationItemLayer.gsm, kg)\
+          .join(QuotationItem, QuotationItem.id == QuotationItemLayer.item_id)\
+          .join(Quotation, Quotation.id == QuotationItem.quotation_id)
+    if statuses:
+        q = q.filter(Quotation.status.in_(list(statuses)))
+    if paper is not None:
+        q = q.filter(QuotationItemLayer.paper == paper)
+    return q.group_by(QuotationItemLayer.paper, QuotationItemLayer.gsm)\
+            .order_by(QuotationItemLayer.paper, QuotationItemLayer.gsm).all()
@@ -0,0 +1,166 @@
+import os
+import json
+import importlib.util
+from datetime import datetime
+from sqlalchemy import select, Integer, Float, Boolean, DateTime, JSON
+from database import SessionLocal
+from models import Party, Quotation, QuotationItem, PaperRateHistory, OperationRateHistory, Settings
+
+# Incremental analytics snapshots in Parquet, partitioned by month (hive style):
+#   exports/parquet/quotations/month=2026-10/part-20261019_1030_0000.parquet
+# Each run only appends rows changed since the last run (watermark in Settings).
+# A row edited after it was exported appears again in a later part file; take the
+# row with the latest _exported_at per id. Deleted rows are not removed from the files.
+
+EXPORT_DIR = os.path.join("exports", "parquet")
+WATERMARK_KEY = "parquet_watermark"
+BATCH_SIZE = 50_000
+MAX_LAYERS = 9
+
+def _arrow_type(col):
+    import pyarrow as pa
+    t = col.type
+    if isinstance(t, Boolean):
+        return pa.bool_()
+    if isinstance(t, Integer):
+        return pa.int64()
+    if isinstance(t, Float):
+        return pa.float64()
+    if isinstance(t, DateTime):
+        return pa.timestamp("us")
+    return pa.string() # String, JSON (serialized)
+
+def _layer_fields():
+    import pyarrow as pa
+    fields = []
+    for i in range(1, MAX_LAYERS + 1):
+        fields += [(f"layer_{i}_name", pa.string()), (f"layer_{i}_paper", pa.string()),
+                   (f"layer_{i}_gsm", pa.float64()), (f"layer_{i}_bf", pa.float64()),
+                   (f"layer_{i}_flute_factor", pa.float64())]
+    return fields
+
+def _flatten_layers(row):
+    """layer_details JSON -> layer_1_name, layer_1_paper, layer_1_gsm, ... columns."""
+    details = row.get("layer_details") or []
+    for i in range(1, MAX_LAYERS + 1):
+        ld = details[i - 1] if i <= len(details) else {}
+        row[f"layer_{i}_name"] = ld.get("layer")
+        row[f"layer_{i}_paper"] = ld.get("paper")
+        row[f"layer_{i}_gsm"] = _float(ld.get("gsm"))
+        row[f"layer_{i}_bf"] = _float(ld.get("bf"))
+        row[f"layer_{i}_flute_factor"] = _float(ld.get("flute_factor"))
+    row["layer_details"] = json.dumps(details)
+
+def _float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+# name -> (model, change column for the watermark, date column for the month partition)
+TABLES = {
+    "parties": (Party, "updated_at", None),
+    "quotations": (Quotation, "updated_at", "created_date"),
+    "quotation_items": (QuotationItem, "updated_at", "quotation_created_date"),
+    "paper_rate_history": (PaperRateHistory, "id", "effective_from"),
+    "operation_rate_history": (OperationRateHistory, "id", "effective_from"),
+}
+
+def _statement(name, model, since):
+    table = model.__table__
+    if name == "quotation_items":
+        # Items are partitioned by their quotation's month
+        stmt = select(table, Quotation.created_date.label("quotation_created_date"))\
+               .join(Quotation.__table__, Quotation.id == table.c.quotation_id, isouter=True)
+    else:
+        stmt = select(table)
+    change_col = table.c[TABLES[name][1]]
+    if since is not None:
+        if TABLES[name][1] == "updated_at":
+            since = datetime.fromisoformat(since)
+        stmt = stmt.where(change_col > since)
+    return stmt, table
+
+def _schema(name, table):
+    import pyarrow as pa
+    fields = [(c.name, _arrow_type(c)) for c in table.columns]
+    if name == "quotation_items":
+        fields += [("quotation_created_date", pa.timestamp("us"))] + _layer_fields()
+    fields.append(("_exported_at", pa.timestamp("us")))
+    return pa.schema(fields)
+
+def _write(rows, schema, base_dir, month_col, stamp, part_no):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    by_month = {}
+    for r in rows:
+        month = "all"
+        if month_col:
+            d = r.get(month_col)
+            month = d.strftime("%Y-%m") if d else "unknown"
+        by_month.setdefault(month, []).append(r)
+    for month, month_rows in by_month.items():
+        part_dir = os.path.join(base_dir, f"month={month}") if month_col else base_dir
+        os.makedirs(part_dir, exist_ok=True)
+        pq.write_table(pa.Table.from_pylist(month_rows, schema=schema),
+                       os.path.join(part_dir, f"part-{stamp}_{part_no:04d}.parquet"))
+
+def export_parquet(export_dir=EXPORT_DIR, full=False, db=None):
+    """
+    Appends rows changed since the last export to <export_dir>/<table>/month=YYYY-MM/.
+    full=True ignores the watermark (re-exports everything). Returns rows written per table.
+    """
+    if importlib.util.find_spec("pyarrow") is None:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+    own_db = db is None
+    db = db or SessionLocal()
+    try:
+        setting = db.query(Settings).filter(Settings.key == WATERMARK_KEY).first()
+        watermark = {} if full or setting is None else json.loads(setting.value or "{}")
+        new_watermark = dict(watermark)
+        exported_at = datetime.utcnow()
+        stamp = exported_at.strftime("%Y%m%d_%H%M%S")
+        counts = {}
+
+        for name, (model, change_attr, month_col) in TABLES.items():
+            stmt, table = _statement(name, model, watermark.get(name))
+            schema = _schema(name, table)
+            json_cols = [c.name for c in table.columns if isinstance(c.type, JSON)]
+            base_dir = os.path.join(export_dir, name)
+            result = db.execute(stmt.execution_options(yield_per=BATCH_SIZE)).mappings()
+            counts[name] = 0
+            part_no = 0
+            high = watermark.get(name)
+            for batch in result.partitions(BATCH_SIZE):
+                rows = []
+                for m in batch:
+                    r = dict(m)
+                    if name == "quotation_items":
+                        _flatten_layers(r)
+                    for col in json_cols: # Stored as JSON text (price lists, slabs, operation details)
+                        if r[col] is not None and not isinstance(r[col], str):
+                            r[col] = json.dumps(r[col])
+                    r["_exported_at"] = exported_at
+                    rows.append(r)
+                    mark = r.get(change_attr)
+                    if mark is not None:
+                        mark = mark.isoformat() if isinstance(mark, datetime) else mark
+                        if high is None or mark > high:
+                            high = mark
+                _write(rows, schema, base_dir, month_col, stamp, part_no)
+                part_no += 1
+                counts[name] += len(rows)
+            if high is not None:
+                new_watermark[name] = high
+
+        # Only advance the watermark once every table was written
+        if setting is None:
+            setting = Settings(key=WATERMARK_KEY)
+            db.add(setting)
+        setting.value = json.dumps(new_watermark)
+        db.commit()
+        return counts
+    finally:
+        if own_db:
+            db.close()
@@ -6,7 +6,9 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 import io
 import os
+from modules.perf import timed
 
+@timed("PDF: generate_quotation_pdf", metric="box_costing_pdf_generation_seconds")
 def generate_quotation_pdf(quotation, items, party):
     """
     Generates a PDF for the quotation and returns it as a BytesIO object.
@@ -0,0 +1,201 @@
+import time
+import logging
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from sqlalchemy import event
+from database import engine
+from modules import profiling, metrics
+
+# Statements slower than this are written to slow_queries.log with their query plan
+SLOW_QUERY_MS = 200
+SLOW_QUERY_LOG = "slow_queries.log"
+
+MAX_RERUNS = 500 # Rerun timings kept in memory
+MAX_STATEMENTS = 500 # Distinct statements tracked
+
+_local = threading.local() # Stats of the rerun running on this thread (one script thread per session)
+_lock = threading.Lock()
+_reruns = deque(maxlen=MAX_RERUNS) # {page, user, duration, queries, query_time, at}
+_calls = {} # name -> deque of durations (PDF, email, ...)
+_statements = {} # statement -> [count, total_sec, max_sec]
+
+_slow_log = logging.getLogger("box_costing.slow_queries")
+_slow_log.propagate = False
+_slow_log.setLevel(logging.WARNING)
+if not _slow_log.handlers:
+    _handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=1_000_000, backupCount=3, encoding="utf-8", delay=True)
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    _slow_log.addHandler(_handler)
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+
+    stats = getattr(_local, "stats", None)
+    if stats is not None:
+        stats["queries"] += 1
+        stats["query_time"] += elapsed
+
+    with _lock:
+        entry = _statements.get(statement)
+        if entry is None:
+            if len(_statements) >= MAX_STATEMENTS:
+                # Forget the cheapest statement to stay bounded
+                del _statements[min(_statements, key=lambda s: _statements[s][1])]
+            entry = _statements[statement] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        _log_slow_query(cursor, statement, parameters, elapsed, executemany)
+
+def _log_slow_query(cursor, statement, parameters, elapsed, executemany):
+    plan = ""
+    if not executemany and statement.lstrip().upper().startswith("SELECT"):
+        try:
+            rows = cursor.connection.cursor().execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            plan = "\n".join(f"    {r[-1]}" for r in rows)
+        except Exception as e:
+            plan = f"    (plan unavailable: {e})"
+    _slow_log.warning(f"{elapsed*1000:.0f} ms\n  {statement}\n  params={parameters!r}\n{plan}")
+
+@contextmanager
+def page_timer(page, user=None):
+    """Times one rerun of a page, including the DB queries it ran (and cProfiles it if requested)."""
+    prof = profiling.start(page) if profiling.armed else None
+    _local.stats = {"queries": 0, "query_time": 0.0}
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _local.stats
+        _local.stats = None
+        record = {
+            "page": page,
+            "user": user,
+            "duration": time.perf_counter() - start,
+            "queries": stats["queries"],
+            "query_time": stats["query_time"],
+            "at": time.time(),
+        }
+        metrics.observe("box_costing_rerun_seconds", record["duration"], page=page)
+        if prof is not None:
+            profiling.finish(prof, page, record["duration"], record["queries"], user)
+        with _lock:
+            _reruns.append(record)
+
+def timed(name, metric=None):
+    """
+    Decorator recording call durations under `name` (e.g. PDF generation, email),
+    and in the `metric` histogram of the metrics endpoint if given.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with _lock:
+                    _calls.setdefault(name, deque(maxlen=MAX_RERUNS)).append(elapsed)
+                if metric:
+                    metrics.observe(metric, elapsed)
+        return wrapper
+    return decorator
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+def page_stats():
+    """Per page: reruns, p50/p95 duration (ms), average queries and query time per rerun."""
+    with _lock:
+        reruns = list(_reruns)
+    by_page = {}
+    for r in reruns:
+        by_page.setdefault(r["page"], []).append(r)
+    stats = []
+    for page, rows in sorted(by_page.items()):
+        durations = [r["duration"] for r in rows]
+        stats.append({
+            "Page": page,
+            "Reruns": len(rows),
+            "p50 (ms)": _percentile(durations, 50) * 1000,
+            "p95 (ms)": _percentile(durations, 95) * 1000,
+            "Avg Queries": sum(r["queries"] for r in rows) / len(rows),
+            "Avg DB (ms)": sum(r["query_time"] for r in rows) / len(rows) * 1000,
+        })
+    return stats
+
+def call_stats():
+    """Per timed call (PDF, email): count and p50/p95 (ms)."""
+    with _lock:
+        calls = {name: list(d) for name, d in _calls.items()}
+    return [{
+        "Call": name,
+        "Count": len(d),
+        "p50 (ms)": _percentile(d, 50) * 1000,
+        "p95 (ms)": _percentile(d, 95) * 1000,
+    } for name, d in sorted(calls.items())]
+
+def slowest_statements(limit=10):
+    """Statements with the highest single execution time."""
+    with _lock:
+        items = [(s, e[0], e[1], e[2]) for s, e in _statements.items()]
+    items.sort(key=lambda x: x[3], reverse=True)
+    return [{
+        "Statement": s if len(s) <= 300 else s[:300] + "...",
+        "Count": count,
+        "Max (ms)": max_sec * 1000,
+        "Avg (ms)": total / count * 1000,
+    } for s, count, total, max_sec in items[:limit]]
+
+def reset():
+    with _lock:
+        _reruns.clear()
+        _calls.clear()
+        _statements.clear()
+
+def performance_panel():
+    """Admin panel (User Details): rerun percentiles, query counts and slowest statements."""
+    import streamlit as st
+    import pandas as pd
+
+    st.subheader("⏱️ Performance")
+    st.caption(f"Since last server start / reset. Queries slower than {SLOW_QUERY_MS} ms are logged with their plan to `{SLOW_QUERY_LOG}`.")
+
+    stats = page_stats()
+    if stats:
+        st.markdown("**Page Reruns**")
+        st.dataframe(pd.DataFrame(stats).round(1), use_container_width=True, hide_index=True)
+    else:
+        st.info("No page timings recorded yet.")
+
+    calls = call_stats()
+    if calls:
+        st.markdown("**PDF / Email Calls**")
+        st.dataframe(pd.DataFrame(calls).round(1), use_container_width=True, hide_index=True)
+
+    slow = slowest_statements()
+    if slow:
+        st.markdown("**Slowest Statements**")
+        st.dataframe(pd.DataFrame(slow).round(2), use_container_width=True, hide_index=True)
+
+    if st.button("Reset Timings"):
+        reset()
+        st.rerun()
@@ -0,0 +1,157 @@
+import os
+import json
+import math
+import time
+import threading
+from datetime import datetime
+from database import SessionLocal, DB_PATH
+from models import Quotation, QuotationItem
+
+# Rate suggestion learned from accepted quotations. Log-linear model:
+#   log(rate) = b . [1, log L, log W, log H, log box weight, log qty, years, ply 5/7/9]
+#             + party offset
+# fitted with ridge least squares (numpy), then each party's mean residual shrunk
+# towards 0 by PARTY_SHRINK pseudo-items, so parties with few orders stay near the
+# market line. Saved as JSON next to the database; predicting is a dot product.
+
+MODEL_PATH = os.path.join(os.path.dirname(DB_PATH), "price_model.json")
+ACCEPTED_STATUSES = ("Finalised", "Dispatched", "Billed")
+MIN_ITEMS = 30 # Below this there is nothing to learn from
+RIDGE = 1.0
+PARTY_SHRINK = 5.0
+RETRAIN_AFTER_DAYS = 1 # Warm-up retrains a model older than this
+EPOCH = datetime(2020, 1, 1)
+FEATURES = ["intercept", "log_length", "log_width", "log_height", "log_box_weight", "log_quantity",
+            "years", "ply_5", "ply_7", "ply_9"]
+
+_cache = {"model": None, "mtime": None}
+_cache_lock = threading.Lock()
+
+def _design(length, width, height, box_weight, quantity, years, ply):
+    """Feature matrix (numpy arrays in, one row per item), columns as in FEATURES."""
+    import numpy as np
+    clip = lambda a: np.log(np.clip(np.asarray(a, dtype=float), 1e-6, None))
+    ply = np.asarray(ply, dtype=float)
+    return np.column_stack([
+        np.ones(len(ply)), clip(length), clip(width), clip(height), clip(box_weight), clip(quantity),
+        np.asarray(years, dtype=float), ply == 5, ply == 7, ply == 9,
+    ]).astype(float)
+
+def _years(when):
+    return (when - EPOCH).total_seconds() / (365.25 * 86400)
+
+def _load_training_data(db):
+    import pandas as pd
+    rows = db.query(
+        QuotationItem.length, QuotationItem.width, QuotationItem.height, QuotationItem.box_weight,
+        QuotationItem.quantity, QuotationItem.ply, QuotationItem.selling_price,
+        Quotation.party_id, Quotation.created_date
+    ).join(Quotation, Quotation.id == QuotationItem.quotation_id)\
+     .filter(Quotation.status.in_(ACCEPTED_STATUSES), QuotationItem.selling_price > 0,
+             QuotationItem.box_weight > 0, QuotationItem.quantity > 0).all()
+    return pd.DataFrame(rows, columns=["length", "width", "height", "box_weight", "quantity", "ply",
+                                       "selling_price", "party_id", "created_date"])
+
+def train(db=None, path=MODEL_PATH):
+    """
+    Fits the model on all accepted items and writes it to `path`.
+    Returns the model dict, or None if there are fewer than MIN_ITEMS items.
+    """
+    import numpy as np
+    own_db = db is None
+    db = db or SessionLocal()
+    try:
+        start = time.perf_counter()
+        df = _load_training_data(db).dropna(subset=["length", "width", "height", "ply"])
+    finally:
+        if own_db:
+            db.close()
+    if len(df) < MIN_ITEMS:
+        return None
+
+    years = (df["created_date"] - EPOCH).dt.total_seconds().to_numpy() / (365.25 * 86400)
+    X = _design(df["length"], df["width"], df["height"], df["box_weight"], df["quantity"], years, df["ply"])
+    y = np.log(df["selling_price"].to_numpy(dtype=float))
+
+    penalty = RIDGE * np.eye(X.shape[1])
+    penalty[0, 0] = 0 # Don't shrink the intercept
+    coef = np.linalg.solve(X.T @ X + penalty, X.T @ y)
+    resid = y - X @ coef
+
+    # Party offsets: shrunken mean residual per party
+    by_party = df.assign(resid=resid).groupby("party_id")["resid"].agg(["sum", "count"])
+    offsets = (by_party["sum"] / (by_party["count"] + PARTY_SHRINK))
+    final_resid = resid - df["party_id"].map(offsets).fillna(0).to_numpy()
+
+    model = {
+        "features": FEATURES,
+        "coef": coef.tolist(),
+        "party_offsets": {str(int(pid)): float(v) for pid, v in offsets.items()},
+        "sigma": float(final_resid.std()),
+        "items": int(len(df)),
+        "mape_pct": float(np.mean(np.abs(np.expm1(final_resid))) * 100), # In-sample, for a rough feel
+        "trained_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "train_seconds": round(time.perf_counter() - start, 2),
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(model, f)
+    os.replace(tmp, path)
+    return model
+
+def load_model(path=MODEL_PATH):
+    """The saved model (reloaded only when the file changes, e.g. trained by another process), or None."""
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    with _cache_lock:
+        if _cache["mtime"] != mtime:
+            with open(path, encoding="utf-8") as f:
+                _cache["model"] = json.load(f)
+            _cache["mtime"] = mtime
+        return _cache["model"]
+
+def ensure_fresh(max_age_days=RETRAIN_AFTER_DAYS):
+    """Warm-up task: (re)train if there is no model or it is older than `max_age_days`."""
+    model = load_model()
+    if model is not None:
+        age = datetime.utcnow() - datetime.fromisoformat(model["trained_at"])
+        if age.days < max_age_days:
+            return model
+    return train()
+
+def suggest_rate(length, width, height, ply, box_weight, quantity, party_id=None, when=None):
+    """
+    Historical rate for a box spec: (rate, low, high) with a ~90% range, or None
+    without a model. Plain-Python dot product, cheap enough for every rerun.
+    """
+    model = load_model()
+    if model is None or min(length, width, height, box_weight, quantity) <= 0:
+        return None
+    x = [1.0, math.log(length), math.log(width), math.log(height), math.log(box_weight), math.log(quantity),
+         _years(when or datetime.utcnow()), float(ply == 5), float(ply == 7), float(ply == 9)]
+    log_rate = sum(c * v for c, v in zip(model["coef"], x))
+    log_rate += model["party_offsets"].get(str(party_id), 0.0)
+    spread = 1.645 * model["sigma"]
+    return math.exp(log_rate), math.exp(log_rate - spread), math.exp(log_rate + spread)
+
+def price_model_panel():
+    """Admin panel (User Details): model status and retrain button."""
+    import streamlit as st
+
+    st.subheader("📈 Rate Suggestion Model")
+    model = load_model()
+    if model:
+        st.caption(f"Trained {model['trained_at']} UTC on {model['items']} accepted items "
+                   f"({', '.join(ACCEPTED_STATUSES)}) in {model['train_seconds']} s; "
+                   f"typical error {model['mape_pct']:.1f}%. Retrained daily at startup.")
+    else:
+        st.info(f"No model yet (needs at least {MIN_ITEMS} accepted quotation items).")
+    if st.button("Retrain Now"):
+        with st.spinner("Training..."):
+            model = train()
+        if model:
+            st.success(f"Trained on {model['items']} items in {model['train_seconds']} s.")
+        else:
+            st.warning("Not enough accepted quotations to train on.")
@@ -0,0 +1,143 @@
+import os
+import io
+import json
+import time
+import threading
+
+# On-demand cProfile capture of the next N reruns of one page (admin toggle in User Details).
+# perf.page_timer() only checks the module-level `armed` flag when nothing is requested.
+
+PROFILE_DIR = "profiles"
+MAX_PROFILES = 20 # Oldest .prof files are evicted beyond this
+PROFILE_PAGES = ["New Quotation", "Report", "Masters"] # Labels used by page_timer in app.py
+
+armed = False
+_request = {"page": None, "remaining": 0, "requested_by": None}
+_state_lock = threading.Lock()
+_active_lock = threading.Lock() # cProfile can only run one capture at a time
+
+def arm(page, runs, requested_by=None):
+    """Profile the next `runs` reruns of `page`."""
+    global armed
+    with _state_lock:
+        _request.update(page=page, remaining=int(runs), requested_by=requested_by)
+        armed = runs > 0
+
+def disarm():
+    global armed
+    with _state_lock:
+        _request.update(page=None, remaining=0)
+        armed = False
+
+def status():
+    with _state_lock:
+        return dict(_request, armed=armed)
+
+def start(page):
+    """Returns a running profiler if this rerun of `page` should be captured, else None."""
+    global armed
+    import cProfile
+    with _state_lock:
+        if not armed or _request["page"] != page or _request["remaining"] <= 0:
+            return None
+        if not _active_lock.acquire(blocking=False):
+            return None # Another session is being profiled right now, try next rerun
+        _request["remaining"] -= 1
+        if _request["remaining"] <= 0:
+            armed = False
+    prof = cProfile.Profile()
+    prof.enable()
+    return prof
+
+def finish(prof, page, duration, queries, user=None):
+    """Stops the profiler and stores <timestamp>_<page>.prof plus a .json metadata sidecar."""
+    try:
+        prof.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S") + f"_{int(time.time() * 1000) % 1000:03d}"
+        base = os.path.join(PROFILE_DIR, f"{stamp}_{page.replace(' ', '_')}")
+        prof.dump_stats(base + ".prof")
+        meta = {
+            "page": page,
+            "user": user,
+            "duration_ms": round(duration * 1000, 1),
+            "queries": queries,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        _evict()
+    finally:
+        _active_lock.release()
+
+def _evict():
+    profiles = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(".prof"))
+    for old in profiles[:max(0, len(profiles) - MAX_PROFILES)]:
+        delete_profile(old)
+
+def list_profiles():
+    """Newest first: list of (filename, metadata dict)."""
+    if not os.path.exists(PROFILE_DIR):
+        return []
+    result = []
+    for f in sorted((f for f in os.listdir(PROFILE_DIR) if f.endswith(".prof")), reverse=True):
+        meta_path = os.path.join(PROFILE_DIR, f[:-5] + ".json")
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as fh:
+                meta = json.load(fh)
+        result.append((f, meta))
+    return result
+
+def delete_profile(filename):
+    for path in (os.path.join(PROFILE_DIR, filename), os.path.join(PROFILE_DIR, filename[:-5] + ".json")):
+        if os.path.exists(path):
+            os.remove(path)
+
+def top_functions(filename, limit=25, sort="cumulative"):
+    """pstats text summary of the slowest functions in a stored profile."""
+    import pstats
+    out = io.StringIO()
+    stats = pstats.Stats(os.path.join(PROFILE_DIR, filename), stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+def profiling_panel():
+    """Admin panel (User Details): arm a capture, browse / download stored profiles."""
+    import streamlit as st
+
+    st.subheader("🔬 Profiler")
+    current = status()
+    if current["armed"]:
+        st.warning(f"Capturing the next {current['remaining']} rerun(s) of **{current['page']}**.")
+        if st.button("Cancel Capture"):
+            disarm()
+            st.rerun()
+    else:
+        c1, c2, c3 = st.columns([2, 1, 1])
+        page = c1.selectbox("Page to Profile", PROFILE_PAGES)
+        runs = c2.number_input("Reruns", min_value=1, max_value=20, value=3, step=1)
+        with c3:
+            st.markdown("###")
+            if st.button("Start Capture"):
+                arm(page, runs, st.session_state.get("username"))
+                st.toast(f"Open '{page}' and repeat the slow action.", icon="🔬")
+                st.rerun()
+
+    profiles = list_profiles()
+    if not profiles:
+        st.info("No profiles captured yet.")
+        return
+
+    labels = {f: f"{m.get('created', f)} | {m.get('page', '?')} | {m.get('user') or '-'} | "
+                 f"{m.get('duration_ms', 0):.0f} ms | {m.get('queries', 0)} queries" for f, m in profiles}
+    sel = st.selectbox("Captured Profiles", list(labels), format_func=lambda f: labels[f])
+    sort = st.radio("Sort by", ["cumulative", "tottime", "ncalls"], horizontal=True)
+    st.code(top_functions(sel, sort=sort), language="text")
+
+    c1, c2 = st.columns(2)
+    with open(os.path.join(PROFILE_DIR, sel), "rb") as f:
+        c1.download_button("⬇️ Download .prof", data=f.read(), file_name=sel, mime="application/octet-stream")
+    if c2.button("🗑️ Delete Profile"):
+        delete_profile(sel)
+        st.rerun()
@@ -0,0 +1,81 @@
+from models import Quotation, QuotationItem, Settings
+from modules.paper_usage import build_item_layers
+from modules import metrics, similar
+
+SITE_CODE_KEY = "site_code"
+ARCHIVED_NUMBER_KEY = "last_archived_number:{}" # Per series (e.g. "JEI-"): highest number moved to the archive
+
+def party_initials(party_name):
+    """e.g. "Jyoti Electrical Industries" -> "JEI" (max 4 chars, GEN if empty)."""
+    words = (party_name or "").strip().split()
+    return "".join([w[0].upper() for w in words if w])[:4] or "GEN"
+
+def site_code(db):
+    """This installation's site code (set for multi-site replication), or None."""
+    return db.query(Settings.value).filter(Settings.key == SITE_CODE_KEY).scalar() or None
+
+def _split_number(quotation_number):
+    """"JEI-0042" -> ("JEI-", 42); None if it doesn't end in a number."""
+    prefix, _, num = (quotation_number or "").rpartition("-")
+    return (prefix + "-", int(num)) if prefix and num.isdigit() else None
+
+def record_archived_numbers(db, quotation_numbers):
+    """
+    Keeps the highest number of each series being archived in Settings, so numbering
+    continues after its quotations leave the hot DB. Caller commits.
+    """
+    highest = {}
+    for number in quotation_numbers:
+        split = _split_number(number)
+        if split:
+            highest[split[0]] = max(highest.get(split[0], 0), split[1])
+    for prefix, num in highest.items():
+        key = ARCHIVED_NUMBER_KEY.format(prefix)
+        setting = db.query(Settings).filter(Settings.key == key).first() or Settings(key=key, value="0")
+        setting.value = str(max(int(setting.value or 0), num))
+        db.add(setting)
+
+def next_quotation_number(db, party_name):
+    """
+    <initials>-<running number>, continuing from the last quotation with these initials
+    (hot DB, or the highest archived one). With a site code it is <initials>-<site>-<number>:
+    each site numbers its own series, so replicated installations never hand out the same number.
+    """
+    initials = party_initials(party_name)
+    site = site_code(db)
+    if site:
+        initials = f"{initials}-{site}"
+    last_q = db.query(Quotation).filter(Quotation.quotation_number.like(f"{initials}-%"))\
+               .order_by(Quotation.id.desc()).first()
+    new_num = 1
+    if last_q:
+        try:
+            new_num = int(last_q.quotation_number.split("-")[-1]) + 1
+        except ValueError:
+            new_num = 1
+    archived = db.query(Settings.value).filter(Settings.key == ARCHIVED_NUMBER_KEY.format(f"{initials}-")).scalar()
+    new_num = max(new_num, int(archived or 0) + 1)
+    return f"{initials}-{new_num:04d}"
+
+def save_quotation(db, party, item_fields, status="Draft"):
+    """
+    Saves a one-item quotation: header, item (QuotationItem columns in item_fields,
+    incl. layer_details) and its normalized layer rows. Commits; returns the Quotation.
+    """
+    new_quotation = Quotation(
+        quotation_number=next_quotation_number(db, party.name),
+        party_id=party.id,
+        status=status,
+        total_amount=item_fields["selling_price"] * item_fields["quantity"]
+    )
+    db.add(new_quotation)
+    db.flush() # Get ID
+
+    new_item = QuotationItem(quotation_id=new_quotation.id, **item_fields)
+    # Normalized layer rows (indexed paper-usage queries), saved with the JSON
+    new_item.layers = build_item_layers(item_fields.get("layer_details"), item_fields.get("box_weight"))
+    db.add(new_item)
+    db.commit()
+    metrics.inc("box_costing_quotations_saved_total")
+    similar.refresh_quotations([new_quotation.id], db)
+    return new_quotation
@@ -0,0 +1,145 @@
+from datetime import datetime
+from sqlalchemy import select
+from database import SessionLocal
+from models import PaperRate, OperationRate, PaperRateHistory, OperationRateHistory, Quotation, QuotationItem, QuotationItemLayer
+
+# Rates that existed before history tracking started are treated as in force since this date
+BASELINE_DATE = datetime(1970, 1, 1)
+
+# model -> (history model, FK column on history, {master attr: history attr})
+_HISTORY_MAP = {
+    PaperRate: (PaperRateHistory, "paper_rate_id", {"name": "name", "rate": "rate", "bf": "bf"}),
+    OperationRate: (OperationRateHistory, "operation_rate_id", {"operation_name": "operation_name", "rate": "rate", "unit": "unit",
+                                                                "slabs": "slabs", "min_charge": "min_charge"}),
+}
+
+def _history_rows(rates, model, effective_from, user):
+    hist_model, fk, fields = _HISTORY_MAP[model]
+    rows = []
+    for r in rates:
+        row = {hist_attr: getattr(r, attr) for attr, hist_attr in fields.items()}
+        row[fk] = r.id
+        row["effective_from"] = effective_from
+        row["changed_by"] = user
+        rows.append(row)
+    return hist_model, rows
+
+def seed_rate_history():
+    """
+    One-time backfill: every paper/operation rate without any history gets a
+    baseline row with its current value. Cheap no-op once seeded.
+    """
+    db = SessionLocal()
+    try:
+        for model, (hist_model, fk, _) in _HISTORY_MAP.items():
+            tracked = select(getattr(hist_model, fk))
+            missing = db.query(model).filter(~model.id.in_(tracked)).all()
+            if missing:
+                hist_model, rows = _history_rows(missing, model, BASELINE_DATE, "baseline")
+                db.bulk_insert_mappings(hist_model, rows)
+        db.commit()
+    finally:
+        db.close()
+
+def record_rate_changes(db, model, ids, user=None, when=None):
+    """
+    Writes the current values of the given PaperRate/OperationRate ids to the
+    history table, effective now. Call inside the transaction that changed them
+    (before commit) so the master and its history are saved together.
+    """
+    if not ids:
+        return 0
+    db.flush()
+    # populate_existing: bulk updates bypass the identity map, so reload fresh values
+    rates = db.query(model).populate_existing().filter(model.id.in_(list(ids))).all()
+    hist_model, rows = _history_rows(rates, model, when or datetime.utcnow(), user)
+    db.bulk_insert_mappings(hist_model, rows)
+    return len(rows)
+
+def paper_rate_as_of(db, paper_name, when):
+    """Rate per kg of a paper (by name) in force at `when`. None if unknown."""
+    h = db.query(PaperRateHistory).filter(
+        PaperRateHistory.name == paper_name,
+        PaperRateHistory.effective_from <= when
+    ).order_by(PaperRateHistory.effective_from.desc()).first()
+    return h.rate if h else None
+
+def operation_rate_as_of(db, operation_name, when):
+    """Rate of an operation (by name) in force at `when`. None if unknown."""
+    h = db.query(OperationRateHistory).filter(
+        OperationRateHistory.operation_name == operation_name,
+        OperationRateHistory.effective_from <= when
+    ).order_by(OperationRateHistory.effective_from.desc()).first()
+    return h.rate if h else None
+
+def load_paper_rate_history(db):
+    """Full paper rate history as a DataFrame sorted by effective_from (for merges/trends)."""
+    import pandas as pd
+    rows = db.query(
+        PaperRateHistory.paper_rate_id, PaperRateHistory.name, PaperRateHistory.rate,
+        PaperRateHistory.bf, PaperRateHistory.effective_from
+    ).order_by(PaperRateHistory.effective_from).all()
+    return pd.DataFrame(rows, columns=["paper_rate_id", "paper", "rate", "bf", "effective_from"])
+
+def load_operation_rate_history(db):
+    """Full operation rate history as a DataFrame sorted by effective_from."""
+    import pandas as pd
+    rows = db.query(
+        OperationRateHistory.operation_rate_id, OperationRateHistory.operation_name,
+        OperationRateHistory.rate, OperationRateHistory.unit, OperationRateHistory.slabs, OperationRateHistory.min_charge,
+        OperationRateHistory.effective_from
+    ).order_by(OperationRateHistory.effective_from).all()
+    return pd.DataFrame(rows, columns=["operation_rate_id", "operation", "rate", "unit", "slabs", "min_charge", "effective_from"])
+
+def attach_rates_as_of(df, history, key="paper", date_col="created_date", rate_col="rate"):
+    """
+    Vectorized as-of join: adds the rate in force at df[date_col] for df[key].
+    One merge_asof over the whole frame instead of one query per row.
+    """
+    import pandas as pd
+    left = df.reset_index(drop=True).copy()
+    left["_order"] = range(len(left))
+    left[date_col] = pd.to_datetime(left[date_col])
+    right = history[[key, "effective_from", "rate"]].rename(columns={"rate": rate_col}).copy()
+    right["effective_from"] = pd.to_datetime(right["effective_from"])
+    merged = pd.merge_asof(
+        left.sort_values(date_col), right.sort_values("effective_from"),
+        left_on=date_col, right_on="effective_from", by=key, direction="backward"
+    )
+    return merged.sort_values("_order").drop(columns=["_order", "effective_from"]).reset_index(drop=True)
+
+def load_item_layers(db, item_ids=None):
+    """
+    One row per layer of every saved item (from quotation_item_layers): item_id,
+    created_date, box_weight, quantity, layer, paper, gsm, flute_factor.
+    """
+    import pandas as pd
+    q = db.query(
+        QuotationItemLayer.item_id, Quotation.created_date, QuotationItem.box_weight,
+        QuotationItem.quantity, QuotationItemLayer.layer, QuotationItemLayer.paper,
+        QuotationItemLayer.gsm, QuotationItemLayer.flute_factor
+    ).join(QuotationItem, QuotationItem.id == QuotationItemLayer.item_id)\
+     .join(Quotation, Quotation.id == QuotationItem.quotation_id)
+    if item_ids is not None:
+        q = q.filter(QuotationItemLayer.item_id.in_(list(item_ids)))
+    return pd.DataFrame(q.all(), columns=["item_id", "created_date", "box_weight", "quantity", "layer", "paper", "gsm", "flute_factor"])
+
+def recost_material_as_of(layers, history, date_col="created_date"):
+    """
+    Re-costs material per box for many items at the paper rates in force at
+    their own dates. Box weight is proportional to effective GSM, so
+    material cost = box_weight * sum(eff_gsm * rate) / sum(eff_gsm).
+    Returns DataFrame: item_id, material_cost_as_of, missing_rate.
+    """
+    df = attach_rates_as_of(layers, history, key="paper", date_col=date_col)
+    df["eff_gsm"] = df["gsm"] * df["flute_factor"]
+    df["eff_cost"] = df["eff_gsm"] * df["rate"]
+    df["missing_rate"] = df["rate"].isna()
+    g = df.groupby("item_id").agg(
+        box_weight=("box_weight", "first"),
+        eff_gsm=("eff_gsm", "sum"),
+        eff_cost=("eff_cost", "sum"),
+        missing_rate=("missing_rate", "any"),
+    )
+    g["material_cost_as_of"] = g["box_weight"] * g["eff_cost"] / g["eff_gsm"]
+    return g[["material_cost_as_of", "missing_rate"]].reset_index()
@@ -0,0 +1,282 @@
+import os
+import re
+import gzip
+import json
+from datetime import datetime
+from sqlalchemy import DateTime
+from models import (
+    ChangeLog, Settings, Party, PaperRate, OperationRate, ReelSize, Terms, FluteProfile, VehicleType, PalletType,
+    Quotation, QuotationItem, QuotationItemLayer, ReplicationVersion, ReplicationLog
+)
+from modules import changelog
+from modules.quotations import site_code
+from modules.paper_usage import build_item_layers
+
+# Multi-site replication through a shared folder. Every site writes its change sets
+# to <shared>/<SITE>/ and reads the other sites' folders:
+#   <shared>/A/000000000001-000000000042.json.gz    change_log seq 1..42 of site A
+# A change set holds the current values of every row changed since the last export
+# (from the change log), so its size depends on the changes, not on the DB.
+# Masters are matched by name, quotations by their site-coded number. Conflicts are
+# last-writer-wins on the time of the change; every decision is kept in replication_log.
+
+EXPORT_CURSOR_KEY = "replication_export_seq"
+IMPORT_CURSOR_KEY = "replication_import_seq:" # + remote site
+REPLICATION_USER = "replication:" # + remote site; such changes are not exported again
+
+# entity -> (model, natural key column)
+MASTERS = {
+    "parties": (Party, "name"),
+    "paper_rates": (PaperRate, "name"),
+    "operation_rates": (OperationRate, "operation_name"),
+    "reel_sizes": (ReelSize, "width"),
+    "flute_profiles": (FluteProfile, "name"),
+    "vehicle_types": (VehicleType, "name"),
+    "pallet_types": (PalletType, "name"),
+    "terms": (Terms, "title"),
+}
+_SKIP_COLUMNS = {"id", "updated_at", "quotation_id", "party_id"}
+
+_FILE_RE = re.compile(r"^(\d{12})-(\d{12})\.json\.gz$")
+
+def _get_setting(db, key, default=None):
+    value = db.query(Settings.value).filter(Settings.key == key).scalar()
+    return default if value is None else value
+
+def _set_setting(db, key, value):
+    setting = db.query(Settings).filter(Settings.key == key).first()
+    if setting is None:
+        setting = Settings(key=key)
+        db.add(setting)
+    setting.value = str(value)
+
+def _row_values(obj):
+    values = {}
+    for c in obj.__table__.columns:
+        if c.name in _SKIP_COLUMNS:
+            continue
+        v = getattr(obj, c.name)
+        values[c.name] = v.isoformat() if isinstance(v, datetime) else v
+    return values
+
+def _assign(obj, values):
+    for c in obj.__table__.columns:
+        if c.name in _SKIP_COLUMNS or c.name not in values:
+            continue
+        v = values[c.name]
+        if isinstance(c.type, DateTime) and isinstance(v, str):
+            v = datetime.fromisoformat(v)
+        setattr(obj, c.name, v)
+
+def _quotation_doc(q):
+    doc = _row_values(q)
+    doc["party"] = q.party.name if q.party else None
+    doc["items"] = [_row_values(i) for i in q.items]
+    return doc
+
+def _newer(db, entity, key, changed_at, site):
+    """True if (changed_at, site) wins over the last change applied to this row here."""
+    v = db.query(ReplicationVersion).filter(ReplicationVersion.entity == entity, ReplicationVersion.key == key).first()
+    return v is None or (changed_at, site) > (v.changed_at, v.site or "")
+
+def _set_version(db, entity, key, changed_at, site):
+    v = db.query(ReplicationVersion).filter(ReplicationVersion.entity == entity, ReplicationVersion.key == key).first()
+    if v is None:
+        v = ReplicationVersion(entity=entity, key=key)
+        db.add(v)
+    v.changed_at = changed_at
+    v.site = site
+
+def _collect_changes(db, since):
+    """
+    Latest change per row in change_log after `since`, leaving out changes that were
+    themselves applied by replication. Returns (changes, last seq).
+    """
+    latest = {}
+    last_seq = since
+    entries = db.query(ChangeLog).filter(ChangeLog.id > since).order_by(ChangeLog.id)
+    for c in entries.yield_per(1000):
+        last_seq = c.id
+        if (c.changed_by or "").startswith(REPLICATION_USER):
+            continue
+        if c.entity in MASTERS:
+            key = (c.entity, c.entity_id)
+        elif c.entity == "quotations":
+            key = ("quotations", c.entity_id)
+        elif c.entity == "quotation_items":
+            # An item change re-sends its whole quotation
+            qid = (c.changes or {}).get("quotation_id") or db.query(QuotationItem.quotation_id)\
+                    .filter(QuotationItem.id == c.entity_id).scalar()
+            if qid is None:
+                continue
+            key = ("quotations", qid)
+        else:
+            continue
+        latest[key] = c
+    return latest, last_seq
+
+def export_changes(db, shared_dir):
+    """Writes one change set with everything changed since the last export. Returns its path or None."""
+    site = site_code(db)
+    since = int(_get_setting(db, EXPORT_CURSOR_KEY, 0))
+    latest, last_seq = _collect_changes(db, since)
+    if last_seq == since:
+        return None
+
+    masters, quotations = [], []
+    for (entity, entity_id), c in latest.items():
+        if entity in MASTERS:
+            model, key_col = MASTERS[entity]
+            obj = db.get(model, entity_id)
+            if obj is not None:
+                values = _row_values(obj)
+                masters.append({"entity": entity, "key": str(values[key_col]), "op": "upsert", "values": values,
+                                "changed_at": c.changed_at.isoformat()})
+            elif c.changes and key_col in c.changes:
+                masters.append({"entity": entity, "key": str(c.changes[key_col]), "op": "delete",
+                                "changed_at": c.changed_at.isoformat()})
+        else:
+            q = db.get(Quotation, entity_id)
+            if q is not None:
+                quotations.append({"key": q.quotation_number, "op": "upsert", "doc": _quotation_doc(q),
+                                   "changed_at": c.changed_at.isoformat()})
+            elif c.changes and c.changes.get("quotation_number"):
+                quotations.append({"key": c.changes["quotation_number"], "op": "delete",
+                                   "changed_at": c.changed_at.isoformat()})
+
+    name = f"{since + 1:012d}-{last_seq:012d}.json.gz"
+    path = None
+    if masters or quotations:
+        site_dir = os.path.join(shared_dir, site)
+        os.makedirs(site_dir, exist_ok=True)
+        path = os.path.join(site_dir, name)
+        tmp = path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"site": site, "from_seq": since + 1, "to_seq": last_seq,
+                       "created": datetime.utcnow().isoformat(), "masters": masters, "quotations": quotations}, f)
+        os.replace(tmp, path) # Readers never see a half-written file
+
+    for entry in masters + [dict(e, entity="quotations") for e in quotations]:
+        changed_at = datetime.fromisoformat(entry["changed_at"])
+        _set_version(db, entry["entity"], entry["key"], changed_at, site)
+        db.add(ReplicationLog(site=site, direction="export", file=name, entity=entry["entity"], key=entry["key"],
+                              operation=entry["op"], changed_at=changed_at, outcome="exported"))
+    _set_setting(db, EXPORT_CURSOR_KEY, last_seq)
+    db.commit()
+    return path
+
+def _apply_master(db, entry):
+    model, key_col = MASTERS[entry["entity"]]
+    key_value = float(entry["key"]) if key_col == "width" else entry["key"]
+    obj = db.query(model).filter(getattr(model, key_col) == key_value).first()
+    if entry["op"] == "delete":
+        if obj is None:
+            return "already absent"
+        if model is Party and db.query(Quotation.id).filter(Quotation.party_id == obj.id).first():
+            obj.is_active = False # Same rule as the Party master: used parties are deactivated
+            return "deactivated (has quotations)"
+        db.delete(obj)
+        return "deleted"
+    if obj is None:
+        obj = model()
+        db.add(obj)
+    _assign(obj, entry["values"])
+    if model in (PaperRate, OperationRate):
+        from modules.rate_history import record_rate_changes
+        db.flush()
+        record_rate_changes(db, model, [obj.id], user=changelog.current_user())
+    return "upserted"
+
+def _apply_quotation(db, entry):
+    q = db.query(Quotation).filter(Quotation.quotation_number == entry["key"]).first()
+    if q is not None:
+        item_ids = [i.id for i in q.items]
+        db.query(QuotationItemLayer).filter(QuotationItemLayer.item_id.in_(item_ids)).delete(synchronize_session=False)
+        db.query(QuotationItem).filter(QuotationItem.quotation_id == q.id).delete(synchronize_session=False)
+        db.expire(q, ["items"])
+    if entry["op"] == "delete":
+        if q is None:
+            return "already absent"
+        db.delete(q)
+        return "deleted"
+
+    doc = entry["doc"]
+    party = db.query(Party).filter(Party.name == doc.get("party")).first()
+    if party is None and doc.get("party"):
+        party = Party(name=doc["party"], is_active=True) # Masters normally arrive first; don't lose the quotation
+        db.add(party)
+        db.flush()
+    if q is None:
+        q = Quotation()
+        db.add(q)
+    _assign(q, doc)
+    q.party_id = party.id if party else None
+    db.flush()
+    for values in doc.get("items", []):
+        item = QuotationItem(quotation_id=q.id)
+        _assign(item, values)
+        item.layers = build_item_layers(item.layer_details, item.box_weight)
+        db.add(item)
+    return "upserted"
+
+def import_changes(db, shared_dir):
+    """Applies new change sets of every other site. Returns {site: (applied, skipped)}."""
+    own = site_code(db)
+    summary = {}
+    if not os.path.isdir(shared_dir):
+        return summary
+    for site in sorted(os.listdir(shared_dir)):
+        site_dir = os.path.join(shared_dir, site)
+        if site == own or not os.path.isdir(site_dir):
+            continue
+        cursor_key = IMPORT_CURSOR_KEY + site
+        cursor = int(_get_setting(db, cursor_key, 0))
+        files = sorted((int(m.group(2)), f) for f in os.listdir(site_dir) if (m := _FILE_RE.match(f)))
+        applied = skipped = 0
+        for to_seq, name in files:
+            if to_seq <= cursor:
+                continue
+            with gzip.open(os.path.join(site_dir, name), "rt", encoding="utf-8") as f:
+                change_set = json.load(f)
+
+            changelog.set_current_user(REPLICATION_USER + site)
+            try:
+                # Masters first: quotations refer to parties by name
+                entries = [(e["entity"], e, _apply_master) for e in change_set["masters"]] + \
+                          [("quotations", e, _apply_quotation) for e in change_set["quotations"]]
+                for entity, e, apply in entries:
+                    changed_at = datetime.fromisoformat(e["changed_at"])
+                    if _newer(db, entity, e["key"], changed_at, site):
+                        detail = apply(db, e)
+                        _set_version(db, entity, e["key"], changed_at, site)
+                        outcome = "applied"
+                        applied += 1
+                    else:
+                        detail = "local change is newer"
+                        outcome = "skipped"
+                        skipped += 1
+                    db.add(ReplicationLog(site=site, direction="import", file=name, entity=entity, key=e["key"],
+                                          operation=e["op"], changed_at=changed_at, outcome=outcome, detail=detail))
+                _set_setting(db, cursor_key, to_seq)
+                db.commit() # One transaction per change set: a failed file is retried whole next time
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                changelog.set_current_user(None)
+        summary[site] = (applied, skipped)
+    return summary
+
+def replicate(db, shared_dir):
+    """Export own changes, then import the other sites'. Requires a site code."""
+    if not site_code(db):
+        raise RuntimeError("Set a site code first (e.g. replicate.py --set-site A).")
+    exported = export_changes(db, shared_dir)
+    imported = import_changes(db, shared_dir)
+    if any(applied for applied, _ in imported.values()):
+        from modules import master_cache, forecast, similar
+        master_cache.bump_version(db)
+        db.commit()
+        forecast.invalidate()
+        similar.invalidate()
+    return exported, imported
@@ -1,14 +1,17 @@
 import streamlit as st
-import pandas as pd
+from datetime import datetime
 from database import SessionLocal
-from models import Quotation, QuotationItem, Party
+from models import Quotation, QuotationItem, QuotationItemLayer, Party
+from modules.forecast import refresh_quotations
+from modules.changelog import log_changes
+from modules import archive, similar, box_search
 
 def reports_page():
     st.title("Reports & History")
     
     db = SessionLocal()
     
-    tab1, tab2 = st.tabs(["All Quotations", "Party-wise History"])
+    tab1, tab2, tab3, tab4 = st.tabs(["All Quotations", "Party-wise History", "Paper Forecast", "Margin Risk"])
     
     with tab1:
         st.subheader("Recent Quotations")
@@ -16,8 +19,16 @@ def reports_page():
         # Search Filter
         search_query = st.text_input("🔍 Search by Party Name, Box Size, or Quotation Number", "").lower()
         
-        # Fetch Data
-        quotations = db.query(Quotation).order_by(Quotation.created_date.desc()).all()
+        filters, since = _range_filters(db)
+        filtering = box_search.has_filters(filters)
+        
+        # Fetch Data (archived years are only read when the From date reaches them)
+        hot_q = db.query(Quotation)
+        if filtering:
+            hot_q = hot_q.filter(Quotation.id.in_(box_search.matching_quotation_ids(filters)))
+        quotations = hot_q.order_by(Quotation.created_date.desc()).all()
+        quotations += [q for q in archive.load_archived_quotations(db, archive.years_needed(db, since), since=since)
+                       if not filtering or box_search.quotation_matches(q, filters)]
         
         # --- HEADER ---
         # Adjust column ratios using st.columns
@@ -38,31 +49,16 @@ def reports_page():
         
         if quotations:
             count = 0
-            for q in quotations:
-                party_name = q.party.name if q.party else "Unknown"
-                
+            for q, party_name, sizes, qtys in quotation_rows(quotations, search_query):
                 # Fetch first item rate for display/edit (assuming single item focus for now)
                 first_item = q.items[0] if q.items else None
                 current_rate = first_item.selling_price if first_item else 0
-                
-                # aggregate sizes and qtys
-                size_list = []
-                qty_list = []
-                for i in q.items:
-                     size_list.append(f"{i.length/25.4:.1f}x{i.width/25.4:.1f}x{i.height/25.4:.1f}")
-                     qty_list.append(str(i.quantity))
-                sizes = ", ".join(size_list)
-                qtys = ", ".join(qty_list)
-                
-                # Filter Logic
-                if search_query:
-                    initials = "".join([w[0] for w in party_name.split() if w]).lower()
-                    search_str = f"{party_name} {q.quotation_number} {sizes} {initials}".lower()
-                    if search_query not in search_str:
-                        continue
+                # Archived quotations are read-only and may share ids with hot ones
+                archived_year = getattr(q, "archived_year", None)
+                rid = f"{archived_year}_{q.id}" if archived_year else q.id
                 
                 count += 1
-                if count > 50 and not search_query:
+                if count > 50 and not (search_query or filtering):
                     # Limit display for performance if not searching
                     if count == 51:
                          st.caption("Showing first 50 results. Use search to find older quotations.")
@@ -85,7 +81,7 @@ def reports_page():
                             data=pdf_bytes,
                             file_name=f"{q.quotation_number}.pdf",
                             mime="application/pdf",
-                            key=f"pdf_{q.id}",
+                            key=f"pdf_{rid}",
                             help="Download PDF"
                         )
                         
@@ -100,8 +96,8 @@ def reports_page():
                         # Email
                         with ac_cols[2].popover("📧", help="Send Email"):
                             default_email = q.party.email if q.party and q.party.email else ""
-                            rec_email = st.text_input("To:", value=default_email, key=f"email_in_{q.id}")
-                            if st.button("Send", key=f"btn_email_{q.id}"):
+                            rec_email = st.text_input("To:", value=default_email, key=f"email_in_{rid}")
+                            if st.button("Send", key=f"btn_email_{rid}"):
                                 if rec_email:
                                     from modules.email_utils import send_email_with_pdf
                                     import os
@@ -134,6 +130,13 @@ def reports_page():
                     # 6. Qty
                     c[5].write(qtys)
                     
+                    if archived_year:
+                        c[6].write(f"{current_rate:.2f}")
+                        c[7].write(f"{q.total_amount:.0f}")
+                        c[8].caption(f"{q.status} (archived {archived_year})")
+                        st.divider()
+                        continue
+
                     # 7. Rate (Editable)
                     with c[6]:
                         if st.button(f"{current_rate:.2f} ✏️", key=f"rate_edit_{q.id}", help="Edit Unit Rate"):
@@ -148,6 +151,7 @@ def reports_page():
                                         # Recalculate total amount for quotation
                                         q.total_amount = sum(item.selling_price * item.quantity for item in q.items)
                                         db.commit()
+                                        similar.refresh_quotations([q.id], db)
                                         st.session_state[f"editing_rate_{q.id}"] = False
                                         st.rerun()
                                 if st.button("X", key=f"cr_{q.id}"):
@@ -177,20 +181,27 @@ def reports_page():
                                 if st.button(f"Confirm {new_status}?", key=f"conf_stat_{q.id}"):
                                     q.status = new_status
                                     db.commit()
+                                    refresh_quotations([q.id], db)
                                     st.toast(f"Updated status to {new_status}")
                                     st.rerun()
                         else:
                             q.status = new_status
                             db.commit()
+                            refresh_quotations([q.id], db)
                             st.toast(f"Updated status to {new_status}")
                             st.rerun()
                     
                     # 10. Delete
                     if c[9].button("🗑️", key=f"del_{q.id}", help="Delete Quotation"):
                          if q.status == "Draft":
+                             item_ids = [i.id for i in q.items]
+                             db.query(QuotationItemLayer).filter(QuotationItemLayer.item_id.in_(item_ids)).delete(synchronize_session=False)
                              db.query(QuotationItem).filter(QuotationItem.quotation_id == q.id).delete(synchronize_session=False)
                              db.query(Quotation).filter(Quotation.id == q.id).delete(synchronize_session=False)
+                             log_changes(db, QuotationItem, "delete", item_ids)
+                             log_changes(db, Quotation, "delete", [{"id": q.id, "quotation_number": q.quotation_number}])
                              db.commit()
+                             similar.refresh_quotations([q.id], db)
                              st.success("Deleted!")
                              st.rerun()
                          else:
@@ -209,24 +220,132 @@ def reports_page():
         
         if sel_party:
             selected_p_obj = next(p for p in parties if p.name == sel_party)
-            qs = db.query(Quotation).filter(Quotation.party_id == selected_p_obj.id).all()
+            history_data = party_history(db, selected_p_obj.id, since=_since_filter(db, "history_since"))
             
-            if qs:
-                # Get item details
-                history_data = []
-                for q in qs:
-                    for item in q.items:
-                        history_data.append({
-                            "Date": q.created_date.date(),
-                            "Q No": q.quotation_number,
-                            "Box Size": f"{item.length/25.4:.1f}x{item.width/25.4:.1f}x{item.height/25.4:.1f}",
-                            "Ply": item.ply,
-                            "Cost": item.cost_per_box,
-                            "Selling Price": item.selling_price,
-                            "Margin %": item.margin_percent
-                        })
+            if history_data:
+                import pandas as pd
                 st.dataframe(pd.DataFrame(history_data))
             else:
                 st.info("No history for this party.")
+
+    with tab3:
+        _paper_forecast_tab(db)
+
+    with tab4:
+        from modules.margin_risk import margin_risk_tab
+        margin_risk_tab(db)
     
     db.close()
+
+def quotation_rows(quotations, search_query=""):
+    """
+    Yields (quotation, party_name, sizes, qtys) for the listing, skipping quotations
+    that don't match search_query (party name / initials, number or box size).
+    """
+    for q in quotations:
+        party_name = q.party.name if q.party else "Unknown"
+        
+        # aggregate sizes and qtys
+        size_list = []
+        qty_list = []
+        for i in q.items:
+             size_list.append(f"{i.length/25.4:.1f}x{i.width/25.4:.1f}x{i.height/25.4:.1f}")
+             qty_list.append(str(i.quantity))
+        sizes = ", ".join(size_list)
+        qtys = ", ".join(qty_list)
+        
+        # Filter Logic
+        if search_query:
+            initials = "".join([w[0] for w in party_name.split() if w]).lower()
+            search_str = f"{party_name} {q.quotation_number} {sizes} {initials}".lower()
+            if search_query not in search_str:
+                continue
+        yield q, party_name, sizes, qtys
+
+def _range_input(col, label, key, scale=1.0):
+    """Min / max number inputs in one column; returns (lo, hi) multiplied by `scale`, None = open."""
+    lo = col.number_input(f"{label} min", value=None, min_value=0.0, key=f"{key}_min")
+    hi = col.number_input(f"{label} max", value=None, min_value=0.0, key=f"{key}_max")
+    return (lo * scale if lo is not None else None, hi * scale if hi is not None else None)
+
+def _range_filters(db):
+    """
+    Range filters above the listing (sizes entered in inch). Returns (box_search filters
+    dict in mm, From datetime or None); the default From (archive boundary) is no filter.
+    """
+    before = archive.archive_before(db)
+    with st.expander("📐 Filters", expanded=False):
+        c = st.columns(6)
+        filters = {
+            "length": _range_input(c[0], "Length (in)", "f_length", box_search.MM_PER_INCH),
+            "width": _range_input(c[1], "Width (in)", "f_width", box_search.MM_PER_INCH),
+            "height": _range_input(c[2], "Height (in)", "f_height", box_search.MM_PER_INCH),
+            "quantity": _range_input(c[3], "Qty", "f_qty"),
+            "rate": _range_input(c[4], "Rate", "f_rate"),
+            "ply": c[5].multiselect("Ply", [3, 5, 7, 9], key="f_ply"),
+        }
+        d1, d2 = st.columns(2)
+        # Defaults to the archive boundary: older (archived) years only load when asked for
+        date_from = d1.date_input("From", value=before.date() if before else None, key="list_since",
+                                  help="Older quotations are archived by year; pick an earlier date to include them." if before else None)
+        date_to = d2.date_input("To", value=None, key="list_until")
+        default_from = before.date() if before else None
+        filters["date"] = (date_from if date_from != default_from else None, date_to)
+    since = datetime.combine(date_from, datetime.min.time()) if date_from else None
+    return filters, since
+
+def _since_filter(db, key):
+    """
+    'From' date input, shown once quotations have been archived. Defaults to the
+    archive boundary (hot data only); an earlier date pulls in the archived years.
+    Returns a datetime or None (no archive: everything is hot).
+    """
+    before = archive.archive_before(db)
+    if before is None:
+        return None
+    since = st.date_input("From", value=before.date(), key=key,
+                          help="Older quotations are archived by year; pick an earlier date to include them.")
+    return datetime.combine(since, datetime.min.time())
+
+def party_history(db, party_id, since=None):
+    """One row per item of a party's quotations from `since` on (Party-wise History tab), archive included."""
+    history_data = []
+    for r in archive.party_history_rows(db, party_id, since):
+        history_data.append({
+            "Date": r.created_date.date(),
+            "Q No": r.quotation_number,
+            "Box Size": f"{r.length/25.4:.1f}x{r.width/25.4:.1f}x{r.height/25.4:.1f}",
+            "Ply": r.ply,
+            "Cost": r.cost_per_box,
+            "Selling Price": r.selling_price,
+            "Margin %": r.margin_percent
+        })
+    return history_data
+
+def _paper_forecast_tab(db):
+    from modules.forecast import get_committed_paper, purchase_plan, COMMITTED_STATUSES
+    st.subheader("Committed Paper (Reel Purchase Planning)")
+    st.caption(f"Kg of paper committed by {' & '.join(COMMITTED_STATUSES)} orders, by order week.")
+    
+    forecast = get_committed_paper(db)
+    if forecast.empty:
+        st.info("No Finalised or Dispatched orders yet.")
+        return
+    
+    papers = sorted(forecast["paper"].dropna().unique())
+    sel_papers = st.multiselect("Paper", papers, default=papers)
+    view = forecast[forecast["paper"].isin(sel_papers)]
+    
+    m1, m2 = st.columns(2)
+    m1.metric("Total Committed", f"{view['kg'].sum():,.0f} kg")
+    m2.metric("Weeks", f"{view['week'].nunique()}")
+    
+    st.markdown("**Purchase Plan (Paper / GSM / Reel)**")
+    plan = purchase_plan(view).rename(columns={"paper": "Paper", "gsm": "GSM", "reel_width": "Reel (Inch)", "kg": "Kg"})
+    st.dataframe(plan, use_container_width=True, hide_index=True)
+    
+    st.markdown("**Weekly Requirement (kg)**")
+    weekly = view.pivot_table(index="week", columns="paper", values="kg", aggfunc="sum", fill_value=0)
+    weekly.index = weekly.index.date
+    st.bar_chart(weekly)
+    st.dataframe(weekly.round(1), use_container_width=True)
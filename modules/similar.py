@@ -0,0 +1,183 @@
+import threading
+from sqlalchemy import select, func
+from database import SessionLocal
+from models import Quotation, QuotationItem, QuotationItemLayer, Party
+
+# "Similar past quotations" for the calculator: exact k-nearest-neighbour search over
+# every saved item, held in memory (numpy) so typing dimensions never queries the DB.
+# Distance is Euclidean over weighted features, 1 unit ~ 1 inch of box dimension:
+#   length, width, height (inch), ply x PLY_WEIGHT, total GSM x GSM_WEIGHT
+PLY_WEIGHT = 3.0 # 3 ply vs 5 ply counts like 6 inches
+GSM_WEIGHT = 0.02 # 100 GSM heavier board counts like 2 inches
+MM_PER_INCH = 25.4
+
+# Index: features sorted by length, so a query only scans the band of lengths within
+# the current search radius (doubled until the k best are provably inside it).
+# Items saved since the last build sit in a small `recent` block searched brute force;
+# it is merged into the sorted block once it grows past REBUILD_AFTER.
+REBUILD_AFTER = 2000
+INITIAL_RADIUS = 2.0
+
+_COLUMNS = ["item_id", "quotation_id", "quotation_number", "party_id", "created_date",
+            "length", "width", "height", "ply", "total_gsm", "quantity", "cost_per_box", "selling_price"]
+
+_index = {"main": None, "recent": None, "parties": {}}
+_lock = threading.Lock()
+
+def _features(length_mm, width_mm, height_mm, ply, total_gsm):
+    import numpy as np
+    return np.nan_to_num(np.column_stack([
+        np.asarray(length_mm, dtype=float) / MM_PER_INCH,
+        np.asarray(width_mm, dtype=float) / MM_PER_INCH,
+        np.asarray(height_mm, dtype=float) / MM_PER_INCH,
+        np.asarray(ply, dtype=float) * PLY_WEIGHT,
+        np.asarray(total_gsm, dtype=float) * GSM_WEIGHT,
+    ])).astype("float32") # Missing values count as 0
+
+def _load(db, quotation_ids=None):
+    """One query: every item with its quotation header and total GSM, as a block of numpy arrays."""
+    import numpy as np
+    gsm = select(QuotationItemLayer.item_id, func.sum(QuotationItemLayer.gsm).label("total_gsm"))\
+        .group_by(QuotationItemLayer.item_id).subquery()
+    stmt = select(
+        QuotationItem.id, QuotationItem.quotation_id, Quotation.quotation_number, Quotation.party_id,
+        Quotation.created_date, QuotationItem.length, QuotationItem.width, QuotationItem.height,
+        QuotationItem.ply, gsm.c.total_gsm, QuotationItem.quantity, QuotationItem.cost_per_box,
+        QuotationItem.selling_price
+    ).join(Quotation, Quotation.id == QuotationItem.quotation_id)\
+     .outerjoin(gsm, gsm.c.item_id == QuotationItem.id)
+    if quotation_ids is not None:
+        stmt = stmt.where(QuotationItem.quotation_id.in_(list(quotation_ids)))
+    rows = db.execute(stmt).all()
+    cols = list(zip(*rows)) if rows else [[] for _ in _COLUMNS]
+    block = {name: np.array(values, dtype=object) for name, values in zip(_COLUMNS, cols)}
+    for name in ("item_id", "quotation_id"):
+        block[name] = block[name].astype("int64")
+    for name in ("length", "width", "height", "ply", "total_gsm", "quantity", "cost_per_box", "selling_price"):
+        block[name] = np.array([v if v is not None else np.nan for v in block[name]], dtype="float64")
+    block["features"] = _features(block["length"], block["width"], block["height"], block["ply"], block["total_gsm"])
+    block["alive"] = np.ones(len(rows), dtype=bool)
+    return block
+
+def _sorted(block):
+    order = block["features"][:, 0].argsort(kind="stable")
+    return {name: values[order] for name, values in block.items()}
+
+def _concat(a, b):
+    import numpy as np
+    return {name: np.concatenate([a[name], b[name]]) for name in a}
+
+def _parties(db):
+    return {pid: name for pid, name in db.query(Party.id, Party.name)}
+
+def build(db=None):
+    """(Re)builds the index from the database. Run at startup (warm-up) or lazily on first search."""
+    own_db = db is None
+    db = db or SessionLocal()
+    try:
+        main = _sorted(_load(db))
+        parties = _parties(db)
+    finally:
+        if own_db:
+            db.close()
+    with _lock:
+        _index.update(main=main, recent=None, parties=parties)
+
+def invalidate():
+    """Drop the index (restore, archive, replication); the next search rebuilds it."""
+    with _lock:
+        _index.update(main=None, recent=None)
+
+def refresh_quotations(quotation_ids, db=None):
+    """
+    Incremental update after quotations are saved / edited / deleted: their old entries
+    are masked out and their current items (if any) go to the recent block.
+    No-op until the index was first built.
+    """
+    import numpy as np
+    if _index["main"] is None or not quotation_ids:
+        return
+    own_db = db is None
+    db = db or SessionLocal()
+    try:
+        fresh = _load(db, set(quotation_ids))
+        parties = _parties(db) if any(pid not in _index["parties"] for pid in fresh["party_id"]) else None
+    finally:
+        if own_db:
+            db.close()
+    ids = np.fromiter(quotation_ids, dtype="int64")
+    with _lock:
+        main, recent = _index["main"], _index["recent"]
+        if main is None:
+            return
+        main["alive"] &= ~np.isin(main["quotation_id"], ids)
+        if recent is not None:
+            recent["alive"] &= ~np.isin(recent["quotation_id"], ids)
+            fresh = _concat(recent, fresh)
+        if len(fresh["item_id"]) > REBUILD_AFTER:
+            merged = _concat(main, fresh)
+            _index["main"] = _sorted({name: values[merged["alive"]] for name, values in merged.items()})
+            fresh = None
+        _index["recent"] = fresh
+        if parties is not None:
+            _index["parties"] = parties
+
+def _band_search(features, alive, query, k):
+    """Exact k nearest rows of `features` (sorted by column 0). Returns (row indexes, distances)."""
+    import numpy as np
+    n = len(features)
+    col0 = features[:, 0]
+    radius = INITIAL_RADIUS
+    while True:
+        lo = np.searchsorted(col0, query[0] - radius, side="left")
+        hi = np.searchsorted(col0, query[0] + radius, side="right")
+        idx = np.arange(lo, hi)[alive[lo:hi]]
+        dist = np.sqrt(((features[idx] - query) ** 2).sum(axis=1))
+        everything = lo == 0 and hi == n
+        if len(idx) >= k:
+            best = np.argpartition(dist, k - 1)[:k]
+            # Anything outside the band is further than `radius` along length alone
+            if dist[best].max() <= radius or everything:
+                return idx[best], dist[best]
+        elif everything:
+            return idx, dist
+        radius *= 2
+
+def similar_items(length_mm, width_mm, height_mm, ply, total_gsm, k=5, db=None):
+    """
+    The k saved items closest to a box spec, nearest first: one dict per item with
+    quotation number, party, date, size, ply, GSM, quantity, cost and rate.
+    """
+    import numpy as np
+    if _index["main"] is None:
+        build(db)
+    with _lock:
+        main, recent, parties = _index["main"], _index["recent"], _index["parties"]
+    query = _features([length_mm], [width_mm], [height_mm], [ply], [total_gsm])[0]
+
+    candidates = []
+    if main is not None and len(main["item_id"]):
+        idx, dist = _band_search(main["features"], main["alive"], query, k)
+        candidates += [(d, main, i) for i, d in zip(idx, dist)]
+    if recent is not None and len(recent["item_id"]):
+        idx = np.flatnonzero(recent["alive"])
+        dist = np.sqrt(((recent["features"][idx] - query) ** 2).sum(axis=1))
+        candidates += [(d, recent, i) for i, d in zip(idx, dist)]
+    candidates.sort(key=lambda c: c[0])
+
+    results = []
+    for dist, block, i in candidates[:k]:
+        created = block["created_date"][i]
+        results.append({
+            "Q No": block["quotation_number"][i],
+            "Party": parties.get(block["party_id"][i], "Unknown"),
+            "Date": created.date() if created is not None else None,
+            "Size (in)": f"{block['length'][i]/MM_PER_INCH:.1f}x{block['width'][i]/MM_PER_INCH:.1f}x{block['height'][i]/MM_PER_INCH:.1f}",
+            "Ply": int(block["ply"][i]) if not np.isnan(block["ply"][i]) else None,
+            "GSM": block["total_gsm"][i],
+            "Qty": int(block["quantity"][i]) if not np.isnan(block["quantity"][i]) else None,
+            "Cost/Box": block["cost_per_box"][i],
+            "Rate": block["selling_price"][i],
+            "Distance": round(float(dist), 2),
+        })
+    return results
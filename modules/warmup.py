@@ -0,0 +1,49 @@
+import threading
+import importlib
+import logging
+
+# Heavy modules that are only needed once a page is opened.
+# They are imported lazily by the pages, and preloaded here in the background
+# so the first page after login does not pay the import cost.
+WARMUP_MODULES = [
+    "pandas",
+    "reportlab.platypus",
+    "reportlab.lib.styles",
+    "passlib.context",
+    "smtplib",
+    "email.mime.multipart",
+    "email.mime.application",
+    "modules.pdf_utils",
+    "modules.email_utils",
+]
+
+_warmup_started = False
+_warmup_lock = threading.Lock()
+
+def _warmup_worker(tasks):
+    for name in WARMUP_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logging.error(f"Warm-up import failed for {name}: {e}")
+
+    for task in tasks:
+        try:
+            task()
+        except Exception as e:
+            logging.error(f"Warm-up task failed: {e}")
+
+def start_warmup(*tasks):
+    """
+    Preloads heavy modules (and runs optional startup tasks) in a daemon thread.
+    Only the first call per process starts the thread; later reruns are a no-op.
+    """
+    global _warmup_started
+    with _warmup_lock:
+        if _warmup_started:
+            return False
+        _warmup_started = True
+
+    t = threading.Thread(target=_warmup_worker, args=(tasks,), name="box-costing-warmup", daemon=True)
+    t.start()
+    return True
@@ -0,0 +1,138 @@
+from logic import REEL_TRIM_ALLOWANCE_MM
+
+# N-up sheet layouts: how many blanks (one box piece, cutting size incl. allowances)
+# to print / die-cut from one sheet. Every candidate is a grid of blanks, or two grids
+# side by side where the second is rotated 90° to fill the strip the first leaves:
+#
+#   +-----------------+-------+      block A: nx1 x ny1 blanks as given
+#   | A   A   A   A   |  B  B |      block B: nx2 x ny2 blanks rotated, as many rows
+#   | A   A   A   A   |  B  B |      as fit in block A's width (or the other way round)
+#   +-----------------+-------+
+#
+# Blocks can sit along the sheet length or across its width. All candidates are
+# evaluated at once with numpy and ranked by board used per blank: sheet area, or
+# reel width x sheet length when reels are given (the deckle trim is waste too).
+# Sheet length runs along the corrugator, sheet width is the deckle. All sizes in mm.
+
+DEFAULT_GAP_MM = 6.0 # Gutter between blanks for the die
+DEFAULT_MARGIN_MM = 10.0 # Gripper / trim edge around the layout
+MAX_PER_AXIS = 60 # Blanks per row / column considered
+DEFAULT_MAX_SHEET_MM = (1800.0, 1400.0) # Printer / die-cutter sheet limit (length, width)
+
+def _fit(extent, size, gap):
+    """How many blanks of `size` fit in `extent` (numpy, gaps between them)."""
+    import numpy as np
+    return np.maximum(np.floor((extent + gap) / (size + gap)), 0).astype(int)
+
+def _span(count, size, gap):
+    """Length taken by `count` blanks in a row (0 for none)."""
+    import numpy as np
+    return np.where(count > 0, count * size + (count - 1) * gap, 0.0)
+
+def _two_blocks(a, b, max_1, max_2, gap, margin):
+    """
+    Block A (a along axis 1, b along axis 2) followed along axis 1 by block B rotated
+    (b along axis 1, a along axis 2); nx2 = 0 is a plain grid. The block with more
+    rows sets the extent across axis 2 and the other fits as many rows as it can.
+    Returns arrays (n, ext_1, ext_2, nx1, ny1, nx2, ny2).
+    """
+    import numpy as np
+    room_1, room_2 = max_1 - 2 * margin, max_2 - 2 * margin
+    nx1_max = min(int(_fit(room_1, a, gap)), MAX_PER_AXIS)
+    ny1_max = min(int(_fit(room_2, b, gap)), MAX_PER_AXIS)
+    ny2_max = min(int(_fit(room_2, a, gap)), MAX_PER_AXIS)
+    if nx1_max < 1 or ny1_max < 1:
+        return None
+
+    # Rows: A sets the width (B fills what it can) or B sets it (A fills)
+    ny1 = np.arange(1, ny1_max + 1)
+    ny2_a = _fit(_span(ny1, b, gap), a, gap)
+    ny2 = np.arange(1, ny2_max + 1)
+    ny1_b = np.minimum(_fit(_span(ny2, a, gap), b, gap), ny1_max)
+    rows = np.concatenate([np.column_stack([ny1, ny2_a]), np.column_stack([ny1_b, ny2])])
+    rows = rows[rows[:, 0] > 0]
+
+    # Columns of each block along axis 1, every split of the length
+    nx1 = np.arange(1, nx1_max + 1)
+    nx2 = np.arange(0, min(int(_fit(room_1, b, gap)), MAX_PER_AXIS) + 1)
+    r, c1, c2 = np.meshgrid(np.arange(len(rows)), nx1, nx2, indexing="ij")
+    r, c1, c2 = r.ravel(), c1.ravel(), c2.ravel()
+    y1, y2 = rows[r, 0], np.where(c2 > 0, rows[r, 1], 0)
+    c2 = np.where(y2 > 0, c2, 0) # Rotated blanks that don't fit across: plain grid
+
+    ext_1 = _span(c1, a, gap) + np.where(c2 > 0, gap + _span(c2, b, gap), 0.0) + 2 * margin
+    ext_2 = np.maximum(_span(y1, b, gap), _span(y2, a, gap)) + 2 * margin
+    ok = ext_1 <= max_1 + 1e-9
+    return (c1 * y1 + c2 * y2)[ok], ext_1[ok], ext_2[ok], c1[ok], y1[ok], c2[ok], y2[ok]
+
+def nest(blank_length, blank_width, max_length, max_width, gap=DEFAULT_GAP_MM, margin=DEFAULT_MARGIN_MM,
+         reel_widths=None, trim_allowance_mm=REEL_TRIM_ALLOWANCE_MM, top=10):
+    """
+    Best N-up layouts of one blank on sheets up to max_length x max_width, best first:
+    list of {"ups", "sheet_length", "sheet_width", "reel_width", "waste_pct",
+    "board_per_blank_sqm", "layout"}. reel_widths (inch): the sheet width must fit a
+    reel and the reel's trim counts as waste. Empty if the blank doesn't fit at all.
+    """
+    import numpy as np
+    from logic import suggest_reels
+    if min(blank_length, blank_width, max_length, max_width) <= 0:
+        return []
+
+    # (blank along sheet length, along width, blocks stacked along length?)
+    variants = [(blank_length, blank_width, True), (blank_width, blank_length, True),
+                (blank_width, blank_length, False), (blank_length, blank_width, False)]
+    parts = []
+    for a, b, along_length in variants:
+        if along_length:
+            found = _two_blocks(a, b, max_length, max_width, gap, margin)
+        else: # Same search with the axes swapped
+            found = _two_blocks(b, a, max_width, max_length, gap, margin)
+        if found is None:
+            continue
+        n, ext_1, ext_2, nx1, ny1, nx2, ny2 = found
+        sheet_l, sheet_w = (ext_1, ext_2) if along_length else (ext_2, ext_1)
+        rotated = a != blank_length # Block A's blanks turned 90° (a always runs along the sheet length)
+        parts.append((n, sheet_l, sheet_w, nx1, ny1, nx2, ny2,
+                      np.full(len(n), rotated), np.full(len(n), along_length)))
+    if not parts:
+        return []
+    n, sheet_l, sheet_w, nx1, ny1, nx2, ny2, rotated, along_length = [np.concatenate(p) for p in zip(*parts)]
+
+    used_width = sheet_w
+    reel = np.full(len(n), np.nan)
+    if reel_widths:
+        reel, _ = suggest_reels(sheet_w, reel_widths, trim_allowance_mm=trim_allowance_mm)
+        used_width = reel * 25.4
+    keep = ~np.isnan(used_width)
+    board = np.where(keep, sheet_l * used_width / np.maximum(n, 1), np.inf)
+    # Least board per blank; then more blanks per sheet (fewer impressions)
+    order = np.lexsort((-n, board))
+    order = order[keep[order]]
+
+    results, seen = [], set()
+    for i in order:
+        key = (int(n[i]), round(float(sheet_l[i]), 1), round(float(sheet_w[i]), 1))
+        if key in seen: # Same sheet reached by a different split
+            continue
+        seen.add(key)
+        # Blocks as "blanks along length x across width"
+        if along_length[i]:
+            block_a, block_b = (nx1[i], ny1[i]), (nx2[i], ny2[i])
+        else:
+            block_a, block_b = (ny1[i], nx1[i]), (ny2[i], nx2[i])
+        layout = f"{block_a[0]} x {block_a[1]}" + (" turned 90°" if rotated[i] else "")
+        if nx2[i] > 0:
+            layout += f" + {block_b[0]} x {block_b[1]}" + ("" if rotated[i] else " turned 90°") + \
+                      (" after it" if along_length[i] else " beside it")
+        results.append({
+            "ups": int(n[i]),
+            "sheet_length": float(sheet_l[i]),
+            "sheet_width": float(sheet_w[i]),
+            "reel_width": None if np.isnan(reel[i]) else float(reel[i]),
+            "waste_pct": float((1 - n[i] * blank_length * blank_width / (sheet_l[i] * used_width[i])) * 100),
+            "board_per_blank_sqm": float(board[i] / 1_000_000),
+            "layout": layout,
+        })
+        if len(results) >= top:
+            break
+    return results
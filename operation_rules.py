@@ -0,0 +1,130 @@
+from collections import namedtuple
+from functools import lru_cache
+
+# Operation cost rules. Every operation (Masters -> Operation Rates) charges its rate
+# per unit of one driver (OperationRate.unit):
+#   per_kg        box weight (kg, incl. wastage)
+#   per_sq_meter  board area of one box (sq m, incl. wastage)
+#   per_box       each box
+#   per_sheet     sheets (impressions) per box; below 1 on multi-up layouts
+#   per_colour    print colours of the box
+#   fixed         once per order (plates, dies, setup)
+# Optional quantity slabs replace the rate from an order quantity on:
+#   [[5000, 0.9], [20000, 0.8]]  ->  0.9 from 5,000 boxes, 0.8 from 20,000
+# and a minimum charge tops the operation up to at least that much per order (the
+# top-up is spread over the order like a fixed cost). A batch of boxes is costed as
+# arrays: (boxes x operations) rates from the slabs times the driver values, summed
+# per box. Add a driver with register_driver().
+
+Driver = namedtuple("Driver", ["unit", "label", "value", "per_order"])
+Rule = namedtuple("Rule", ["name", "rate", "unit", "slabs", "min_charge"], defaults=(None, None))
+
+DRIVERS = {}
+
+def register_driver(unit, label, value, per_order=False):
+    """value: function of the batch's driver arrays (dict, see conversion_costs) -> array."""
+    DRIVERS[unit] = Driver(unit, label, value, per_order)
+
+register_driver("per_kg", "per kg of box weight", lambda d: d["weight_kg"])
+register_driver("per_sq_meter", "per sq m of board", lambda d: d["area_sqm"])
+register_driver("per_box", "per box", lambda d: d["boxes"])
+register_driver("per_sheet", "per sheet / impression", lambda d: d["sheets"])
+register_driver("per_colour", "per print colour, per box", lambda d: d["colours"])
+register_driver("fixed", "per order", lambda d: d["boxes"], per_order=True)
+
+def parse_slabs(text):
+    """'5000:0.9, 20000:0.8' (or a list of pairs) -> ((5000.0, 0.9), (20000.0, 0.8)), sorted; None if empty."""
+    if text is None or (isinstance(text, float) and text != text): # NaN from an editor
+        return None
+    pairs = text
+    if isinstance(text, str):
+        pairs = [p.split(":") for p in text.replace(";", ",").split(",") if p.strip()]
+    try:
+        slabs = tuple(sorted((float(q), float(r)) for q, r in pairs))
+    except (TypeError, ValueError):
+        raise ValueError(f"Slabs must be 'quantity:rate' pairs, e.g. '5000:0.9, 20000:0.8' (got {text!r})")
+    if any(q < 0 or r < 0 for q, r in slabs):
+        raise ValueError("Slab quantities and rates can't be negative")
+    return slabs or None
+
+def format_slabs(slabs):
+    return ", ".join(f"{q:g}:{r:g}" for q, r in slabs) if slabs else ""
+
+def as_rule(op):
+    """(name, rate, unit[, slabs, min_charge]) -> Rule; ValueError for an unknown unit."""
+    rule = op if isinstance(op, Rule) else Rule(*op)
+    if rule.unit not in DRIVERS:
+        raise ValueError(f"Operation '{rule.name}' has unknown unit '{rule.unit}'. Known: {', '.join(DRIVERS)}")
+    return rule._replace(rate=rule.rate or 0.0, slabs=parse_slabs(rule.slabs))
+
+@lru_cache(maxsize=256)
+def _compile(operations):
+    """Arrays for one operation list (a tuple): driver column, rate, minimum, slab thresholds / rates."""
+    import numpy as np
+    rules = [as_rule(op) for op in operations]
+    units = list(DRIVERS)
+    width = max([len(r.slabs or ()) for r in rules] + [1])
+    thresholds = np.full((len(rules), width), np.inf)
+    slab_rates = np.zeros((len(rules), width))
+    for i, r in enumerate(rules):
+        for j, (q, rate) in enumerate(r.slabs or ()):
+            thresholds[i, j], slab_rates[i, j] = q, rate
+    return (rules,
+            np.array([units.index(r.unit) for r in rules], dtype=int),
+            np.array([r.rate for r in rules], dtype=float),
+            np.array([r.min_charge or 0.0 for r in rules], dtype=float),
+            np.array([DRIVERS[r.unit].per_order for r in rules], dtype=bool),
+            thresholds, slab_rates)
+
+def conversion_costs(operation_sets, weight_kg, area_sqm, sheets, colours, quantity, details=False):
+    """
+    Conversion cost of n boxes. operation_sets: per box, its list of operations
+    ((name, rate, unit[, slabs, min_charge]) or Rule); boxes sharing a list are costed
+    together. Driver arguments are arrays of n (or scalars). Returns (variable cost per
+    box, fixed cost per order) arrays and, with details=True, per box a list of
+    {"operation", "unit", "rate", "cost_per_box"} (else None).
+    """
+    import numpy as np
+    n = len(operation_sets)
+    arr = lambda v: np.broadcast_to(np.asarray(v, dtype=float), (n,))
+    qty = np.maximum(arr(quantity), 1.0)
+    values = {"weight_kg": arr(weight_kg), "area_sqm": arr(area_sqm), "sheets": arr(sheets),
+              "colours": arr(colours), "boxes": np.ones(n)}
+    drivers = np.column_stack([d.value(values) for d in DRIVERS.values()]) if n else np.zeros((0, len(DRIVERS)))
+
+    groups, by_id = {}, {} # by_id: a batch usually shares one list object
+    for i, ops in enumerate(operation_sets):
+        rows = by_id.get(id(ops))
+        if rows is None:
+            try:
+                key = tuple(ops)
+                hash(key)
+            except TypeError: # Slabs given as lists
+                key = tuple(as_rule(op) for op in ops)
+            rows = by_id[id(ops)] = groups.setdefault(key, [])
+        rows.append(i)
+
+    variable, fixed = np.zeros(n), np.zeros(n)
+    breakdown = [[] for _ in range(n)] if details else None
+    for ops, rows in groups.items():
+        if not ops:
+            continue
+        rules, column, rate, minimum, per_order, thresholds, slab_rates = _compile(ops)
+        rows = np.asarray(rows)
+        q = qty[rows][:, None]
+        # Rate in force: the last slab reached, else the base rate
+        reached = (q[:, :, None] >= thresholds[None]).sum(axis=2)
+        slab_rate = np.take_along_axis(np.broadcast_to(slab_rates, (len(rows),) + slab_rates.shape),
+                                       np.maximum(reached - 1, 0)[:, :, None], axis=2)[:, :, 0]
+        rates = np.where(reached > 0, slab_rate, rate)
+        per_box = np.where(per_order, 0.0, rates * drivers[rows][:, column]) # (boxes x operations)
+        charged = np.maximum(np.where(per_order, rates, per_box * q), minimum) # Per order
+        variable[rows] = per_box.sum(axis=1)
+        fixed[rows] = (charged - per_box * q).sum(axis=1)
+        if details:
+            cost = (charged / q).tolist()
+            rates = rates.tolist()
+            for k, i in enumerate(rows.tolist()):
+                breakdown[i] = [{"operation": r.name, "unit": r.unit, "rate": rates[k][j], "cost_per_box": cost[k][j]}
+                                for j, r in enumerate(rules)]
+    return variable, fixed, breakdown
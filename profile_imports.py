@@ -0,0 +1,139 @@
+import os
+import sys
+import subprocess
+import argparse
+
+# Measures cold import cost with `python -X importtime` in fresh interpreters.
+# Run from the app folder:  python profile_imports.py  (writes import_profile.txt)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def login_path(app_file=os.path.join(BASE_DIR, "app.py")):
+    """
+    What app.py imports before the login page is served: its unconditional top-level
+    imports, read from the source so imports added later are covered. Pages are
+    imported inside the menu branches and functions and are left out.
+    """
+    import ast
+    with open(app_file, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # "from modules import metrics" imports the submodule modules.metrics
+            subs = [f"{node.module}.{a.name}" for a in node.names
+                    if os.path.exists(os.path.join(BASE_DIR, *node.module.split("."), f"{a.name}.py"))]
+            names = subs or [node.module]
+        else:
+            continue
+        modules += [m for m in names if m not in modules]
+    return modules
+
+LOGIN_PATH = login_path()
+
+# Modules that must NOT be imported on the login path (they are loaded lazily / by the warm-up thread)
+HEAVY_MODULES = ["pandas", "reportlab", "passlib", "smtplib"]
+
+# Per-page cost, each measured in its own cold process
+PAGE_MODULES = [
+    "modules.calculator",
+    "modules.reports",
+    "modules.masters",
+    "modules.pdf_utils",
+    "modules.email_utils",
+    "pandas",
+    "reportlab.platypus",
+    "passlib.context",
+    "smtplib",
+]
+
+LOGIN_BUDGET_SEC = 2.0
+
+def profile_import(modules):
+    """
+    Imports the given modules in a fresh interpreter and parses the -X importtime output.
+    Returns list of (module, self_us, cumulative_us, depth) in import order.
+    """
+    code = "import " + ", ".join(modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import failed for {modules}:\n{proc.stderr[-2000:]}")
+    return _parse(proc.stderr)
+
+def _parse(stderr):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cum_us = int(parts[1].strip())
+        except ValueError:
+            continue
+        raw_name = parts[2].rstrip()
+        depth = (len(raw_name) - len(raw_name.lstrip())) // 2
+        rows.append((raw_name.strip(), self_us, cum_us, depth))
+    return rows
+
+def top_level_total(rows):
+    # Top-level entries (depth 0) cumulative times add up to the whole import
+    return sum(r[2] for r in rows if r[3] == 0) / 1_000_000
+
+def build_report(top_n=25):
+    lines = []
+    lines.append("=" * 60)
+    lines.append("      BOX COSTING IMPORT-TIME PROFILE")
+    lines.append("=" * 60)
+
+    # 1. Login path
+    login_rows = profile_import(LOGIN_PATH)
+    login_total = top_level_total(login_rows)
+    loaded = {r[0] for r in login_rows}
+    leaked = [m for m in HEAVY_MODULES if m in loaded]
+
+    lines.append("[LOGIN PATH]")
+    lines.append(f"  Modules:   {', '.join(LOGIN_PATH)}")
+    lines.append(f"  Total:     {login_total:.3f} s (budget {LOGIN_BUDGET_SEC:.1f} s)")
+    if leaked:
+        lines.append(f"  WARNING:   heavy modules imported on login path: {', '.join(leaked)}")
+    else:
+        lines.append("  Heavy modules on login path: none")
+    lines.append("")
+    lines.append(f"  Top {top_n} by cumulative time:")
+    for name, self_us, cum_us, depth in sorted(login_rows, key=lambda r: r[2], reverse=True)[:top_n]:
+        lines.append(f"    {cum_us/1000:9.1f} ms  (self {self_us/1000:7.1f} ms)  {name}")
+    lines.append("-" * 60)
+
+    # 2. Each page / heavy module, measured cold
+    lines.append("[PAGES & HEAVY MODULES] (cold, each in a fresh process)")
+    for mod in PAGE_MODULES:
+        try:
+            rows = profile_import([mod])
+            lines.append(f"  {top_level_total(rows):7.3f} s  {mod}")
+        except RuntimeError as e:
+            lines.append(f"    ERROR  {mod}: {str(e).splitlines()[0]}")
+    lines.append("=" * 60)
+
+    ok = login_total <= LOGIN_BUDGET_SEC and not leaked
+    return "\n".join(lines), ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile cold import time of the app.")
+    parser.add_argument("--output", default="import_profile.txt", help="Report file path")
+    parser.add_argument("--top", type=int, default=25, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    report, ok = build_report(args.top)
+    print(report)
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(report + "\n")
+    print(f"Report written to {args.output}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,33 @@
+import argparse
+from database import init_db, SessionLocal
+from modules.quotations import SITE_CODE_KEY, site_code
+from modules.replication import replicate, _set_setting
+
+def main():
+    parser = argparse.ArgumentParser(description="Exchange quotation and master changes with other sites through a shared folder.")
+    parser.add_argument("--shared", help="Shared folder every site can read and write (network share, synced folder)")
+    parser.add_argument("--set-site", help="Set this installation's site code once (e.g. A, PUNE); it becomes part of quotation numbers")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.set_site:
+            code = args.set_site.strip().upper()
+            current = site_code(db)
+            if current and current != code:
+                parser.error(f"Site code is already {current}; changing it would clash with numbers already replicated.")
+            _set_setting(db, SITE_CODE_KEY, code)
+            db.commit()
+            print(f"Site code set to {code}.")
+        if not args.shared:
+            return
+        exported, imported = replicate(db, args.shared)
+        print(f"Exported: {exported or 'nothing new'}")
+        for site, (applied, skipped) in imported.items():
+            print(f"Imported from {site}: {applied} applied, {skipped} skipped (local change newer)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()